@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import logging
+import os
+import tarfile
+import time
+import zipfile
+
+import mssqlscripter.objectsink as objectsink
+import mssqlscripter.scriptsplitter as scriptsplitter
+
+logger = logging.getLogger("mssqlscripter.archivesink")
+
+MANIFEST_NAME = "manifest.json"
+
+ZIP_SUFFIX = ".zip"
+# Archive file suffix to the tarfile write mode, zip archives are handled by zipfile.
+TAR_MODES = [
+    (".tar.gz", "w:gz"),
+    (".tgz", "w:gz"),
+    (".tar.bz2", "w:bz2"),
+    (".tar.xz", "w:xz"),
+    (".tar", "w"),
+]
+# Suffixes of every archive type that can be written, and read back by diff.
+ARCHIVE_SUFFIXES = [ZIP_SUFFIX] + [suffix for suffix, _ in TAR_MODES]
+
+
+def get_tar_mode(archive_path):
+    """
+    Return the tarfile write mode for archive_path, None for a zip archive. Raises ValueError for other names.
+    """
+    lower_path = archive_path.lower()
+    if lower_path.endswith(ZIP_SUFFIX):
+        return None
+    for suffix, mode in TAR_MODES:
+        if lower_path.endswith(suffix):
+            return mode
+    raise ValueError(f"Unknown archive type of {archive_path}")
+
+
+class ArchiveSink(objectsink.ObjectFileSink):
+    """
+    Moves the files of a file per object run into a tar or zip archive as each object completes, under their own
+    names.
+    """
+
+    def __init__(self, archive_path, source_dir):
+        super().__init__(source_dir)
+        self.archive_path = archive_path
+        self.added = set()
+
+        tar_mode = get_tar_mode(archive_path)
+        if tar_mode is None:
+            self.archive = zipfile.ZipFile(
+                archive_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+            )
+        else:
+            self.archive = tarfile.open(archive_path, tar_mode)
+
+    def write_manifest(self, plan, positions):
+        """
+        Add a manifest listing the member name of every object of the plan at positions as the first member, so
+        readers know what the archive holds before reading through it.
+        """
+        manifest = {
+            "objects": [
+                {
+                    "type": scripting_object.type,
+                    "schema": scripting_object.schema,
+                    "name": scripting_object.name,
+                    "member": scriptsplitter.object_file_name(scripting_object),
+                }
+                for scripting_object in (plan[position] for position in positions)
+            ]
+        }
+        self.add_bytes(MANIFEST_NAME, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    def add_bytes(self, name, data):
+        with self.lock:
+            if isinstance(self.archive, zipfile.ZipFile):
+                self.archive.writestr(name, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = time.time()
+                self.archive.addfile(info, io.BytesIO(data))
+
+    def take_file(self, file_name, script_type, schema, name, duration=None):
+        path = os.path.join(self.source_dir, file_name)
+        with self.lock:
+            if file_name in self.added:
+                return
+            if isinstance(self.archive, zipfile.ZipFile):
+                self.archive.write(path, file_name)
+            else:
+                self.archive.add(path, file_name, recursive=False)
+            self.added.add(file_name)
+        os.remove(path)
+
+    def close(self, succeeded=True):
+        """
+        Add the files left in the source directory and finish the archive.
+        """
+        if not succeeded:
+            logger.warning("Archiving the object files of a failed run")
+        try:
+            self.take_remaining_files()
+        finally:
+            self.archive.close()
+        logger.info("Archived %s files to %s", len(self.added), self.archive_path)
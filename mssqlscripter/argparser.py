@@ -4,9 +4,8 @@
 # --------------------------------------------------------------------------------------------
 
 import argparse
-import getpass
+import io
 import os
-import shutil
 import sys
 
 import mssqlscripter
@@ -14,6 +13,16 @@ import mssqlscripter
 MSSQL_SCRIPTER_CONNECTION_STRING = "MSSQL_SCRIPTER_CONNECTION_STRING"
 MSSQL_SCRIPTER_PASSWORD = "MSSQL_SCRIPTER_PASSWORD"
 
+# Include object lists longer than this are split across several scripting requests.
+DEFAULT_MAX_OBJECTS_PER_REQUEST = 1000
+
+# Kept here rather than in scripterlogging so that --help, --version and argument errors do not import the
+# logging handlers.
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+# shared: every process appends to mssql-scripter.log.
+# per-run: every process owns its own log file under the logs directory.
+LOG_MODES = ["shared", "per-run"]
+
 
 def parse_arguments(args):
     """
@@ -147,7 +156,15 @@ def parse_arguments(args):
         nargs="*",
         type=str,
         metavar="",
-        help="Database objects to include in script.",
+        help="Database objects to include in script. An item of the form @file reads object names from file, one per line.",
+    )
+
+    parser.add_argument(
+        "--include-objects-file",
+        dest="IncludeObjectsFile",
+        metavar="",
+        default=None,
+        help="File with database objects to include in script, one per line. Use - to read from standard input.",
     )
 
     parser.add_argument(
@@ -156,7 +173,41 @@ def parse_arguments(args):
         nargs="*",
         type=str,
         metavar="",
-        help="Database objects to exclude from script.",
+        help="Database objects to exclude from script. An item of the form @file reads object names from file, one per line.",
+    )
+
+    parser.add_argument(
+        "--exclude-objects-file",
+        dest="ExcludeObjectsFile",
+        metavar="",
+        default=None,
+        help="File with database objects to exclude from script, one per line. Use - to read from standard input.",
+    )
+
+    parser.add_argument(
+        "--include-patterns",
+        dest="IncludePatterns",
+        nargs="*",
+        type=str,
+        metavar="",
+        help="Database object patterns to include in script, such as Sales.* or Table:dbo.tmp_%%. * and %% match any characters, ? a single character and re: starts a regular expression over schema.name. Matched against the scripting plan on the client.",
+    )
+
+    parser.add_argument(
+        "--exclude-patterns",
+        dest="ExcludePatterns",
+        nargs="*",
+        type=str,
+        metavar="",
+        help="Database object patterns to exclude from script, in the same form as --include-patterns.",
+    )
+
+    parser.add_argument(
+        "--match-case",
+        dest="MatchCase",
+        action="store_true",
+        default=False,
+        help="Match object patterns case sensitively.",
     )
 
     parser.add_argument(
@@ -451,12 +502,257 @@ def parse_arguments(args):
         help="Enable verbose logging.",
     )
 
+    parser.add_argument(
+        "--max-objects-per-request",
+        dest="MaxObjectsPerRequest",
+        metavar="",
+        type=int,
+        default=DEFAULT_MAX_OBJECTS_PER_REQUEST,
+        help=f"Split longer include object lists across several scripting requests, defaults to {DEFAULT_MAX_OBJECTS_PER_REQUEST}. Use 0 to never split.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="Workers",
+        metavar="",
+        type=int,
+        default=1,
+        help="Script with this many Sql Tools Service processes in parallel, balancing objects between them by how long they took in earlier runs. Single file scripts are merged back in plan order. Defaults to 1.",
+    )
+
+    parser.add_argument(
+        "--dynamic-dispatch",
+        dest="DynamicDispatch",
+        action="store_true",
+        default=False,
+        help="With --workers, give each Sql Tools Service process a small batch of objects whenever it finishes its previous one instead of a fixed share up front. Batches are sized by how long recent objects took to script.",
+    )
+
+    parser.add_argument(
+        "--max-server-requests",
+        dest="MaxServerRequests",
+        metavar="",
+        type=int,
+        default=0,
+        help="Maximum scripting requests run against the same server at once by all scripter processes on this machine. Defaults to 0, no limit.",
+    )
+
+    parser.add_argument(
+        "--max-server-request-rate",
+        dest="MaxServerRequestRate",
+        metavar="",
+        type=float,
+        default=0,
+        help="Maximum scripting requests started per second against the same server by all scripter processes on this machine. Defaults to 0, no limit.",
+    )
+
+    parser.add_argument(
+        "--adaptive-backoff",
+        dest="AdaptiveBackoff",
+        action="store_true",
+        default=False,
+        help="Wait before starting another scripting request while the time to script each object is more than twice what it was at the start of the run. Applies between requests of a split object list.",
+    )
+
+    parser.add_argument(
+        "--archive",
+        dest="Archive",
+        metavar="",
+        default=None,
+        help="With --file-per-object, move each object file into this archive as soon as it is scripted instead of writing a directory of files. The archive type follows the file name: .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz.",
+    )
+
+    parser.add_argument(
+        "--sqlite-output",
+        dest="SqliteOutput",
+        metavar="",
+        default=None,
+        help="With --file-per-object, store the script of each object as a row of this SQLite database instead of writing a directory of files. Every run is added to the database.",
+    )
+
+    parser.add_argument(
+        "--snapshot",
+        dest="Snapshot",
+        action="store_true",
+        default=False,
+        help="With --file-per-object, store the run as a snapshot instead of writing a directory of files. Scripts identical to ones already stored are stored once. Use mssql-scripter snapshot to list and restore snapshots.",
+    )
+
+    parser.add_argument(
+        "--snapshot-store",
+        dest="SnapshotStore",
+        metavar="",
+        default=None,
+        help="Snapshot store directory, defaults to ~/.mssqlscripter/snapshots.",
+    )
+
+    parser.add_argument(
+        "--index",
+        dest="WriteIndex",
+        action="store_true",
+        default=False,
+        help="Write an index of where each object starts in the script to a .index.json file next to it, for tools to read single objects from large scripts. Requires --file-path, single file output only.",
+    )
+
+    parser.add_argument(
+        "--single-flight",
+        dest="SingleFlight",
+        action="store_true",
+        default=False,
+        help="Wait for an identical run already in progress on this machine and reuse its script instead of scripting again. Single file output only.",
+    )
+
+    parser.add_argument(
+        "--cache",
+        dest="UseCache",
+        action="store_true",
+        default=False,
+        help="Reuse the script of an earlier run against the same target with the same options and plan. Only the plan is fetched from the server on a cache hit. Single file output only.",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        dest="CacheDir",
+        metavar="",
+        default=None,
+        help="Result cache directory, defaults to ~/.mssqlscripter/cache.",
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        dest="CacheTtl",
+        metavar="",
+        type=int,
+        default=3600,
+        help="Seconds a cached script is reused for, defaults to 3600.",
+    )
+
+    parser.add_argument(
+        "--cache-max-size",
+        dest="CacheMaxSize",
+        metavar="",
+        type=int,
+        default=512,
+        help="Megabytes of cached scripts to keep, least recently used scripts are evicted first. Defaults to 512.",
+    )
+
+    parser.add_argument(
+        "--timings",
+        dest="Timings",
+        action="store_true",
+        default=False,
+        help="Display the time spent in each phase of the run. Phase timings are always written to the log.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="Profile",
+        action="store_true",
+        default=False,
+        help="Profile the run, including the background json rpc threads, and write pstats output next to the log file.",
+    )
+
+    parser.add_argument(
+        "--sample-resources",
+        dest="SampleResources",
+        action="store_true",
+        default=False,
+        help="Sample cpu, memory, thread and disk usage of the Sql Tools Service process and display the peaks. Linux only, not available with --workers.",
+    )
+
+    parser.add_argument(
+        "--resource-samples-file",
+        dest="ResourceSamplesFile",
+        metavar="",
+        default=None,
+        help="Write every resource sample with the scripting progress at that time as CSV to this file. Implies --sample-resources.",
+    )
+
+    parser.add_argument(
+        "--resource-sample-interval",
+        dest="ResourceSampleInterval",
+        metavar="",
+        type=float,
+        default=0.5,
+        help="Seconds between resource samples, defaults to 0.5.",
+    )
+
+    parser.add_argument(
+        "--log-level",
+        dest="LogLevel",
+        choices=LOG_LEVELS,
+        default="DEBUG",
+        help="Minimum level of messages written to the mssql-scripter log file. Levels above DEBUG skip formatting of the service payloads.",
+    )
+
+    parser.add_argument(
+        "--log-mode",
+        dest="LogMode",
+        choices=LOG_MODES,
+        default="shared",
+        help="Use per-run to give each process its own size-bounded log file, recommended when running several scripter processes concurrently.",
+    )
+
     parser.add_argument(
         "--version", action="version", version=f"{mssqlscripter.__version__}"
     )
 
     parameters = parser.parse_args(args)
-    verify_directory(parameters)
+    if parameters.MaxObjectsPerRequest < 0:
+        parser.error("--max-objects-per-request must not be negative")
+    if parameters.Workers < 1:
+        parser.error("--workers must be at least 1")
+    if parameters.MaxServerRequests < 0 or parameters.MaxServerRequestRate < 0:
+        parser.error(
+            "--max-server-requests and --max-server-request-rate must not be negative"
+        )
+    if parameters.Workers > 1 and (
+        parameters.SampleResources or parameters.ResourceSamplesFile
+    ):
+        # The sampler follows one Sql Tools Service process and the progress of its requests.
+        parser.error("--sample-resources can not be combined with --workers")
+    if (
+        parameters.Workers > 1
+        and parameters.ScriptDestination == "ToSingleFile"
+        and not parameters.DynamicDispatch
+        and not parameters.IncludeDescriptiveHeaders
+    ):
+        # Scripts of the workers are merged by the headers of their objects.
+        parser.error(
+            "--workers with --exclude-headers requires --file-per-object or --dynamic-dispatch"
+        )
+    if parameters.WriteIndex and (
+        not parameters.FilePath or parameters.ScriptDestination != "ToSingleFile"
+    ):
+        parser.error("--index requires --file-path and single file output")
+    object_outputs = [
+        (option, value)
+        for option, value in (
+            ("--archive", parameters.Archive),
+            ("--sqlite-output", parameters.SqliteOutput),
+            ("--snapshot", parameters.Snapshot),
+        )
+        if value
+    ]
+    if len(object_outputs) > 1:
+        parser.error(
+            f"{' and '.join(option for option, _ in object_outputs)} can not be combined"
+        )
+    for option, value in object_outputs:
+        if value and parameters.ScriptDestination != "ToFilePerObject":
+            parser.error(f"{option} requires --file-per-object")
+        if value and parameters.FilePath:
+            parser.error(f"{option} replaces --file-path")
+    if parameters.Archive:
+        import mssqlscripter.archivesink as archivesink
+
+        if not parameters.Archive.lower().endswith(tuple(archivesink.ARCHIVE_SUFFIXES)):
+            parser.error(
+                f"--archive must end with one of {', '.join(archivesink.ARCHIVE_SUFFIXES)}"
+            )
+    if not object_outputs:
+        verify_directory(parameters)
+    load_object_lists(parameters)
 
     if parameters.Server:
         build_connection_string(parameters)
@@ -472,6 +768,224 @@ def parse_arguments(args):
     return parameters
 
 
+def parse_split_arguments(args):
+    """
+    Initialize parser with the options of the split command.
+    """
+    parser = argparse.ArgumentParser(
+        prog="mssql-scripter split",
+        description="Split a single file script into a file per object or a file per object type.",
+    )
+
+    parser.add_argument(
+        dest="ScriptPath", metavar="script", help="Single file script to split."
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        dest="OutputDirectory",
+        metavar="",
+        required=True,
+        help="Directory to write the files to, created if it does not exist.",
+    )
+
+    parser.add_argument(
+        "--by",
+        dest="SplitBy",
+        choices=["object", "type"],
+        default="object",
+        help="Write a file per object, named like --file-per-object names them, or a file per object type. Defaults to object.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="Workers",
+        metavar="",
+        type=int,
+        default=None,
+        help="Number of files written at once, defaults to a number based on the processor count.",
+    )
+
+    parameters = parser.parse_args(args)
+    if parameters.Workers is not None and parameters.Workers < 1:
+        parser.error("--workers must be at least 1")
+    if not os.path.isfile(parameters.ScriptPath):
+        parser.error(f"{parameters.ScriptPath} is not a file")
+    return parameters
+
+
+def parse_snapshot_arguments(args):
+    """
+    Initialize parser with the options of the snapshot command.
+    """
+    parser = argparse.ArgumentParser(
+        prog="mssql-scripter snapshot",
+        description="List the snapshots of a snapshot store or restore one to a file per object.",
+    )
+
+    parser.add_argument(
+        "--store",
+        dest="SnapshotStore",
+        metavar="",
+        default=None,
+        help="Snapshot store directory, defaults to ~/.mssqlscripter/snapshots.",
+    )
+
+    commands = parser.add_subparsers(dest="Command", metavar="command")
+    commands.required = True
+    commands.add_parser("list", help="List the stored snapshots, oldest first.")
+
+    restore_parser = commands.add_parser(
+        "restore", help="Write the objects of a snapshot to a file per object."
+    )
+    restore_parser.add_argument(
+        dest="SnapshotId", metavar="snapshot", help="Id of the snapshot to restore."
+    )
+    restore_parser.add_argument(
+        "-o",
+        "--output-dir",
+        dest="OutputDirectory",
+        metavar="",
+        required=True,
+        help="Directory to write the files to, created if it does not exist.",
+    )
+
+    return parser.parse_args(args)
+
+
+def parse_diff_arguments(args):
+    """
+    Initialize parser with the options of the diff command. Arguments after -- are passed to the runs scripting
+    connection strings.
+    """
+    args, scripter_arguments = split_scripter_arguments(args)
+    parser = argparse.ArgumentParser(
+        prog="mssql-scripter diff",
+        description="Compare the object scripts of two file per object outputs. Each side is a directory, an archive written by --archive, a snapshot id or manifest, or a connection string to script. Exits with 1 when they differ.",
+        epilog="Arguments after -- are added to the mssql-scripter runs that script connection strings, like -- --schema-and-data.",
+    )
+
+    parser.add_argument(
+        dest="OldSource", metavar="old", help="Side to compare against."
+    )
+
+    parser.add_argument(dest="NewSource", metavar="new", help="Side to compare.")
+
+    parser.add_argument(
+        "--store",
+        dest="SnapshotStore",
+        metavar="",
+        default=None,
+        help="Snapshot store of snapshot ids, defaults to ~/.mssqlscripter/snapshots.",
+    )
+
+    parser.add_argument(
+        "--name-only",
+        dest="NameOnly",
+        action="store_true",
+        default=False,
+        help="Only list the added, removed and changed objects, without their diffs.",
+    )
+
+    parser.add_argument(
+        "-U",
+        "--unified",
+        dest="Context",
+        metavar="",
+        type=int,
+        default=3,
+        help="Lines of context around the changes of the diffs, defaults to 3.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="Workers",
+        metavar="",
+        type=int,
+        default=None,
+        help="Number of processes computing diffs, defaults to the processor count.",
+    )
+
+    parameters = parser.parse_args(args)
+    if parameters.Workers is not None and parameters.Workers < 1:
+        parser.error("--workers must be at least 1")
+    parameters.ScripterArguments = scripter_arguments
+    return parameters
+
+
+def parse_fleet_arguments(args):
+    """
+    Initialize parser with the options of the fleet command. Arguments after -- are scripting options of every
+    database.
+    """
+    args, scripter_arguments = split_scripter_arguments(args)
+    parser = argparse.ArgumentParser(
+        prog="mssql-scripter fleet",
+        description="Script a fleet of databases sharing schemas to a file per object per database. Databases whose plans list the same objects are scripted once and reuse the scripts of the first of them.",
+        epilog="Arguments after -- are scripting options of every database, like -- --schema-and-data.",
+    )
+
+    parser.add_argument(
+        dest="TargetsFile",
+        metavar="targets",
+        help="File with the connection strings of the databases, one per line. Use - to read from standard input.",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        dest="OutputDirectory",
+        metavar="",
+        required=True,
+        help="Directory to write a directory of object files per database to, named after the database.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="Workers",
+        metavar="",
+        type=int,
+        default=4,
+        help="Number of Sql Tools Service processes scripting databases at once, defaults to 4.",
+    )
+
+    parser.add_argument(
+        "--spot-check",
+        dest="SpotCheck",
+        metavar="",
+        type=int,
+        default=10,
+        help="Number of randomly chosen objects every database reusing scripts also scripts itself. If any differs from the reused script, the database is scripted in full. Defaults to 10. With 0 reused scripts are not verified: databases are grouped by the names of their objects only, so a database whose definitions differ gets the scripts of another database.",
+    )
+
+    parser.add_argument(
+        "--link",
+        dest="Link",
+        action="store_true",
+        default=False,
+        help="Hard link reused scripts instead of copying them.",
+    )
+
+    parameters = parser.parse_args(args)
+    if parameters.Workers < 1:
+        parser.error("--workers must be at least 1")
+    if parameters.SpotCheck < 0:
+        parser.error("--spot-check must not be negative")
+    parameters.ScripterArguments = scripter_arguments
+    return parameters
+
+
+def split_scripter_arguments(args):
+    """
+    Split args at the first -- into the arguments of a command and the mssql-scripter arguments it passes on.
+    """
+    if "--" not in args:
+        return args, []
+    separator = args.index("--")
+    return args[:separator], args[separator + 1 :]
+
+
 def verify_directory(parameters):
     """
     If creating a file per object, create the directory if it does not exist.
@@ -488,6 +1002,59 @@ def verify_directory(parameters):
             )
 
 
+def read_object_names(file_path):
+    """
+    Lazily read object names from a file, one per line. Blank lines and lines starting with # are skipped.
+    """
+    if file_path == "-":
+        object_file = sys.stdin
+    else:
+        object_file = io.open(file_path, encoding="utf-8-sig")
+
+    try:
+        for line in object_file:
+            object_name = line.strip()
+            if object_name and not object_name.startswith("#"):
+                yield object_name
+    finally:
+        if object_file is not sys.stdin:
+            object_file.close()
+
+
+def expand_object_names(object_names, file_path):
+    """
+    Expand @file items and the optional object file into a list of object names without duplicates,
+    preserving the order they were first seen in.
+    """
+    if not object_names and not file_path:
+        return object_names
+
+    # Dictionary keys keep insertion order and skip duplicates.
+    unique_names = {}
+    for object_name in object_names or []:
+        if object_name.startswith("@") and len(object_name) > 1:
+            unique_names.update(dict.fromkeys(read_object_names(object_name[1:])))
+        else:
+            unique_names[object_name] = None
+
+    if file_path:
+        unique_names.update(dict.fromkeys(read_object_names(file_path)))
+
+    return list(unique_names)
+
+
+def load_object_lists(parameters):
+    """
+    Merge object names given on the command line and in files into the include and exclude object lists.
+    """
+    parameters.IncludeObjects = expand_object_names(
+        parameters.IncludeObjects, parameters.IncludeObjectsFile
+    )
+    parameters.ExcludeObjects = expand_object_names(
+        parameters.ExcludeObjects, parameters.ExcludeObjectsFile
+    )
+
+
 def get_connection_string_from_environment(parameters):
     """
     Get connection string from environment variable.
@@ -514,13 +1081,100 @@ def build_connection_string(parameters):
         if parameters.Password is None and MSSQL_SCRIPTER_PASSWORD in os.environ:
             parameters.Password = os.environ[MSSQL_SCRIPTER_PASSWORD]
 
-        connection_string += f"Password={parameters.Password or getpass.getpass()};"
+        password = parameters.Password
+        if not password:
+            # Only interactive runs need the prompt, so keep it off the startup path.
+            import getpass
+
+            password = getpass.getpass()
+
+        connection_string += f"Password={password};"
     else:
         connection_string += "Integrated Security=True;"
 
     parameters.ConnectionString = connection_string
 
 
+# Connection string keywords that name the same setting, mapped to the name used in connection targets.
+CONNECTION_STRING_SYNONYMS = {
+    "server": "Server",
+    "data source": "Server",
+    "address": "Server",
+    "addr": "Server",
+    "network address": "Server",
+    "database": "Database",
+    "initial catalog": "Database",
+    "user id": "User Id",
+    "uid": "User Id",
+    "user": "User Id",
+    "integrated security": "Integrated Security",
+    "trusted_connection": "Integrated Security",
+    "authentication": "Authentication",
+}
+
+
+def parse_connection_string(connection_string):
+    """
+    Parse a connection string into an ordered dictionary of lower cased keyword -> value. Values may be quoted with
+    single or double quotes, a doubled quote inside stands for the quote itself.
+    """
+    settings = {}
+    position = 0
+    length = len(connection_string)
+    while position < length:
+        separator = connection_string.find("=", position)
+        if separator < 0:
+            break
+        keyword = connection_string[position:separator].strip().lower()
+        position = separator + 1
+
+        while position < length and connection_string[position] == " ":
+            position += 1
+
+        if position < length and connection_string[position] in "'\"":
+            quote = connection_string[position]
+            value = []
+            position += 1
+            while position < length:
+                if connection_string[position] == quote:
+                    if connection_string[position + 1 : position + 2] != quote:
+                        break
+                    position += 1
+                value.append(connection_string[position])
+                position += 1
+            value = "".join(value)
+            end = connection_string.find(";", position)
+        else:
+            end = connection_string.find(";", position)
+            value = connection_string[position : end if end >= 0 else length].strip()
+
+        if keyword:
+            settings[keyword] = value
+        position = end + 1 if end >= 0 else length
+
+    return settings
+
+
+def get_connection_target(connection_string):
+    """
+    Return the server, database and login a connection string connects to, without passwords or other secrets.
+    Synonymous keywords are normalized and the server name is lower cased so equivalent targets compare equal.
+    """
+    target = {}
+    for keyword, value in parse_connection_string(connection_string).items():
+        name = CONNECTION_STRING_SYNONYMS.get(keyword)
+        if name:
+            target[name] = value
+
+    if "Server" in target:
+        server = target["Server"].lower()
+        for prefix in ("tcp:", "np:", "lpc:"):
+            if server.startswith(prefix):
+                server = server[len(prefix) :]
+        target["Server"] = server.replace(" ", "")
+    return target
+
+
 def map_server_options(parameters):
     """
     Map short form to long form name and maps Azure versions to their appropriate editions.
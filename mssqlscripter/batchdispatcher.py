@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import threading
+
+logger = logging.getLogger("mssqlscripter.batchdispatcher")
+
+INITIAL_BATCH_SIZE = 8
+# Batches are sized to take about this long, long enough to hide the cost of a scripting request and short enough
+# that a slow object only holds back the worker that drew it.
+TARGET_BATCH_SECONDS = 2.0
+LATENCY_SMOOTHING = 0.3
+
+
+class BatchDispatcher(object):
+    """
+    Hands out contiguous batches of plan positions to workers as they become free.
+
+    Batches are taken in plan order and numbered, so outputs written per batch are in plan order when read back by
+    batch number. The batch size follows a moving average of the time objects took to script, and shrinks towards
+    the end of the plan so the last batches are spread over all workers.
+    """
+
+    def __init__(
+        self,
+        positions,
+        workers,
+        max_batch_size=0,
+        target_batch_seconds=TARGET_BATCH_SECONDS,
+    ):
+        self.positions = positions
+        self.workers = max(1, workers)
+        self.max_batch_size = max_batch_size
+        self.target_batch_seconds = target_batch_seconds
+        self.latency = None
+        self.next_index = 0
+        self.batch_count = 0
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def batch_size(self):
+        """
+        Number of objects expected to take the target batch time.
+        """
+        if self.latency is None:
+            size = INITIAL_BATCH_SIZE
+        elif self.latency <= 0:
+            size = len(self.positions)
+        else:
+            size = int(self.target_batch_seconds / self.latency)
+        if self.max_batch_size:
+            size = min(size, self.max_batch_size)
+        return max(1, size)
+
+    def next_batch(self):
+        """
+        Return the next batch number and its positions, or None once the plan is dispatched or dispatching stopped.
+        """
+        with self.lock:
+            remaining = len(self.positions) - self.next_index
+            if self.stopped or remaining <= 0:
+                return None
+
+            # Never hand one worker more than its share of what is left.
+            size = min(self.batch_size(), max(1, remaining // self.workers))
+            start = self.next_index
+            self.next_index += size
+            batch_number = self.batch_count
+            self.batch_count += 1
+
+        logger.debug("Dispatching batch %s of %s objects", batch_number, size)
+        return batch_number, self.positions[start : start + size]
+
+    def record(self, object_count, seconds):
+        """
+        Record that a batch of object_count objects took seconds to script.
+        """
+        if not object_count:
+            return
+        latency = seconds / object_count
+        with self.lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+
+    def stop(self):
+        """
+        Hand out no further batches.
+        """
+        with self.lock:
+            self.stopped = True
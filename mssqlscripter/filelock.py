@@ -0,0 +1,153 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows.
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger("mssqlscripter.filelock")
+
+# Waiting for a lock polls with a backoff between these intervals in seconds.
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+
+def try_lock_file(lock_file):
+    """
+    Try to take an exclusive lock on an open file without blocking, return True if it was taken. The lock is
+    released by the operating system when the file is closed or the process exits.
+    """
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def unlock_file(lock_file):
+    if fcntl:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def wait_for(try_acquire, timeout=None):
+    """
+    Call try_acquire with a backoff until it returns True or timeout seconds pass, return the last result.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = MIN_POLL_INTERVAL
+    while not try_acquire():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+    return True
+
+
+class FileLock(object):
+    """
+    Exclusive lock shared between processes through a lock file.
+
+    The lock is held on an open file handle, so it is released even if the process holding it dies.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+
+    def acquire(self, blocking=True, timeout=None):
+        """
+        Take the lock, return False if it was not taken because blocking is False or timeout seconds passed.
+        """
+        assert self.lock_file is None, "FileLock is not reentrant"
+        lock_file = open(self.path, "a+b")
+
+        if blocking:
+            locked = wait_for(lambda: try_lock_file(lock_file), timeout)
+        else:
+            locked = try_lock_file(lock_file)
+
+        if not locked:
+            lock_file.close()
+            return False
+
+        self.lock_file = lock_file
+        logger.debug("Acquired lock %s", self.path)
+        return True
+
+    def release(self):
+        if self.lock_file:
+            unlock_file(self.lock_file)
+            self.lock_file.close()
+            self.lock_file = None
+            logger.debug("Released lock %s", self.path)
+
+    @property
+    def locked(self):
+        return self.lock_file is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class FileSemaphore(object):
+    """
+    Counting semaphore shared between processes through one lock file per slot.
+
+    Like FileLock, slots held by a process that dies are released by the operating system.
+    """
+
+    def __init__(self, directory, name, slots):
+        assert slots > 0
+        self.locks = [
+            FileLock(os.path.join(directory, f"{name}.{slot}.lock"))
+            for slot in range(slots)
+        ]
+        self.held = None
+
+    def try_acquire(self):
+        for lock in self.locks:
+            if lock.acquire(blocking=False):
+                self.held = lock
+                return True
+        return False
+
+    def acquire(self, blocking=True, timeout=None):
+        """
+        Take a free slot, return False if none was taken because blocking is False or timeout seconds passed.
+        """
+        assert self.held is None, "FileSemaphore is not reentrant"
+        if not blocking:
+            return self.try_acquire()
+        return wait_for(self.try_acquire, timeout)
+
+    def release(self):
+        if self.held:
+            self.held.release()
+            self.held = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
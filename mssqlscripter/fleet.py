@@ -0,0 +1,384 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Script a fleet of databases that mostly share one schema, like the databases of the tenants of an application.
+
+The plan of every database is fetched first, which is cheap, and databases whose plans list the same objects are
+grouped by the fingerprint of their plan. One representative per group is scripted in full. The other databases
+of the group only script the objects named after the database itself and, with a spot check, a random sample of
+the shared objects that must match the representative's scripts byte for byte. Their remaining object files are
+copied or linked from the representative. A database failing its spot check is scripted in full. Plans only
+list object names, so without a spot check the scripts a database reuses are not verified at all.
+
+Every database gets a directory of object files under the output directory. Scripts are made without USE
+statements, which would differ between databases sharing a schema. Reused scripts keep the descriptive headers of
+the representative, with the Script Date of its run.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+
+import mssqlscripter.schemadiff as schemadiff
+import mssqlscripter.scripterworkers as scripterworkers
+import mssqlscripter.scriptsplitter as scriptsplitter
+
+logger = logging.getLogger("mssqlscripter.fleet")
+
+# Types of objects named after the database holding them, scripted for every database.
+TENANT_TYPES = {"Database"}
+FLEET_MANIFEST_NAME = "fleet.json"
+
+SCRIPTED = "scripted"
+REUSED = "reused"
+RESCRIPTED = "rescripted"
+FAILED = "failed"
+
+
+class FleetDatabase(object):
+    """
+    One database of a fleet, its scripting parameters, plan and what became of it.
+    """
+
+    def __init__(self, name, connection_string, parameters):
+        self.name = name
+        self.connection_string = connection_string
+        self.parameters = parameters
+        self.plan = None
+        self.fingerprint = None
+        self.representative = None
+        self.status = None
+
+    @property
+    def output_dir(self):
+        return self.parameters.FilePath
+
+    def shared_positions(self):
+        return [
+            position
+            for position in range(len(self.plan))
+            if self.plan.type_of(position) not in TENANT_TYPES
+        ]
+
+    def tenant_positions(self):
+        return [
+            position
+            for position in range(len(self.plan))
+            if self.plan.type_of(position) in TENANT_TYPES
+        ]
+
+
+def get_database_names(connection_strings):
+    """
+    Return a directory name per connection string, the database name where it has one, made unique.
+    """
+    import mssqlscripter.argparser as parser
+
+    names = []
+    seen = set()
+    for connection_string in connection_strings:
+        target = parser.get_connection_target(connection_string)
+        base_name = scriptsplitter.UNSAFE_FILE_NAME_CHARACTERS.sub(
+            "_", target.get("Database") or target.get("Server") or "database"
+        )
+        name = base_name
+        suffix = 1
+        # Compared case insensitively, the directories may be on a case insensitive file system.
+        while name.lower() in seen:
+            suffix += 1
+            name = f"{base_name}_{suffix}"
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def spot_check(representative_dir, output_dir, file_names):
+    """
+    Return the file names whose scripts in output_dir are missing or differ from the representative's. Scripts are
+    compared without their descriptive headers, which differ in their Script Date.
+    """
+    mismatches = []
+    for file_name in file_names:
+        try:
+            if schemadiff.hash_file(
+                os.path.join(representative_dir, file_name)
+            ) != schemadiff.hash_file(os.path.join(output_dir, file_name)):
+                mismatches.append(file_name)
+        except FileNotFoundError:
+            mismatches.append(file_name)
+    return mismatches
+
+
+def fill_from(representative_dir, output_dir, skip=(), link=False):
+    """
+    Copy, or hard link with link, the object files of representative_dir that output_dir does not have, except
+    the file names in skip. Return the number of files added.
+    """
+    count = 0
+    existing = set(os.listdir(output_dir))
+    for entry in os.scandir(representative_dir):
+        if not entry.is_file() or entry.name in skip or entry.name in existing:
+            continue
+        target_path = os.path.join(output_dir, entry.name)
+        if link:
+            try:
+                os.link(entry.path, target_path)
+                count += 1
+                continue
+            except OSError:
+                # Other file system or no hard links there, copy instead.
+                pass
+        shutil.copyfile(entry.path, target_path)
+        count += 1
+    return count
+
+
+def run_jobs(workers, databases, run_job):
+    """
+    Call run_job with the client of a worker for every database, spreading the databases across the workers.
+    A database whose job raises is marked as failed.
+    """
+    jobs = queue.Queue()
+    for database in databases:
+        jobs.put(database)
+
+    def run_worker(index):
+        while True:
+            try:
+                database = jobs.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                run_job(workers[index].client, database)
+            except Exception:
+                logger.exception("Scripting database %s failed", database.name)
+                database.status = FAILED
+
+    scripterworkers.run_threads(
+        min(len(workers), len(databases)), run_worker, "Fleet worker"
+    )
+
+
+def get_plan(client, database):
+    database.plan = client.get_scripting_plan(
+        dict(
+            vars(database.parameters),
+            ScriptDestination="ToSingleFile",
+            FilePath=os.devnull,
+        ),
+        database.parameters.MaxObjectsPerRequest,
+    )
+    database.fingerprint = database.plan.fingerprint(database.shared_positions())
+
+
+def script_database(client, database, status=SCRIPTED):
+    succeeded = scripterworkers.run_scripting_requests(
+        client, vars(database.parameters), database.parameters
+    )
+    database.status = status if succeeded else FAILED
+
+
+def group_by_fingerprint(databases):
+    """
+    Return the planned databases grouped by the fingerprint of their plan, groups and databases in input order.
+    """
+    groups = {}
+    for database in databases:
+        if database.status != FAILED:
+            groups.setdefault(database.fingerprint, []).append(database)
+    return list(groups.values())
+
+
+def make_reuse_job(spot_check_count, link):
+    """
+    Return the job of a database reusing the scripts of its representative.
+    """
+
+    def reuse_scripts(client, database):
+        representative = database.representative
+        if representative.status == FAILED:
+            script_database(client, database)
+            return
+
+        shared_positions = database.shared_positions()
+        sample = random.sample(
+            shared_positions, min(spot_check_count, len(shared_positions))
+        )
+        positions = database.tenant_positions() + sample
+        if positions:
+            succeeded = scripterworkers.run_scripting_requests(
+                client,
+                dict(
+                    vars(database.parameters),
+                    IncludeObjects=database.plan.to_scripting_objects(positions),
+                ),
+                database.parameters,
+            )
+            if not succeeded:
+                database.status = FAILED
+                return
+
+        mismatches = spot_check(
+            representative.output_dir,
+            database.output_dir,
+            [
+                scriptsplitter.object_file_name(database.plan[position])
+                for position in sample
+            ],
+        )
+        if mismatches:
+            logger.warning(
+                "%s scripts of %s differ from %s, first %s, scripting it in full",
+                len(mismatches),
+                database.name,
+                representative.name,
+                mismatches[0],
+            )
+            script_database(client, database, RESCRIPTED)
+            return
+
+        tenant_files = {
+            scriptsplitter.object_file_name(representative.plan[position])
+            for position in representative.tenant_positions()
+        }
+        count = fill_from(
+            representative.output_dir, database.output_dir, tenant_files, link
+        )
+        logger.info(
+            "Reused %s scripts of %s for %s", count, representative.name, database.name
+        )
+        database.status = REUSED
+
+    return reuse_scripts
+
+
+def script_fleet(databases, workers, spot_check_count, link=False):
+    """
+    Script the databases of a fleet on the tools service workers, one database per group of identical plans in
+    full, and return the groups. Other databases of a group spot check spot_check_count of their scripts, with 0
+    they reuse the scripts of their representative unverified.
+    """
+    run_jobs(workers, databases, get_plan)
+    groups = group_by_fingerprint(databases)
+    logger.info(
+        "Grouped %s databases by their plans into %s groups",
+        len(databases),
+        len(groups),
+    )
+
+    representatives = []
+    members = []
+    for group in groups:
+        representatives.append(group[0])
+        for database in group[1:]:
+            database.representative = group[0]
+            members.append(database)
+
+    run_jobs(workers, representatives, script_database)
+    run_jobs(workers, members, make_reuse_job(spot_check_count, link))
+    return groups
+
+
+def write_manifest(output_dir, databases, groups):
+    """
+    Write what became of every database of the fleet, without the secrets of connection strings.
+    """
+    import mssqlscripter.argparser as parser
+
+    manifest = {
+        "groups": [
+            {
+                "fingerprint": group[0].fingerprint,
+                "databases": [database.name for database in group],
+            }
+            for group in groups
+        ],
+        "databases": [
+            {
+                "name": database.name,
+                "target": parser.get_connection_target(database.connection_string),
+                "status": database.status,
+                "representative": (
+                    database.representative.name if database.representative else None
+                ),
+            }
+            for database in databases
+        ],
+    }
+    with open(
+        os.path.join(output_dir, FLEET_MANIFEST_NAME), "w", encoding="utf-8"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+
+
+def main(args):
+    """
+    Entry point of mssql-scripter fleet. Returns 1 when a database could not be scripted.
+    """
+    import sys
+
+    import mssqlscripter.argparser as parser
+    import mssqlscripter.mssqltoolsservice as mssqltoolsservice
+    import mssqlscripter.scripterlogging as scripterlogging
+
+    parameters = parser.parse_fleet_arguments(args)
+    connection_strings = list(parser.read_object_names(parameters.TargetsFile))
+    if not connection_strings:
+        sys.stderr.write(f"No connection strings in {parameters.TargetsFile}\n")
+        return 1
+
+    databases = []
+    for name, connection_string in zip(
+        get_database_names(connection_strings), connection_strings
+    ):
+        database_parameters = parser.parse_arguments(
+            [
+                "--connection-string",
+                connection_string,
+                *parameters.ScripterArguments,
+                "--file-per-object",
+                "-f",
+                os.path.join(parameters.OutputDirectory, name),
+                "--exclude-use-database",
+            ]
+        )
+        databases.append(FleetDatabase(name, connection_string, database_parameters))
+
+    scripterlogging.initialize_logger(
+        databases[0].parameters.LogLevel, databases[0].parameters.LogMode
+    )
+    sqltoolsservice_args = [mssqltoolsservice.get_executable_path()]
+    try:
+        worker = scripterworkers.ToolsServiceWorker(sqltoolsservice_args)
+        try:
+            workers = scripterworkers.start_workers(
+                worker, sqltoolsservice_args, min(parameters.Workers, len(databases))
+            )
+            try:
+                groups = script_fleet(
+                    databases, workers, parameters.SpotCheck, parameters.Link
+                )
+            finally:
+                scripterworkers.stop_workers(workers)
+        finally:
+            worker.close()
+
+        write_manifest(parameters.OutputDirectory, databases, groups)
+        counts = {}
+        for database in databases:
+            counts[database.status] = counts.get(database.status, 0) + 1
+        sys.stderr.write(
+            f"{len(databases)} databases in {len(groups)} groups: "
+            f"{counts.get(SCRIPTED, 0)} scripted, {counts.get(REUSED, 0)} reused"
+            f"{'' if parameters.SpotCheck else ' without verification'}, "
+            f"{counts.get(RESCRIPTED, 0)} rescripted after a spot check, {counts.get(FAILED, 0)} failed\n"
+        )
+        return 1 if counts.get(FAILED) else 0
+    finally:
+        scripterlogging.shutdown_logger()
@@ -5,6 +5,7 @@
 
 import copy
 import logging
+import sys
 
 from mssqlscripter.jsonrpc.contracts import Request
 
@@ -17,13 +18,23 @@ class ScriptingRequest(Request):
     """
 
     METHOD_NAME = "scripting/script"
+    PROGRESS_METHOD_NAME = "scripting/scriptProgressNotification"
+    CANCEL_METHOD_NAME = "scripting/scriptCancel"
+
+    # Phase marked on the timer when the first response of each type arrives.
+    RESPONSE_PHASES = {
+        "ScriptResponse": "script_response",
+        "ScriptPlanNotificationEvent": "plan_notification",
+        "ScriptCompleteEvent": "scripting",
+    }
 
-    def __init__(self, id, json_rpc_client, parameters):
+    def __init__(self, id, json_rpc_client, parameters, timer=None):
         """
         Create a scripting request command.
         """
         assert id != 0
         self.id = id
+        self.timer = timer
         self.finished = False
         self.json_rpc_client = json_rpc_client
         self.params = ScriptingParams(parameters)
@@ -34,12 +45,15 @@ class ScriptingRequest(Request):
         submit scripting request to sql tools service.
         """
         logger.info(
-            f"Submitting scripting request id: {self.id} with targetfile: {self.params.file_path}"
+            "Submitting scripting request id: %s with targetfile: %s",
+            self.id,
+            self.params.file_path,
         )
 
-        scrubbed_parameters = copy.deepcopy(self.params)
-        scrubbed_parameters.connection_string = "*********"
-        logger.debug(scrubbed_parameters.format())
+        if logger.isEnabledFor(logging.DEBUG):
+            scrubbed_parameters = copy.deepcopy(self.params)
+            scrubbed_parameters.connection_string = "*********"
+            logger.debug(scrubbed_parameters.format())
         self.json_rpc_client.submit_request(
             self.METHOD_NAME, self.params.format(), self.id
         )
@@ -53,11 +67,17 @@ class ScriptingRequest(Request):
             decoded_response = None
 
             if response:
-                logger.debug(response)
+                logger.debug("%s", response)
                 # Decode response to either response or event type.
                 decoded_response = self.decoder.decode_response(response)
 
-                logger.debug(f"Scripting request received response: {decoded_response}")
+                logger.debug(
+                    "Scripting request received response: %s", decoded_response
+                )
+                if self.timer:
+                    phase = self.RESPONSE_PHASES.get(type(decoded_response).__name__)
+                    if phase:
+                        self.timer.mark(phase)
                 if isinstance(decoded_response, ScriptCompleteEvent):
                     self.finished = True
                     self.json_rpc_client.request_finished(self.id)
@@ -68,7 +88,7 @@ class ScriptingRequest(Request):
             # Return a scripting error event.
             self.finished = True
             self.json_rpc_client.request_finished(self.id)
-            logger.debug(f"Scripting request received exception: {str(error)}")
+            logger.debug("Scripting request received exception: %s", error)
             exception = {
                 "operationId": self.id,
                 "sequenceNumber": None,
@@ -112,10 +132,15 @@ class ScriptingParams(object):
             parameters["ExcludeTypes"] if "ExcludeTypes" in parameters else None
         )
 
-        # List of scripting objects.
-        self.include_objects = ScriptingObjects(
+        # List of scripting objects, exact criteria such as those matched against a plan are used as is.
+        include_objects = (
             parameters["IncludeObjects"] if "IncludeObjects" in parameters else None
         )
+        self.include_objects = (
+            include_objects
+            if isinstance(include_objects, ScriptingObjects)
+            else ScriptingObjects(include_objects)
+        )
         self.exclude_objects = ScriptingObjects(
             parameters["ExcludeObjects"] if "ExcludeObjects" in parameters else None
         )
@@ -138,6 +163,82 @@ class ScriptingParams(object):
         }
 
 
+def parse_object_name(item):
+    """
+    Split an object name of the form schema.name into schema and name, schema is None without a schema.
+    Either part may be quoted with brackets or double quotes to contain dots, as in [Sales.Old].[Order.Lines].
+    A doubled closing quote inside a quoted part stands for the quote itself.
+    """
+    parts = []
+    current = []
+    position = 0
+    while position < len(item):
+        character = item[position]
+        closing_quote = {"[": "]", '"': '"'}.get(character)
+
+        if closing_quote and not current:
+            # Quoted part, read up to the closing quote that is not doubled.
+            quoted = []
+            position += 1
+            while position < len(item):
+                if item[position] == closing_quote:
+                    if item[position + 1 : position + 2] == closing_quote:
+                        quoted.append(closing_quote)
+                        position += 2
+                        continue
+                    break
+                quoted.append(item[position])
+                position += 1
+            else:
+                # Unterminated quote, treat the part literally.
+                current.append(character)
+                current.extend(quoted)
+                continue
+            current.extend(quoted)
+            position += 1
+            continue
+
+        if character == "." and not parts and position > 0:
+            # Only the first dot separates schema and name.
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(character)
+        position += 1
+
+    if parts:
+        return parts[0], "".join(current)
+    return None, "".join(current)
+
+
+def split_parameters(parameters, max_objects_per_request):
+    """
+    Split scripting parameters whose include object list is longer than max_objects_per_request into several
+    parameter sets, so no single request or server side filter gets too large. Later sets append to the file
+    of the first when scripting to a single file, without repeating its USE statement.
+    """
+    include_objects = parameters.get("IncludeObjects")
+    if (
+        not include_objects
+        or not max_objects_per_request
+        or len(include_objects) <= max_objects_per_request
+    ):
+        return [parameters]
+
+    split = []
+    for start in range(0, len(include_objects), max_objects_per_request):
+        request_parameters = dict(parameters)
+        request_parameters["IncludeObjects"] = include_objects[
+            start : start + max_objects_per_request
+        ]
+        if start and request_parameters.get("ScriptDestination") == "ToSingleFile":
+            request_parameters["AppendToFile"] = True
+            request_parameters["ScriptUseDatabase"] = False
+        split.append(request_parameters)
+
+    return split
+
+
 class ScriptingObjects(object):
     """
     Represent a database object via it's type, schema, and name.
@@ -145,24 +246,42 @@ class ScriptingObjects(object):
 
     def __init__(self, scripting_objects):
         self.list_of_objects = []
+        self.unique_objects = set()
         if scripting_objects:
             for item in scripting_objects:
-                index = item.find(".")
-                if index > 0:
-                    schema = item[0:index]
-                    name = item[index + 1 :]
-                else:
-                    schema = None
-                    name = item
+                schema, name = parse_object_name(item)
                 self.add_scripting_object(schema=schema, name=name)
 
     def add_scripting_object(self, script_type=None, schema=None, name=None):
         """
         Serialize scripting object into a JSON Scripting object.
         """
-        object_dict = {"Type": script_type, "Schema": schema, "Name": name}
+        key = (script_type, schema, name)
+        if key in self.unique_objects:
+            return
 
-        self.list_of_objects.append(object_dict)
+        self.unique_objects.add(key)
+        self.list_of_objects.append(
+            {"Type": script_type, "Schema": schema, "Name": name}
+        )
+
+    def __len__(self):
+        return len(self.list_of_objects)
+
+    def __getitem__(self, key):
+        """
+        Return the object dictionary at an index, or new ScriptingObjects for a slice.
+        """
+        if isinstance(key, slice):
+            scripting_objects = ScriptingObjects(None)
+            for scripting_object in self.list_of_objects[key]:
+                scripting_objects.add_scripting_object(
+                    script_type=scripting_object["Type"],
+                    schema=scripting_object["Schema"],
+                    name=scripting_object["Name"],
+                )
+            return scripting_objects
+        return self.list_of_objects[key]
 
     def format(self):
         return self.list_of_objects
@@ -273,7 +392,68 @@ class ScriptingOptions(object):
 #
 
 
+class ScriptingObject(object):
+    """
+    Database object reported by the scripting service via it's type, schema, and name.
+    A plan repeats the same few type and schema strings for every object, so those are interned.
+    """
+
+    __slots__ = ("type", "schema", "name")
+
+    def __init__(self, script_type=None, schema=None, name=None):
+        self.type = sys.intern(script_type) if script_type else script_type
+        self.schema = sys.intern(schema) if schema else schema
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, scripting_object):
+        """
+        Create from the JSON scripting object sent by the scripting service.
+        """
+        if scripting_object is None:
+            return None
+
+        return cls(
+            scripting_object.get("type"),
+            scripting_object.get("schema"),
+            scripting_object.get("name"),
+        )
+
+    def __getitem__(self, key):
+        """
+        Allow dictionary style access with the JSON key names for callers that used the raw objects.
+        """
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, ScriptingObject):
+            return NotImplemented
+        return (self.type, self.schema, self.name) == (
+            other.type,
+            other.schema,
+            other.name,
+        )
+
+    def __hash__(self):
+        return hash((self.type, self.schema, self.name))
+
+    def __repr__(self):
+        return f"ScriptingObject(type={self.type!r}, schema={self.schema!r}, name={self.name!r})"
+
+
 class ScriptCompleteEvent(object):
+    __slots__ = (
+        "operation_id",
+        "sequenceNumber",
+        "error_details",
+        "error_message",
+        "has_error",
+        "canceled",
+        "success",
+    )
+
     def __init__(self, params):
         self.operation_id = params["operationId"]
         self.sequenceNumber = params["sequenceNumber"]
@@ -285,24 +465,45 @@ class ScriptCompleteEvent(object):
 
 
 class ScriptPlanNotificationEvent(object):
+    __slots__ = ("operation_id", "sequenceNumber", "scripting_objects", "count")
+
     def __init__(self, params):
         self.operation_id = params["operationId"]
         self.sequenceNumber = params["sequenceNumber"]
-        self.scripting_objects = params["scriptingObjects"]
+        scripting_objects = params["scriptingObjects"]
+        if isinstance(scripting_objects, list):
+            self.scripting_objects = [
+                ScriptingObject.from_dict(scripting_object)
+                for scripting_object in scripting_objects
+            ]
+        else:
+            # Large plans are parsed incrementally by the reader straight into a PlanCatalog.
+            self.scripting_objects = scripting_objects
         self.count = params["count"]
 
 
 class ScriptProgressNotificationEvent(object):
+    __slots__ = (
+        "operation_id",
+        "sequenceNumber",
+        "scripting_object",
+        "status",
+        "completed_count",
+        "total_count",
+    )
+
     def __init__(self, params):
         self.operation_id = params["operationId"]
         self.sequenceNumber = params["sequenceNumber"]
-        self.scripting_object = params["scriptingObject"]
+        self.scripting_object = ScriptingObject.from_dict(params["scriptingObject"])
         self.status = params["status"]
         self.completed_count = params["completedCount"]
         self.total_count = params["totalCount"]
 
 
 class ScriptResponse(object):
+    __slots__ = ("operation_id",)
+
     def __init__(self, params):
         self.operation_id = params["operationId"]
 
@@ -335,6 +536,6 @@ class ScriptingResponseDecoder(object):
             # Handle response received.
             return self.response_dispatcher["id"](obj["result"])
 
-        logger.debug(f"Unable to decode response to a event type: {obj}")
+        logger.debug("Unable to decode response to a event type: %s", obj)
         # Unable to decode, return json string.
         return obj
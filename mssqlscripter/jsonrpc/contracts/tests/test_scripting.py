@@ -4,8 +4,10 @@
 # --------------------------------------------------------------------------------------------
 
 import io
+import json
 import os
 import time
+import tracemalloc
 import unittest
 
 import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
@@ -73,6 +75,59 @@ class ScriptingRequestTests(unittest.TestCase):
         self.assertEqual(scripting_object_2["Name"], "table2")
         self.assertEqual(scripting_object_2["Type"], None)
 
+    def test_scripting_criteria_quoted_names(self):
+        """
+        Verify quoted object names may contain dots and duplicate objects are dropped.
+        """
+        self.assertEqual(
+            scripting.parse_object_name("[Sales.Old].[Order.Lines]"),
+            ("Sales.Old", "Order.Lines"),
+        )
+        self.assertEqual(scripting.parse_object_name('"dbo"."a""b"'), ("dbo", 'a"b'))
+        self.assertEqual(scripting.parse_object_name("[a]]b].c"), ("a]b", "c"))
+        self.assertEqual(scripting.parse_object_name("dbo."), ("dbo", ""))
+        self.assertEqual(scripting.parse_object_name("table2"), (None, "table2"))
+
+        include_criteria = scripting.ScriptingObjects(
+            ["dbo.t1", "[dbo].[t1]", "t1", "dbo.t1"]
+        )
+        self.assertEqual(
+            include_criteria.format(),
+            [
+                {"Type": None, "Schema": "dbo", "Name": "t1"},
+                {"Type": None, "Schema": None, "Name": "t1"},
+            ],
+        )
+
+    def test_split_parameters(self):
+        """
+        Verify long include object lists are split and later requests append to the single file.
+        """
+        parameters = {
+            "IncludeObjects": [f"dbo.t{i}" for i in range(5)],
+            "ScriptDestination": "ToSingleFile",
+            "AppendToFile": False,
+        }
+        self.assertEqual(scripting.split_parameters(parameters, 0), [parameters])
+        self.assertEqual(scripting.split_parameters(parameters, 5), [parameters])
+
+        split = scripting.split_parameters(parameters, 2)
+        self.assertEqual(
+            [request["IncludeObjects"] for request in split],
+            [["dbo.t0", "dbo.t1"], ["dbo.t2", "dbo.t3"], ["dbo.t4"]],
+        )
+        self.assertEqual(
+            [request["AppendToFile"] for request in split], [False, True, True]
+        )
+        self.assertEqual(
+            [request.get("ScriptUseDatabase", True) for request in split],
+            [True, False, False],
+        )
+
+        parameters["ScriptDestination"] = "ToFilePerObject"
+        split = scripting.split_parameters(parameters, 2)
+        self.assertFalse(any(request["AppendToFile"] for request in split))
+
     def test_scripting_response_decoder(self):
         complete_event = {
             "jsonrpc": "2.0",
@@ -128,6 +183,62 @@ class ScriptingRequestTests(unittest.TestCase):
         self.assertIsNotNone(progress_notification_decoded)
         self.assertIsNotNone(plan_notification_decoded)
 
+    def test_scripting_object_compact(self):
+        """
+        Verify scripting objects share type and schema strings and keep dictionary style access.
+        """
+        raw_objects = json.loads(
+            '[{"type": "Table", "schema": "Sales", "name": "Store"},'
+            ' {"type": "Table", "schema": "Sales", "name": "Customer"}]'
+        )
+        first, second = [
+            scripting.ScriptingObject.from_dict(raw_object)
+            for raw_object in raw_objects
+        ]
+
+        self.assertIsNot(raw_objects[0]["type"], raw_objects[1]["type"])
+        self.assertIs(first.type, second.type)
+        self.assertIs(first.schema, second.schema)
+        self.assertEqual(first["name"], "Store")
+        self.assertFalse(hasattr(first, "__dict__"))
+        with self.assertRaises(KeyError):
+            first["definition"]
+
+    def test_plan_notification_memory(self):
+        """
+        Memory benchmark: a decoded synthetic large plan should take far less memory than the raw JSON objects.
+        """
+        object_count = 100000
+        plan_json = json.dumps(
+            {
+                "operationId": "e18b9538-a7ff-4502-9c33-ac63ed42e5a5",
+                "sequenceNumber": 1,
+                "count": object_count,
+                "scriptingObjects": [
+                    {
+                        "type": ["Table", "View", "StoredProcedure"][index % 3],
+                        "schema": f"schema{index % 20}",
+                        "name": f"object_name_{index}",
+                    }
+                    for index in range(object_count)
+                ],
+            }
+        )
+
+        tracemalloc.start()
+        try:
+            raw_plan = json.loads(plan_json)
+            raw_size, _ = tracemalloc.get_traced_memory()
+
+            plan_event = scripting.ScriptPlanNotificationEvent(raw_plan)
+            del raw_plan
+            compact_size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(len(plan_event.scripting_objects), object_count)
+        self.assertLess(compact_size, raw_size * 0.6)
+
     def test_scripting_response_decoder_invalid(self):
         """
         Verify decode invalid response.
@@ -2,11 +2,13 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import collections
 import enum
 import json
 import logging
+import re
 import threading
-from queue import Queue
+from queue import Empty, Queue
 
 logger = logging.getLogger("mssqlscripter.jsonrpc.jsonrpcclient")
 
@@ -19,17 +21,53 @@ class JsonRpcClient(object):
     REQUEST_THREAD_NAME = "Json_Rpc_Request_Thread"
     RESPONSE_THREAD_NAME = "Json_Rpc_Response_Thread"
 
-    def __init__(self, in_stream, out_stream):
+    def __init__(
+        self,
+        in_stream,
+        out_stream,
+        streamed_arrays=None,
+        max_queue_size=0,
+        coalesced_methods=None,
+        coalesced_statuses=None,
+    ):
+        """
+        streamed_arrays optionally maps JSON array keys to sink factories, see JsonRpcReader.
+        max_queue_size bounds each response queue, 0 means unbounded. When a queue is full, events whose method
+        is in coalesced_methods, and whose status is in coalesced_statuses if given, replace the previous queued
+        event of the same operation that could be coalesced too. Anything else waits for the main thread to
+        catch up.
+        """
         self.writer = JsonRpcWriter(in_stream)
-        self.reader = JsonRpcReader(out_stream)
+        self.reader = JsonRpcReader(out_stream, streamed_arrays=streamed_arrays)
+
+        self.max_queue_size = max_queue_size
+        self.coalesced_methods = frozenset(coalesced_methods or [])
+        self.coalesced_statuses = (
+            frozenset(coalesced_statuses) if coalesced_statuses is not None else None
+        )
 
         self.request_queue = Queue()
         # Response map intialized with event queue.
-        self.response_map = {0: Queue()}
+        self.response_map = {0: self._create_response_queue()}
         self.exception_queue = Queue()
 
         self.cancel = False
 
+    def _create_response_queue(self):
+        return CoalescingQueue(
+            self.max_queue_size, self.coalesced_methods, self.coalesced_statuses
+        )
+
+    def get_queue_metrics(self):
+        """
+        Return the number of coalesced events and the deepest the event queue has been.
+        """
+        event_queue = self.response_map[0]
+        return {
+            "coalesced_count": event_queue.coalesced_count,
+            "max_depth": event_queue.max_depth,
+        }
+
     def start(self):
         """
         Starts the background threads to listen for responses and requests from the underlying
@@ -63,9 +101,16 @@ class JsonRpcClient(object):
         Remove request id response entry.
         """
         if id in self.response_map:
-            logger.debug(f"Request with id: {id} has completed.")
+            logger.debug("Request with id: %s has completed.", id)
             del self.response_map[id]
 
+    def has_response(self, id):
+        """
+        Return whether a response to request id is waiting, without taking it or any event.
+        """
+        response_queue = self.response_map.get(id)
+        return response_queue is not None and not response_queue.empty()
+
     def get_response(self, id=0):
         """
         Get latest response. Priority order: Response, Event, Exception.
@@ -78,6 +123,12 @@ class JsonRpcClient(object):
             return self.response_map[0].get()
 
         if not self.exception_queue.empty():
+            # The response thread queues its last responses before recording the exception, which may have
+            # happened after the checks above.
+            for queue_id in (id, 0):
+                response_queue = self.response_map.get(queue_id)
+                if response_queue is not None and not response_queue.empty():
+                    return response_queue.get()
             raise self.exception_queue.get()
 
         return None
@@ -127,7 +178,7 @@ class JsonRpcClient(object):
                     # we have a id, map it with a new queue if it doesn't
                     # exist.
                     if response_id not in self.response_map:
-                        self.response_map[response_id] = Queue()
+                        self.response_map[response_id] = self._create_response_queue()
                     # Enqueue the response.
                     self.response_map[response_id].put(response)
                 else:
@@ -155,7 +206,7 @@ class JsonRpcClient(object):
         """
         Record exception to allow main thread to access.
         """
-        logger.debug(f"Thread: {thread_name} encountered exception {ex}")
+        logger.debug("Thread: %s encountered exception %s", thread_name, ex)
         self.exception_queue.put(ex)
 
     def shutdown(self):
@@ -166,18 +217,116 @@ class JsonRpcClient(object):
         # Enqueue None to optimistically unblock background threads so
         # they can check for the cancellation flag.
         self.request_queue.put(None)
+        # Release the response thread if it is waiting for room in a full queue.
+        for response_queue in list(self.response_map.values()):
+            response_queue.close()
 
         # Wait for request thread to finish with a timeout in seconds.
         self.request_thread.join(1)
 
         # close the underlying writer.
         self.writer.close()
-        logger.info("Shutting down Json rpc client.")
+        logger.info(
+            "Shutting down Json rpc client. Event queue coalesced_count=%s max_depth=%s",
+            self.response_map[0].coalesced_count,
+            self.response_map[0].max_depth,
+        )
+
+
+class CoalescingQueue(object):
+    """
+    Bounded queue of json rpc messages that applies backpressure to the response thread.
+
+    When the queue is full, an event whose method is coalesced, and whose status is coalesced if coalesced_statuses
+    is given, replaces the last queued message if that is such an event of the same method and operation, so a
+    slow consumer only sees the latest progress. Any other message waits for room, so plans, completions and
+    errors are never dropped.
+    """
+
+    def __init__(
+        self, maxsize=0, coalesced_methods=frozenset(), coalesced_statuses=None
+    ):
+        self.maxsize = maxsize
+        self.coalesced_methods = coalesced_methods
+        self.coalesced_statuses = coalesced_statuses
+        self.items = collections.deque()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Metrics.
+        self.coalesced_count = 0
+        self.max_depth = 0
+
+    def _coalesce_key(self, message):
+        method = message.get("method") if isinstance(message, dict) else None
+        if method not in self.coalesced_methods:
+            return None
+        params = message.get("params") or {}
+        if (
+            self.coalesced_statuses is not None
+            and params.get("status") not in self.coalesced_statuses
+        ):
+            return None
+        return (method, params.get("operationId"))
+
+    def put(self, message):
+        """
+        Enqueue message, coalescing or blocking while the queue is full.
+        """
+        with self.condition:
+            if self.maxsize and len(self.items) >= self.maxsize:
+                coalesce_key = self._coalesce_key(message)
+                if coalesce_key and self._coalesce_key(self.items[-1]) == coalesce_key:
+                    self.items[-1] = message
+                    self.coalesced_count += 1
+                    return
+
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.condition.wait()
+
+            if self.closed:
+                return
+
+            self.items.append(message)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.condition.notify_all()
+
+    def get(self, block=True, timeout=None):
+        """
+        Dequeue the oldest message.
+        Exceptions raised:
+            queue.Empty
+                No message arrived within timeout, or immediately when block is False.
+        """
+        with self.condition:
+            if block and not self.condition.wait_for(lambda: self.items, timeout):
+                raise Empty
+            if not self.items:
+                raise Empty
+
+            message = self.items.popleft()
+            self.condition.notify_all()
+            return message
+
+    def empty(self):
+        return not self.items
+
+    def qsize(self):
+        return len(self.items)
+
+    def close(self):
+        """
+        Stop accepting messages and release any producer waiting for room.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
 
 
 class ReadState(enum.Enum):
     Header = 1
     Content = 2
+    StreamedContent = 3
 
 
 class JsonRpcWriter(object):
@@ -209,7 +358,7 @@ class JsonRpcWriter(object):
             self.stream.flush()
 
         except ValueError as ex:
-            logger.debug(f"Send Request encountered exception {ex}")
+            logger.debug("Send Request encountered exception %s", ex)
             raise
 
     def close(self):
@@ -232,9 +381,27 @@ class JsonRpcReader(object):
     LF = 10
     BUFFER_RESIZE_TRIGGER = 0.25
     DEFAULT_BUFFER_SIZE = 8192
-
-    def __init__(self, stream, encoding=None):
+    # Bodies at least this large are parsed incrementally when they contain a streamed array.
+    STREAMING_THRESHOLD = 1024 * 1024
+
+    def __init__(
+        self,
+        stream,
+        encoding=None,
+        streamed_arrays=None,
+        streaming_threshold=STREAMING_THRESHOLD,
+    ):
+        """
+        streamed_arrays optionally maps JSON array keys to factories of sinks with an append_item(item) method.
+        Large bodies containing one of those arrays are parsed as they arrive, each array item is handed to the
+        sink and the sink takes the place of the array in the returned message, so the body is never buffered
+        whole.
+        """
         self.encoding = encoding or "UTF-8"
+        self.streamed_arrays = streamed_arrays
+        self.streaming_threshold = streaming_threshold
+        self.array_parser = None
+        self.content_remaining = 0
 
         self.stream = stream
         self.buffer = bytearray(self.DEFAULT_BUFFER_SIZE)
@@ -274,16 +441,25 @@ class JsonRpcReader(object):
                 ):
                     self.needs_more_data = True
                     continue
+                if (
+                    self.read_state is ReadState.StreamedContent
+                    and not self.try_read_streamed_content(content)
+                ):
+                    self.needs_more_data = True
+                    continue
                 # We have the  content
                 break
 
             # Resize buffer and remove bytes we have read
             self.trim_buffer_and_resize(self.read_offset)
+            if isinstance(content[0], dict):
+                # Streamed content is already parsed.
+                return content[0]
             return json.loads(content[0])
         except ValueError as ex:
             # response has invalid json object.
             logger.debug(
-                f"JSON RPC Reader on read_response() encountered exception: {ex}"
+                "JSON RPC Reader on read_response() encountered exception: %s", ex
             )
             raise
 
@@ -322,7 +498,7 @@ class JsonRpcReader(object):
             return True
         except ValueError as ex:
             logger.debug(
-                f"JSON RPC Reader on read_next_chunk encountered exception: {ex}"
+                "JSON RPC Reader on read_next_chunk encountered exception: %s", ex
             )
             # Stream was closed.
             raise
@@ -384,7 +560,16 @@ class JsonRpcReader(object):
 
         # Pushing read pointer past the newline characters.
         self.read_offset = scan_offset + 4
-        self.read_state = ReadState.Content
+        if (
+            self.streamed_arrays
+            and self.expected_content_length >= self.streaming_threshold
+            and self.encoding.lower().replace("-", "") == "utf8"
+        ):
+            self.array_parser = StreamedArrayParser(self.streamed_arrays)
+            self.content_remaining = self.expected_content_length
+            self.read_state = ReadState.StreamedContent
+        else:
+            self.read_state = ReadState.Content
 
         return True
 
@@ -405,6 +590,35 @@ class JsonRpcReader(object):
 
         return True
 
+    def try_read_streamed_content(self, content):
+        """
+        Parse as much of a streamed body as is buffered and drop the parsed bytes from the buffer.
+        """
+        content_end = self.read_offset + self.content_remaining
+        available_end = min(self.buffer_end_offset, content_end)
+        parsed_offset = self.array_parser.feed(
+            self.buffer, self.read_offset, available_end, available_end == content_end
+        )
+
+        if parsed_offset is None:
+            # The body does not contain a streamed array, buffer it whole instead.
+            self.array_parser = None
+            self.read_state = ReadState.Content
+            return self.try_read_content(content)
+
+        self.content_remaining -= parsed_offset - self.read_offset
+        self.read_offset = parsed_offset
+
+        if not self.content_remaining:
+            content[0] = self.array_parser.finish()
+            self.array_parser = None
+            self.read_state = ReadState.Header
+            return True
+
+        # Only the unparsed tail of the body is kept buffered.
+        self.trim_buffer_and_resize(self.read_offset)
+        return False
+
     def trim_buffer_and_resize(self, bytes_to_remove):
         """
         Trim the buffer by the passed in bytes_to_remove by creating a new buffer that is at a minimum the default max size.
@@ -437,3 +651,148 @@ class JsonRpcReader(object):
             self.stream.close()
         except AttributeError:
             pass
+
+
+class StreamedArrayParser(object):
+    """
+    Incrementally parse a UTF-8 JSON body that contains one large array of flat JSON objects, such as the
+    scriptingObjects of a scripting plan notification.
+
+    The array must start within the first MAX_PREFIX_LENGTH bytes of the body. Array items are parsed one at a
+    time straight out of the reader's buffer and appended to a sink, everything around the array is kept and
+    parsed once the body ends, with the sink in place of the array.
+    """
+
+    # How far into the body the streamed array may start.
+    MAX_PREFIX_LENGTH = 4096
+    # Longest array item accepted, protects against items that are not flat objects.
+    MAX_ITEM_LENGTH = 1024 * 1024
+
+    STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+    # A string or a run of characters outside of strings.
+    TOKEN_PATTERN = re.compile(STRING + rb'|[^"]+', re.DOTALL)
+    # A run of JSON objects without nested objects and their separators, strings may contain braces.
+    ITEMS_PATTERN = re.compile(
+        rb"(?:\{(?:[^{}\"]|" + STRING + rb")*\}[\s,]*)+", re.DOTALL
+    )
+    SEPARATOR_PATTERN = re.compile(rb"[\s,]*")
+    SEPARATOR_CHARACTERS = b" \t\r\n,"
+    ARRAY_END = ord("]")
+
+    def __init__(self, streamed_arrays):
+        self.streamed_arrays = streamed_arrays
+        self.key_pattern = re.compile(
+            rb'"('
+            + b"|".join(re.escape(key.encode("utf-8")) for key in streamed_arrays)
+            + rb')"\s*:\s*\['
+        )
+        # Everything in the body except the streamed array items.
+        self.skeleton = bytearray()
+        self.key = None
+        self.sink = None
+        self.in_array = False
+
+    def feed(self, data, start, end, final):
+        """
+        Parse data[start:end], final is set when end is the end of the body.
+        Returns the offset parsed up to, or None if the body does not contain a streamed array.
+        Exceptions raised:
+            ValueError
+                The array contains an item that is not a flat JSON object or the body ended inside the array.
+        """
+        if self.key is None:
+            start = self._find_array(data, start, end, final)
+            if start is None:
+                return None
+            if self.key is None:
+                # Not enough of the prefix buffered yet.
+                return start
+
+        if self.in_array:
+            start = self._parse_items(data, start, end, final)
+
+        if not self.in_array:
+            # After the array, keep the rest of the body.
+            self.skeleton += data[start:end]
+            start = end
+
+        return start
+
+    def _find_array(self, data, start, end, final):
+        """
+        Scan the body prefix token by token for the streamed array key, skipping over strings.
+        """
+        position = start
+        while position < end:
+            key_match = self.key_pattern.match(data, position, end)
+            if key_match:
+                self.key = key_match.group(1).decode("utf-8")
+                self.sink = self.streamed_arrays[self.key]()
+                self.in_array = True
+                self.skeleton += data[start : key_match.end()]
+                return key_match.end()
+
+            token = self.TOKEN_PATTERN.match(data, position, end)
+            if not token or token.end() == end:
+                # Incomplete string or key at the end of the buffered data.
+                break
+            position = token.end()
+
+        if final or end - start >= self.MAX_PREFIX_LENGTH:
+            return None
+        return start
+
+    def _parse_items(self, data, start, end, final):
+        """
+        Hand every complete array item to the sink, returns the offset of the first unparsed byte.
+        """
+        position = start
+        while True:
+            position = self.SEPARATOR_PATTERN.match(data, position, end).end()
+            if position >= end:
+                break
+
+            if data[position] == self.ARRAY_END:
+                self.in_array = False
+                break
+
+            items = self.ITEMS_PATTERN.match(data, position, end)
+            if not items:
+                if final or end - position > self.MAX_ITEM_LENGTH:
+                    raise ValueError(
+                        f"Unable to parse item of streamed array {self.key} at offset {position}."
+                    )
+                # Partial item, wait for more data.
+                break
+
+            # Decode every complete item buffered with a single json call.
+            for item in json.loads(
+                b"["
+                + data[position : items.end()].rstrip(self.SEPARATOR_CHARACTERS)
+                + b"]"
+            ):
+                self.sink.append_item(item)
+            position = items.end()
+
+        if final and self.in_array:
+            raise ValueError(f"Body ended inside streamed array {self.key}.")
+
+        return position
+
+    def finish(self):
+        """
+        Parse the body without the array items and put the sink in the array's place.
+        """
+        message = json.loads(bytes(self.skeleton))
+        self._attach_sink(message)
+        return message
+
+    def _attach_sink(self, value):
+        if isinstance(value, dict):
+            if value.get(self.key) == []:
+                value[self.key] = self.sink
+                return True
+            return any(self._attach_sink(child) for child in value.values())
+        if isinstance(value, list):
+            return any(self._attach_sink(child) for child in value)
+        return False
@@ -4,11 +4,69 @@
 # --------------------------------------------------------------------------------------------
 
 import io
+import json
+import tracemalloc
 import unittest
 
 import mssqlscripter.jsonrpc.jsonrpcclient as jsonrpc
 
 
+class ChunkedStream(io.RawIOBase):
+    """
+    Stream that returns at most chunk_size bytes per read, like a pipe delivering a large body piecemeal.
+    """
+
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.offset = 0
+        self.chunk_size = chunk_size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.data[self.offset : self.offset + min(self.chunk_size, len(buffer))]
+        buffer[: len(chunk)] = chunk
+        self.offset += len(chunk)
+        return len(chunk)
+
+
+class ItemSink(list):
+    """
+    Streamed array sink collecting the items.
+    """
+
+    def append_item(self, item):
+        self.append(item)
+
+
+class CountingSink(object):
+    """
+    Streamed array sink that only counts items.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def append_item(self, item):
+        self.count += 1
+
+
+def create_plan_message(scripting_objects):
+    body = json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "method": "scripting/scriptPlanNotification",
+            "params": {
+                "operationId": "e18b9538-a7ff-4502-9c33-ac63ed42e5a5",
+                "scriptingObjects": scripting_objects,
+                "count": len(scripting_objects),
+            },
+        }
+    ).encode("utf-8")
+    return b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
 class JsonRpcTest(unittest.TestCase):
     """
     Json Rpc tests.
@@ -229,6 +287,89 @@ class JsonRpcTest(unittest.TestCase):
         baseline = {"key": "value"}
         self.assertEqual(response, baseline)
 
+    def test_streamed_array(self):
+        """
+        Verify a large array is parsed item by item across arbitrary chunk boundaries.
+        """
+        scripting_objects = [
+            {"type": "Table", "schema": 'odd}{"schema', "name": f"t\u00e9ble [{index}]"}
+            for index in range(20)
+        ]
+        message = create_plan_message(scripting_objects)
+        small_message = b'Content-Length: 15\r\n\r\n{"key":"value"}'
+
+        for chunk_size in [1, 7, 64, 100000]:
+            json_rpc_reader = jsonrpc.JsonRpcReader(
+                ChunkedStream(message + small_message + message, chunk_size),
+                streamed_arrays={"scriptingObjects": ItemSink},
+                streaming_threshold=0,
+            )
+            for expected in ["plan", "small", "plan"]:
+                response = json_rpc_reader.read_response()
+                if expected == "small":
+                    # Bodies without the array fall back to being buffered whole.
+                    self.assertEqual(response, {"key": "value"})
+                    continue
+
+                params = response["params"]
+                self.assertIsInstance(params["scriptingObjects"], ItemSink)
+                self.assertEqual(params["scriptingObjects"], scripting_objects)
+                self.assertEqual(params["count"], 20)
+                self.assertEqual(
+                    params["operationId"], "e18b9538-a7ff-4502-9c33-ac63ed42e5a5"
+                )
+
+    def test_streamed_array_below_threshold(self):
+        """
+        Verify bodies below the streaming threshold are parsed as before.
+        """
+        scripting_objects = [{"type": "Table", "schema": "dbo", "name": "t"}]
+        json_rpc_reader = jsonrpc.JsonRpcReader(
+            io.BytesIO(create_plan_message(scripting_objects)),
+            streamed_arrays={"scriptingObjects": ItemSink},
+        )
+        response = json_rpc_reader.read_response()
+        self.assertEqual(response["params"]["scriptingObjects"], scripting_objects)
+        self.assertNotIsInstance(response["params"]["scriptingObjects"], ItemSink)
+
+    def test_streamed_array_invalid_item(self):
+        """
+        Verify nested array items are rejected.
+        """
+        json_rpc_reader = jsonrpc.JsonRpcReader(
+            io.BytesIO(create_plan_message([{"type": {"nested": True}}])),
+            streamed_arrays={"scriptingObjects": ItemSink},
+            streaming_threshold=0,
+        )
+        with self.assertRaises(ValueError):
+            json_rpc_reader.read_response()
+
+    def test_streamed_array_peak_memory(self):
+        """
+        Memory benchmark: streaming a large plan keeps only a small part of the body in memory at once.
+        """
+        scripting_objects = [
+            {"type": "Table", "schema": f"schema{index % 20}", "name": f"name_{index}"}
+            for index in range(50000)
+        ]
+        message = create_plan_message(scripting_objects)
+        del scripting_objects
+
+        tracemalloc.start()
+        try:
+            json_rpc_reader = jsonrpc.JsonRpcReader(
+                io.BytesIO(message),
+                streamed_arrays={"scriptingObjects": CountingSink},
+            )
+            response = json_rpc_reader.read_response()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response["params"]["scriptingObjects"].count, 50000)
+        # The message is allocated before tracing starts, the reader should add only a fraction of its size.
+        self.assertLess(peak, len(message) * 0.25)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,6 +4,8 @@
 # --------------------------------------------------------------------------------------------
 
 import io
+import json
+import threading
 import time
 import unittest
 
@@ -205,6 +207,134 @@ class JsonRpcClientTests(unittest.TestCase):
             test_client.shutdown()
             self.assertFalse(test_client.request_thread.is_alive())
 
+    def test_progress_coalesced_when_queue_full(self):
+        """
+        Verify progress events collapse to the latest one of each operation once the event queue is full, while
+        other events are all delivered.
+        """
+        events = [self.create_event("scripting/scriptPlanNotification", 1)]
+        events += [
+            self.create_event("scripting/scriptProgressNotification", 1, index)
+            for index in range(50)
+        ]
+        events.append(self.create_event("scripting/scriptComplete", 1))
+        output_stream = io.BytesIO(b"".join(events))
+
+        test_client = json_rpc_client.JsonRpcClient(
+            io.BytesIO(),
+            output_stream,
+            max_queue_size=5,
+            coalesced_methods=["scripting/scriptProgressNotification"],
+        )
+        test_client.start()
+        # Let the response thread fill the queue while nothing consumes it.
+        time.sleep(0.5)
+
+        received = []
+        while True:
+            try:
+                response = test_client.get_response()
+            except EOFError:
+                break
+            if response:
+                received.append(response)
+
+        methods = [response["method"] for response in received]
+        self.assertEqual(methods[0], "scripting/scriptPlanNotification")
+        self.assertEqual(methods[-1], "scripting/scriptComplete")
+        # The latest progress always survives.
+        self.assertEqual(received[-2]["params"]["completedCount"], 49)
+
+        metrics = test_client.get_queue_metrics()
+        self.assertEqual(metrics["max_depth"], 5)
+        self.assertEqual(metrics["coalesced_count"], 50 + 2 - len(received))
+        self.assertGreater(metrics["coalesced_count"], 0)
+        self.shutdown_background_threads(test_client)
+
+    def test_completed_progress_never_coalesced(self):
+        """
+        Verify only progress of objects in progress is coalesced, progress completing an object is never dropped.
+        """
+        queue = json_rpc_client.CoalescingQueue(
+            1,
+            frozenset(["scripting/scriptProgressNotification"]),
+            frozenset(["Progress"]),
+        )
+
+        def progress(status, count):
+            return {
+                "method": "scripting/scriptProgressNotification",
+                "params": {"operationId": 1, "status": status, "completedCount": count},
+            }
+
+        queue.put(progress("Progress", 0))
+        queue.put(progress("Progress", 1))
+        self.assertEqual(queue.coalesced_count, 1)
+
+        # A completing event does not replace the queued progress, it waits for room.
+        producer = threading.Thread(target=queue.put, args=(progress("Completed", 2),))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(queue.get(), progress("Progress", 1))
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+        # Nor is a queued completing event replaced by later progress.
+        producer = threading.Thread(target=queue.put, args=(progress("Progress", 3),))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(queue.get(), progress("Completed", 2))
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(queue.get(), progress("Progress", 3))
+        self.assertEqual(queue.coalesced_count, 1)
+
+    def test_coalescing_queue_backpressure(self):
+        """
+        Verify messages that can not be coalesced wait for room and close releases a waiting producer.
+        """
+        queue = json_rpc_client.CoalescingQueue(
+            1, frozenset(["scripting/scriptProgressNotification"])
+        )
+        queue.put({"method": "scripting/scriptPlanNotification", "params": {}})
+
+        producer = threading.Thread(
+            target=queue.put,
+            args=({"method": "scripting/scriptComplete", "params": {}},),
+        )
+        producer.start()
+        producer.join(0.2)
+        # Full queue, the producer waits.
+        self.assertTrue(producer.is_alive())
+
+        self.assertEqual(queue.get()["method"], "scripting/scriptPlanNotification")
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(queue.get()["method"], "scripting/scriptComplete")
+
+        queue.put({"method": "scripting/scriptPlanNotification", "params": {}})
+        producer = threading.Thread(
+            target=queue.put,
+            args=({"method": "scripting/scriptComplete", "params": {}},),
+        )
+        producer.start()
+        queue.close()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(queue.qsize(), 1)
+
+    def create_event(self, method, operation_id, completed_count=None):
+        """
+        Helper to create a framed json rpc event.
+        """
+        params = {"operationId": operation_id}
+        if completed_count is not None:
+            params["completedCount"] = completed_count
+        body = json.dumps({"jsonrpc": "2.0", "method": method, "params": params})
+        return f"Content-Length: {len(body)}\r\n\r\n{body}".encode("ascii")
+
     @unittest.skip("Disabling until scenario is valid")
     def test_stream_has_no_response(self):
         """
@@ -0,0 +1,186 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import os
+import re
+import time
+
+import mssqlscripter.argparser as argparser
+import mssqlscripter.filelock as filelock
+import mssqlscripter.scripterlogging as scripterlogging
+
+logger = logging.getLogger("mssqlscripter.loadgovernor")
+
+# Objects scripted before the per object latency of a server is taken as its baseline.
+WARMUP_OBJECTS = 20
+# Weight of the latest latency in the moving average.
+LATENCY_SMOOTHING = 0.2
+# Latency over this multiple of the baseline counts as degraded.
+DEGRADATION_FACTOR = 2.0
+MIN_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+def get_config_governor_dir():
+    """
+    Retrieve the directory holding the per server semaphore and rate files, create it if it doesn't exist.
+    """
+    governor_dir = os.path.join(scripterlogging.get_config_log_dir(), "governor")
+    if not os.path.exists(governor_dir):
+        os.makedirs(governor_dir, exist_ok=True)
+    return governor_dir
+
+
+def get_server_key(connection_string):
+    """
+    Return a file name safe key of the server a connection string connects to.
+    """
+    server = argparser.get_connection_target(connection_string).get("Server", "")
+    digest = hashlib.sha1(server.encode("utf-8")).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', server)[:64]}-{digest}"
+
+
+class LatencyTracker(object):
+    """
+    Moving average of per object scripting latency from progress events, compared against a warm up baseline.
+    """
+
+    def __init__(self):
+        self.baseline = None
+        self.average = None
+        self.objects = 0
+        self.last_count = None
+        self.last_time = None
+
+    def reset_request(self):
+        """
+        Start measuring a new request, whose completed counts start over.
+        """
+        self.last_count = None
+        self.last_time = None
+
+    def record_progress(self, completed_count, now=None):
+        now = time.monotonic() if now is None else now
+        if self.last_count is not None and completed_count > self.last_count:
+            # Coalesced progress events can cover several objects.
+            objects = completed_count - self.last_count
+            latency = (now - self.last_time) / objects
+            if self.average is None:
+                self.average = latency
+            else:
+                self.average += LATENCY_SMOOTHING * (latency - self.average)
+            self.objects += objects
+            if self.baseline is None and self.objects >= WARMUP_OBJECTS:
+                self.baseline = self.average
+                logger.info("Baseline object latency %.3f seconds", self.baseline)
+
+        if self.last_count is None or completed_count > self.last_count:
+            self.last_count = completed_count
+            self.last_time = now
+
+    @property
+    def degraded(self):
+        return (
+            self.baseline is not None
+            and self.average > self.baseline * DEGRADATION_FACTOR
+        )
+
+
+class LoadGovernor(object):
+    """
+    Limit the load scripting puts on a source server, across all scripter processes on this machine.
+
+    At most max_concurrent scripting requests run against a server at once, held through a FileSemaphore. With
+    max_rate, requests against a server start at most max_rate times per second. With adaptive backoff, a request
+    waits before starting while the per object latency seen in progress events is degraded against its warm up
+    baseline, doubling the wait each time it stays degraded.
+    """
+
+    def __init__(
+        self,
+        connection_string,
+        max_concurrent=0,
+        max_rate=0,
+        adaptive_backoff=False,
+        governor_dir=None,
+    ):
+        self.governor_dir = governor_dir or get_config_governor_dir()
+        self.server_key = get_server_key(connection_string)
+        self.semaphore = (
+            filelock.FileSemaphore(self.governor_dir, self.server_key, max_concurrent)
+            if max_concurrent
+            else None
+        )
+        self.min_interval = 1.0 / max_rate if max_rate else 0
+        self.rate_lock = filelock.FileLock(
+            os.path.join(self.governor_dir, self.server_key + ".rate.lock")
+        )
+        self.rate_path = os.path.join(self.governor_dir, self.server_key + ".rate")
+        self.latency = LatencyTracker() if adaptive_backoff else None
+        self.backoff = 0
+
+    def before_request(self):
+        """
+        Wait until a scripting request may start against the server.
+        """
+        if self.latency:
+            if self.latency.degraded:
+                self.backoff = min(
+                    max(self.backoff * 2, MIN_BACKOFF_SECONDS), MAX_BACKOFF_SECONDS
+                )
+                logger.info(
+                    "Object latency %.3f seconds is degraded against %.3f, backing off %.1f seconds",
+                    self.latency.average,
+                    self.latency.baseline,
+                    self.backoff,
+                )
+                time.sleep(self.backoff)
+            else:
+                self.backoff = 0
+            self.latency.reset_request()
+
+        if self.semaphore:
+            started = time.monotonic()
+            self.semaphore.acquire()
+            logger.info(
+                "Acquired server slot for %s after %.3f seconds",
+                self.server_key,
+                time.monotonic() - started,
+            )
+
+        if self.min_interval:
+            self.wait_for_rate()
+
+    def wait_for_rate(self):
+        """
+        Wait until min_interval has passed since the last request any process started against the server.
+        """
+        with self.rate_lock:
+            try:
+                with open(self.rate_path, encoding="utf-8") as rate_file:
+                    last_start = float(rate_file.read() or 0)
+            except (OSError, ValueError):
+                last_start = 0
+
+            delay = last_start + self.min_interval - time.time()
+            if delay > 0:
+                logger.info("Rate limiting request for %.3f seconds", delay)
+                time.sleep(delay)
+
+            with open(self.rate_path, "w", encoding="utf-8") as rate_file:
+                rate_file.write(repr(time.time()))
+
+    def record_progress(self, completed_count):
+        if self.latency:
+            self.latency.record_progress(completed_count)
+
+    def after_request(self):
+        """
+        Release the server slot taken by before_request.
+        """
+        if self.semaphore:
+            self.semaphore.release()
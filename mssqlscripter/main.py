@@ -3,36 +3,69 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import copy
-import io
 import logging
-import os
-import platform
-import subprocess
 import sys
-import tempfile
-import time
 
 import mssqlscripter.argparser as parser
-import mssqlscripter.mssqltoolsservice as mssqltoolsservice
-import mssqlscripter.scriptercallbacks as scriptercallbacks
-import mssqlscripter.scripterlogging as scripterlogging
-import mssqlscripter.sqltoolsclient as sqltoolsclient
+import mssqlscripter.scriptertimings as scriptertimings
 
 logger = logging.getLogger("mssqlscripter.main")
 
 
 def main(args):
     """
-    Main entry point to mssql-scripter.
+    Main entry point to mssql-scripter. Returns 1 when scripting failed.
     """
-    scripterlogging.initialize_logger()
-    logger.info(f"Python Information :{sys.version_info}")
+    if args and args[0] == "split":
+        import mssqlscripter.scriptsplitter as scriptsplitter
+
+        return scriptsplitter.main(args[1:])
+    if args and args[0] == "snapshot":
+        import mssqlscripter.snapshotstore as snapshotstore
+
+        return snapshotstore.main(args[1:])
+    if args and args[0] == "diff":
+        import mssqlscripter.schemadiff as schemadiff
+
+        return schemadiff.main(args[1:])
+    if args and args[0] == "fleet":
+        import mssqlscripter.fleet as fleet
+
+        return fleet.main(args[1:])
+
+    timer = scriptertimings.PhaseTimer()
+    parameters = parser.parse_arguments(args)
+    timer.mark("parse_arguments")
+
+    # Everything below is only needed once a scripting run starts. Deferring these imports keeps --help,
+    # --version and argument errors from paying for the tools service client, subprocess and file logging.
+    import copy
+    import os
+    import platform
+    import tempfile
+
+    import mssqlscripter.mssqltoolsservice as mssqltoolsservice
+    import mssqlscripter.scripterlogging as scripterlogging
+    import mssqlscripter.scripterworkers as scripterworkers
+
+    profiler = None
+    if parameters.Profile:
+        import mssqlscripter.scripterprofiler as scripterprofiler
+
+        # Started before the log listener and json rpc threads so that they are profiled too.
+        profiler = scripterprofiler.ScripterProfiler()
+        profiler.start()
+
+    scripterlogging.initialize_logger(parameters.LogLevel, parameters.LogMode)
+    timer.start_logging()
+    logger.info("Python Information :%s", sys.version_info)
     logger.info(
-        f"System Information: system={platform.system()} architecture={platform.architecture()[0]} version={platform.version()}"
+        "System Information: system=%s architecture=%s version=%s",
+        platform.system(),
+        platform.architecture()[0],
+        platform.version(),
     )
 
-    parameters = parser.parse_arguments(args)
     scrubbed_parameters = copy.deepcopy(parameters)
 
     try:
@@ -42,7 +75,7 @@ def main(args):
         # Password was not given, using integrated auth.
         pass
 
-    logger.info(scrubbed_parameters)
+    logger.info("%s", scrubbed_parameters)
 
     temp_file_path = None
 
@@ -53,6 +86,12 @@ def main(args):
         ).name
         parameters.FilePath = temp_file_path
 
+    object_dir = None
+    if parameters.Archive or parameters.SqliteOutput or parameters.Snapshot:
+        # Object files are only kept here until they are moved into the archive, database or snapshot store.
+        object_dir = tempfile.mkdtemp(prefix="mssqlscripter_")
+        parameters.FilePath = object_dir
+
     sqltoolsservice_args = [mssqltoolsservice.get_executable_path()]
 
     if parameters.EnableLogging:
@@ -60,65 +99,235 @@ def main(args):
         sqltoolsservice_args.append("--log-dir")
         sqltoolsservice_args.append(scripterlogging.get_config_log_dir())
 
-    logger.debug(f"Loading mssqltoolsservice with arguments {sqltoolsservice_args}")
+    timer.mark("initialize")
+
+    worker = None
+    object_sink = None
+    resource_sampler = None
+    flight = None
+    scripting_succeeded = False
     try:
-        # Start mssqltoolsservice program.
-        tools_service_process = subprocess.Popen(
-            sqltoolsservice_args,
-            bufsize=0,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-        )
-
-        # Python 2.7 uses the built-in File type when referencing the subprocess.PIPE.
-        # This built-in type for that version blocks on readinto() because it attempts to fill buffer.
-        # Wrap a FileIO around it to use a different implementation that does not attempt to fill the buffer
-        # on readinto().
-        std_out_wrapped = io.open(
-            tools_service_process.stdout.fileno(), "rb", buffering=0, closefd=False
-        )
-
-        sql_tools_client = sqltoolsclient.SqlToolsClient(
-            tools_service_process.stdin, std_out_wrapped
-        )
-
-        scripting_request = sql_tools_client.create_request(
-            "scripting_request", vars(parameters)
-        )
-        scripting_request.execute()
-
-        while not scripting_request.completed():
-            response = scripting_request.get_response()
-            if response:
-                scriptercallbacks.handle_response(response, parameters.DisplayProgress)
-            else:
-                # The sleep prevents burning up the CPU and lets other threads get scheduled.
-                time.sleep(0.1)
+        if parameters.SingleFlight and parameters.ScriptDestination == "ToSingleFile":
+            import mssqlscripter.resultcache as resultcache
+            import mssqlscripter.singleflight as singleflight
+
+            # Identical runs in flight on this machine share one tools service and one set of server queries.
+            flight = singleflight.SingleFlight(resultcache.make_key(vars(parameters)))
+            if flight.join(parameters.FilePath, parameters.AppendToFile):
+                timer.mark("single_flight")
+                if parameters.WriteIndex:
+                    write_index(parameters.FilePath)
+                if temp_file_path:
+                    write_script_to_stdout(parameters.FilePath)
+                    timer.mark("output_copy")
+                return
+
+        worker = scripterworkers.ToolsServiceWorker(sqltoolsservice_args, timer)
+
+        if parameters.SampleResources or parameters.ResourceSamplesFile:
+            import mssqlscripter.resourcesampler as resourcesampler
+
+            resource_sampler = resourcesampler.ResourceSampler(
+                worker.pid, parameters.ResourceSampleInterval
+            )
+            resource_sampler.start()
+
+        scripting_parameters = vars(parameters)
+        object_filter = None
+        if parameters.IncludePatterns or parameters.ExcludePatterns:
+            import mssqlscripter.objectfilter as objectfilter
+
+            object_filter = objectfilter.ObjectFilter(
+                parameters.IncludePatterns,
+                parameters.ExcludePatterns,
+                parameters.MatchCase,
+            )
+
+        result_cache = None
+        if parameters.UseCache and parameters.ScriptDestination == "ToSingleFile":
+            import mssqlscripter.resultcache as resultcache
+
+            result_cache = resultcache.ResultCache(
+                parameters.CacheDir,
+                parameters.CacheTtl,
+                parameters.CacheMaxSize * 1024 * 1024,
+            )
+
+        if parameters.Archive:
+            import mssqlscripter.archivesink as archivesink
+
+            object_sink = archivesink.ArchiveSink(parameters.Archive, object_dir)
+        elif parameters.SqliteOutput:
+            import mssqlscripter.runhistory as runhistory
+            import mssqlscripter.sqlitesink as sqlitesink
+
+            object_sink = sqlitesink.SqliteSink(
+                parameters.SqliteOutput,
+                object_dir,
+                runhistory.get_history_target(parameters.ConnectionString),
+                parameters.TypeOfDataToScript,
+            )
+        elif parameters.Snapshot:
+            import mssqlscripter.runhistory as runhistory
+            import mssqlscripter.snapshotstore as snapshotstore
+
+            object_sink = snapshotstore.SnapshotSink(
+                snapshotstore.SnapshotStore(parameters.SnapshotStore),
+                object_dir,
+                runhistory.get_history_target(parameters.ConnectionString),
+                parameters.TypeOfDataToScript,
+            )
+
+        make_governor = None
+        if (
+            parameters.MaxServerRequests
+            or parameters.MaxServerRequestRate
+            or parameters.AdaptiveBackoff
+        ):
+            import functools
+
+            import mssqlscripter.loadgovernor as loadgovernor
+
+            make_governor = functools.partial(
+                loadgovernor.LoadGovernor,
+                parameters.ConnectionString,
+                parameters.MaxServerRequests,
+                parameters.MaxServerRequestRate,
+                parameters.AdaptiveBackoff,
+            )
+
+        governor = make_governor() if make_governor else None
+
+        plan = None
+        if (
+            object_filter
+            or result_cache
+            or parameters.Archive
+            or parameters.Workers > 1
+        ):
+            if governor:
+                governor.before_request()
+            try:
+                plan = worker.client.get_scripting_plan(
+                    dict(
+                        scripting_parameters,
+                        ScriptDestination="ToSingleFile",
+                        FilePath=os.devnull,
+                    ),
+                    parameters.MaxObjectsPerRequest,
+                )
+            finally:
+                if governor:
+                    governor.after_request()
+            timer.mark("plan")
+
+        positions = None
+        if object_filter:
+            # Match the patterns against the plan and script exactly the matching objects.
+            positions = object_filter.select(plan)
+            if not positions:
+                sys.stderr.write("No database objects match the given patterns.\n")
+                return
+            scripting_parameters = dict(
+                scripting_parameters,
+                IncludeObjects=plan.to_scripting_objects(positions),
+            )
+
+        if parameters.Archive:
+            object_sink.write_manifest(
+                plan, positions if positions is not None else plan.select()
+            )
+
+        cache_key = None
+        if result_cache:
+            cache_key = resultcache.make_key(scripting_parameters, plan)
+            if result_cache.copy_to(
+                cache_key, parameters.FilePath, parameters.AppendToFile
+            ):
+                if parameters.DisplayProgress:
+                    sys.stderr.write(
+                        f"Scripting result cache hit: {plan.fingerprint()[:12]} plan: {len(plan)} database objects\n"
+                    )
+                scripting_parameters = None
+                scripting_succeeded = True
+
+        if scripting_parameters and parameters.Workers > 1:
+            script_in_parallel = (
+                scripterworkers.script_in_batches
+                if parameters.DynamicDispatch
+                else scripterworkers.script_in_parallel
+            )
+            scripting_succeeded = script_in_parallel(
+                worker,
+                sqltoolsservice_args,
+                plan,
+                positions if positions is not None else plan.select(),
+                scripting_parameters,
+                parameters,
+                make_governor,
+                object_sink.record_progress if object_sink else None,
+            )
+        elif scripting_parameters:
+
+            def on_progress(response):
+                if resource_sampler:
+                    resource_sampler.record_progress(response.completed_count)
+                if object_sink:
+                    object_sink.record_progress(response)
+
+            scripting_succeeded = scripterworkers.run_scripting_requests(
+                worker.client,
+                scripting_parameters,
+                parameters,
+                on_progress,
+                governor,
+            )
+
+        if scripting_parameters:
+            # Appended output also holds what was in the file before, so only fresh outputs are cached.
+            if cache_key and scripting_succeeded and not parameters.AppendToFile:
+                result_cache.put(cache_key, parameters.FilePath)
+
+        if parameters.WriteIndex and scripting_succeeded:
+            write_index(parameters.FilePath, plan)
+            timer.mark("index")
 
         # Only write to stdout if user did not provide a file path.
-        logger.info(f"stdout current encoding: {sys.stdout.encoding}")
         if temp_file_path:
-            with io.open(parameters.FilePath, encoding="utf-8") as script_file:
-                for line in script_file.readlines():
-                    sys.stdout.write(line)
+            write_script_to_stdout(parameters.FilePath)
+            timer.mark("output_copy")
+
+        # Callers like diff must not take the partial output of a failed run for a complete one.
+        return 0 if scripting_succeeded else 1
 
     finally:
-        if sql_tools_client:
-            sql_tools_client.shutdown()
-
-        if tools_service_process:
-            tools_service_process.kill()
-            # 1 second time out, allow tools service process to be killed.
-            time.sleep(0.1)
-            # Close the stdout file handle or else we would get a resource warning (found via pytest).
-            # This must be closed after the process is killed, otherwise we would block because the process is using
-            # it's stdout.
-            tools_service_process.stdout.close()
-            # None value indicates process has not terminated.
-            if not tools_service_process.poll():
-                sys.stderr.write(
-                    "Sql Tools Service process was not shut down properly."
-                )
+        if flight:
+            # Appended output also holds what was in the file before, so it is not shared.
+            flight.land(
+                parameters.FilePath
+                if scripting_succeeded and not parameters.AppendToFile
+                else None
+            )
+
+        if resource_sampler:
+            # Sample before the process is killed so the final usage is captured.
+            resource_sampler.stop()
+            resource_sampler.report(sys.stderr)
+            if parameters.ResourceSamplesFile:
+                resource_sampler.write_time_series(parameters.ResourceSamplesFile)
+
+        if worker:
+            worker.close()
+
+        if object_sink:
+            object_sink.close(scripting_succeeded)
+            if parameters.Snapshot:
+                sys.stderr.write(f"Snapshot {object_sink.snapshot_id}\n")
+        if object_dir:
+            import shutil
+
+            shutil.rmtree(object_dir, ignore_errors=True)
+
         try:
             # Remove the temp file if we generated one.
             if temp_file_path:
@@ -127,6 +336,39 @@ def main(args):
             # Suppress exceptions.
             pass
 
+        if parameters.Timings:
+            timer.report(sys.stderr)
+
+        if profiler:
+            profile_file = profiler.stop_and_dump(
+                scripterprofiler.get_profile_file(scripterlogging.get_config_log_dir())
+            )
+            sys.stderr.write(f"Profile written to {profile_file}\n")
+
+        # Flush any queued log records before exiting.
+        scripterlogging.shutdown_logger()
+
+
+def write_index(file_path, plan=None):
+    """
+    Write the sidecar object index of a single file script.
+    """
+    import mssqlscripter.scriptindex as scriptindex
+
+    scriptindex.write_index(file_path, plan)
+
+
+def write_script_to_stdout(file_path):
+    """
+    Copy a script file to stdout.
+    """
+    import io
+
+    logger.info("stdout current encoding: %s", sys.stdout.encoding)
+    with io.open(file_path, encoding="utf-8") as script_file:
+        for line in script_file.readlines():
+            sys.stdout.write(line)
+
 
 if __name__ == "__main__":
     main(sys.argv[1:])
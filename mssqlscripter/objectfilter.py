@@ -0,0 +1,229 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import array
+import logging
+import re
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+
+logger = logging.getLogger("mssqlscripter.objectfilter")
+
+# Wildcards in object patterns, * and % match any run of characters and ? matches a single character.
+ANY_CHARACTERS = "*%"
+ANY_CHARACTER = "?"
+REGEX_PREFIX = "re:"
+TYPE_PATTERN = re.compile(r"^([A-Za-z*%?]+):(?!:)")
+
+
+class NameMatcher(object):
+    """
+    Compiled match for one part of an object pattern: a literal, a literal prefix or a regular expression.
+    """
+
+    ANY = "any"
+    LITERAL = "literal"
+    PREFIX = "prefix"
+    REGEX = "regex"
+
+    def __init__(self, kind, value=None, case_sensitive=False):
+        self.kind = kind
+        self.value = value
+        self.case_sensitive = case_sensitive
+        self.regex = None
+        if kind == self.REGEX:
+            self.regex = re.compile(value, 0 if case_sensitive else re.IGNORECASE)
+        elif not case_sensitive and value is not None:
+            self.value = value.casefold()
+
+    @classmethod
+    def from_wildcards(cls, pattern, case_sensitive=False):
+        """
+        Compile a wildcard pattern, using a literal or prefix match when the wildcards allow it.
+        """
+        if pattern is None:
+            return cls(cls.ANY)
+
+        stripped = pattern.rstrip(ANY_CHARACTERS)
+        if not stripped:
+            return cls(cls.ANY)
+
+        if not any(
+            character in stripped for character in ANY_CHARACTERS + ANY_CHARACTER
+        ):
+            if stripped == pattern:
+                return cls(cls.LITERAL, pattern, case_sensitive)
+            return cls(cls.PREFIX, stripped, case_sensitive)
+
+        expression = "".join(
+            (
+                ".*"
+                if character in ANY_CHARACTERS
+                else "." if character == ANY_CHARACTER else re.escape(character)
+            )
+            for character in pattern
+        )
+        return cls(cls.REGEX, expression, case_sensitive)
+
+    def matches(self, value):
+        if self.kind == self.ANY:
+            return True
+        if value is None:
+            return False
+        if self.kind == self.REGEX:
+            return self.regex.fullmatch(value) is not None
+        if not self.case_sensitive:
+            value = value.casefold()
+        if self.kind == self.LITERAL:
+            return value == self.value
+        return value.startswith(self.value)
+
+    def __repr__(self):
+        return f"NameMatcher({self.kind}, {self.value!r})"
+
+
+class ObjectPattern(object):
+    """
+    Compiled object pattern of the form [type:]schema.name or [type:]re:expression.
+
+    Schema and name may use the * and % wildcards for any run of characters and ? for a single character, a
+    pattern without a schema matches objects in any schema. Parts may be quoted with brackets or double quotes as
+    in exact object names. A re: expression is matched against the full schema.name of each object.
+    """
+
+    def __init__(self, pattern, case_sensitive=False):
+        self.pattern = pattern
+        self.full_name = None
+
+        remainder = pattern
+        type_pattern = None
+        match = TYPE_PATTERN.match(remainder)
+        if match and not remainder.startswith(REGEX_PREFIX):
+            type_pattern = match.group(1)
+            remainder = remainder[match.end() :]
+        self.type = NameMatcher.from_wildcards(type_pattern, case_sensitive=False)
+
+        if remainder.startswith(REGEX_PREFIX):
+            self.schema = NameMatcher(NameMatcher.ANY)
+            self.name = NameMatcher(NameMatcher.ANY)
+            self.full_name = NameMatcher(
+                NameMatcher.REGEX, remainder[len(REGEX_PREFIX) :], case_sensitive
+            )
+        else:
+            schema, name = scripting.parse_object_name(remainder)
+            self.schema = NameMatcher.from_wildcards(schema, case_sensitive)
+            self.name = NameMatcher.from_wildcards(name, case_sensitive)
+
+    def __repr__(self):
+        return f"ObjectPattern({self.pattern!r})"
+
+    def positions(self, catalog):
+        """
+        Return the set of positions of catalog objects matching the pattern.
+        """
+        # Types and schemas are few, match them against the code tables rather than per object.
+        types = (
+            None
+            if self.type.kind == NameMatcher.ANY
+            else [name for name in catalog.type_names if self.type.matches(name)]
+        )
+        schemas = (
+            None
+            if self.schema.kind == NameMatcher.ANY
+            else [name for name in catalog.schema_names if self.schema.matches(name)]
+        )
+        if types == [] or schemas == []:
+            return set()
+
+        if self.name.kind in (NameMatcher.LITERAL, NameMatcher.PREFIX):
+            # Drive from the sorted name index and check type and schema by code.
+            candidates = catalog.positions_with_name(
+                self.name.value,
+                prefix=self.name.kind == NameMatcher.PREFIX,
+                case_sensitive=self.name.case_sensitive,
+            )
+            type_codes = (
+                None if types is None else {catalog.type_codes[t] for t in types}
+            )
+            schema_codes = (
+                None if schemas is None else {catalog.schema_codes[s] for s in schemas}
+            )
+            return {
+                position
+                for position in candidates
+                if (type_codes is None or catalog.types[position] in type_codes)
+                and (schema_codes is None or catalog.schemas[position] in schema_codes)
+            }
+
+        candidates = catalog.select(types, schemas)
+        if self.full_name:
+            return {
+                position
+                for position in candidates
+                if self.full_name.matches(_full_name(catalog, position))
+            }
+        if self.name.kind == NameMatcher.ANY:
+            return set(candidates)
+        return {
+            position
+            for position in candidates
+            if self.name.matches(catalog.name_of(position))
+        }
+
+
+def _full_name(catalog, position):
+    schema = catalog.schema_of(position)
+    name = catalog.name_of(position) or ""
+    return f"{schema}.{name}" if schema else name
+
+
+class ObjectFilter(object):
+    """
+    Client side object filter evaluated against a scripting plan.
+
+    The scripting service only filters on exact object names. An ObjectFilter selects the objects of a plan that
+    match any include pattern, or every object without include patterns, and no exclude pattern. The selection
+    is sent back to the service as exact IncludeObjectCriteria.
+    """
+
+    def __init__(
+        self, include_patterns=None, exclude_patterns=None, case_sensitive=False
+    ):
+        self.include_patterns = [
+            ObjectPattern(pattern, case_sensitive) for pattern in include_patterns or []
+        ]
+        self.exclude_patterns = [
+            ObjectPattern(pattern, case_sensitive) for pattern in exclude_patterns or []
+        ]
+
+    def __bool__(self):
+        return bool(self.include_patterns or self.exclude_patterns)
+
+    def select(self, catalog):
+        """
+        Return the positions of matching catalog objects in plan order.
+        """
+        if self.include_patterns:
+            selected = set()
+            for pattern in self.include_patterns:
+                selected.update(pattern.positions(catalog))
+        else:
+            selected = set(range(len(catalog)))
+
+        for pattern in self.exclude_patterns:
+            if not selected:
+                break
+            selected.difference_update(pattern.positions(catalog))
+
+        logger.info(
+            "Object filter selected %s of %s plan objects", len(selected), len(catalog)
+        )
+        return array.array("I", sorted(selected))
+
+    def to_criteria(self, catalog):
+        """
+        Return exact ScriptingObjects criteria for the matching catalog objects.
+        """
+        return catalog.to_scripting_objects(self.select(catalog))
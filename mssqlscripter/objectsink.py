@@ -0,0 +1,97 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import abc
+import logging
+import os
+import threading
+import time
+
+import mssqlscripter.scriptmerge as scriptmerge
+import mssqlscripter.scriptsplitter as scriptsplitter
+
+logger = logging.getLogger("mssqlscripter.objectsink")
+
+COMPLETED_STATUS = "Completed"
+# The header of an object file follows its USE statement and SET options.
+HEADER_SEARCH_LINES = 10
+
+
+def read_header(path):
+    """
+    Return the type, schema and name of the first descriptive header of the script file at path, or None.
+    """
+    with open(path, "rb") as script_file:
+        for _, line in zip(range(HEADER_SEARCH_LINES), script_file):
+            header = scriptmerge.parse_header(line.lstrip(scriptmerge.UTF8_BOM))
+            if header:
+                return header
+    return None
+
+
+class ObjectFileSink(abc.ABC):
+    """
+    Takes in the files of a file per object run as each object completes.
+
+    The scripting service writes every object to its own file in source_dir. When the progress event completing an
+    object arrives, take_file is called with the file and the object, and takes the file out of the directory, so
+    only the files of the objects in progress are ever on disk. Files the service wrote under other names are taken
+    in by take_remaining_files, identified by their header. Progress may be recorded from several threads.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = source_dir
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        # Time each worker thread last completed an object, for per object durations.
+        self.last_completed = {}
+
+    def record_progress(self, response):
+        if response.status != COMPLETED_STATUS or response.scripting_object is None:
+            return
+
+        now = time.monotonic()
+        thread_id = threading.get_ident()
+        with self.lock:
+            duration = now - self.last_completed.get(thread_id, self.started)
+            self.last_completed[thread_id] = now
+
+        scripting_object = response.scripting_object
+        file_name = scriptsplitter.object_file_name(scripting_object)
+        if os.path.exists(os.path.join(self.source_dir, file_name)):
+            self.take_file(
+                file_name,
+                scripting_object.type,
+                scripting_object.schema,
+                scripting_object.name,
+                duration,
+            )
+
+    def take_remaining_files(self):
+        """
+        Take in the files left in the source directory, in name order.
+        """
+        remaining = sorted(
+            entry.name for entry in os.scandir(self.source_dir) if entry.is_file()
+        )
+        if remaining:
+            logger.info(
+                "Taking in %s files not matched to completed objects", len(remaining)
+            )
+        for file_name in remaining:
+            path = os.path.join(self.source_dir, file_name)
+            self.take_file(file_name, *(read_header(path) or (None, None, file_name)))
+
+    @abc.abstractmethod
+    def take_file(self, file_name, script_type, schema, name, duration=None):
+        """
+        Take in the script file file_name of the source directory holding the script of an object, removing it.
+        """
+
+    @abc.abstractmethod
+    def close(self, succeeded=True):
+        """
+        Take in the files left in the source directory and finish the output of the run.
+        """
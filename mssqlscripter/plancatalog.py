@@ -0,0 +1,316 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import array
+import bisect
+import hashlib
+import heapq
+import sys
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+
+# Schema code of objects that do not belong to a schema, such as the database or schemas themselves.
+NO_SCHEMA = 0
+
+
+class PlanCatalog(object):
+    """
+    Columnar catalog of the objects in a scripting plan.
+
+    Objects are identified by their position in the plan, which is also the order they are scripted in.
+    Types and schemas are stored as small integer codes in arrays and names in a string table, so a catalog
+    of millions of objects costs a few bytes per object plus the names. Positions by type and by schema are
+    indexed as objects are appended; the name index is built on first lookup.
+    """
+
+    def __init__(self):
+        # Code tables, code -> string and string -> code.
+        self.type_names = []
+        self.type_codes = {}
+        self.schema_names = [None]
+        self.schema_codes = {None: NO_SCHEMA}
+
+        # One entry per object, indexed by plan position.
+        self.types = array.array("H")
+        self.schemas = array.array("I")
+        self.names = []
+
+        # Code -> positions in plan order.
+        self.type_index = {}
+        self.schema_index = {}
+        # name -> position, or list of positions when several objects share a name. Keyed by the name strings
+        # already held in the string table so the index adds no string objects.
+        self.name_index = None
+        # case_sensitive -> (sorted name keys, positions in key order), built on first prefix lookup.
+        self.sorted_name_index = {}
+
+    @classmethod
+    def from_plan(cls, plan_event):
+        """
+        Build a catalog from a ScriptPlanNotificationEvent.
+        """
+        if isinstance(plan_event.scripting_objects, cls):
+            return plan_event.scripting_objects
+
+        return cls.from_objects(plan_event.scripting_objects)
+
+    @classmethod
+    def from_objects(cls, scripting_objects):
+        """
+        Build a catalog from ScriptingObjects or JSON scripting object dictionaries.
+        """
+        catalog = cls()
+        for scripting_object in scripting_objects:
+            catalog.append(
+                scripting_object["type"],
+                scripting_object["schema"],
+                scripting_object["name"],
+            )
+        return catalog
+
+    def append_item(self, item):
+        """
+        Append a JSON scripting object dictionary as sent by the scripting service.
+        """
+        return self.append(item.get("type"), item.get("schema"), item.get("name"))
+
+    def append(self, script_type, schema, name):
+        """
+        Append an object to the end of the plan and return it's position.
+        """
+        position = len(self.names)
+
+        type_code = self.type_codes.get(script_type)
+        if type_code is None:
+            type_code = len(self.type_names)
+            self.type_names.append(sys.intern(script_type) if script_type else None)
+            self.type_codes[script_type] = type_code
+            self.type_index[type_code] = array.array("I")
+
+        schema_code = self.schema_codes.get(schema)
+        if schema_code is None:
+            schema_code = len(self.schema_names)
+            self.schema_names.append(sys.intern(schema))
+            self.schema_codes[schema] = schema_code
+        if schema_code not in self.schema_index:
+            self.schema_index[schema_code] = array.array("I")
+
+        self.types.append(type_code)
+        self.schemas.append(schema_code)
+        self.names.append(name)
+        self.type_index[type_code].append(position)
+        self.schema_index[schema_code].append(position)
+
+        if self.name_index is not None:
+            self._index_name(name, position)
+
+        return position
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"PlanCatalog({len(self.names)} objects)"
+
+    def __getitem__(self, position):
+        return scripting.ScriptingObject(
+            self.type_names[self.types[position]],
+            self.schema_names[self.schemas[position]],
+            self.names[position],
+        )
+
+    def __iter__(self):
+        for position in range(len(self.names)):
+            yield self[position]
+
+    def type_of(self, position):
+        return self.type_names[self.types[position]]
+
+    def schema_of(self, position):
+        return self.schema_names[self.schemas[position]]
+
+    def name_of(self, position):
+        return self.names[position]
+
+    def _index_name(self, name, position):
+        existing = self.name_index.get(name)
+        if existing is None:
+            self.name_index[name] = position
+        elif isinstance(existing, list):
+            existing.append(position)
+        else:
+            self.name_index[name] = [existing, position]
+
+    def find(self, schema, name, script_type=None):
+        """
+        Return the positions of objects with the given schema and name, optionally restricted to a type.
+        """
+        if self.name_index is None:
+            self.name_index = {}
+            for position, name_at in enumerate(self.names):
+                self._index_name(name_at, position)
+
+        schema_code = self.schema_codes.get(schema)
+        positions = self.name_index.get(name)
+        if schema_code is None or positions is None:
+            return []
+        if not isinstance(positions, list):
+            positions = [positions]
+
+        type_code = (
+            None if script_type is None else self.type_codes.get(script_type, -1)
+        )
+        return [
+            position
+            for position in positions
+            if self.schemas[position] == schema_code
+            and (type_code is None or self.types[position] == type_code)
+        ]
+
+    def _sorted_names(self, case_sensitive):
+        index = self.sorted_name_index.get(case_sensitive)
+        if index is None or len(index[1]) != len(self.names):
+            keys = [
+                (name or "") if case_sensitive else (name or "").casefold()
+                for name in self.names
+            ]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            index = ([keys[position] for position in order], array.array("I", order))
+            self.sorted_name_index[case_sensitive] = index
+        return index
+
+    def positions_with_name(self, name, prefix=False, case_sensitive=True):
+        """
+        Return the positions of objects named name, or whose name starts with name if prefix is set. Positions
+        are in name order rather than plan order.
+        """
+        keys, positions = self._sorted_names(case_sensitive)
+        if not case_sensitive:
+            name = name.casefold()
+
+        start = bisect.bisect_left(keys, name)
+        # No name sorts after the prefix followed by the largest code point.
+        end = bisect.bisect_right(keys, name + "\U0010ffff" if prefix else name, start)
+        return positions[start:end]
+
+    def positions_of_type(self, script_type):
+        """
+        Return the positions of all objects of a type in plan order.
+        """
+        type_code = self.type_codes.get(script_type)
+        return self.type_index.get(type_code, array.array("I"))
+
+    def positions_in_schema(self, schema):
+        """
+        Return the positions of all objects in a schema in plan order.
+        """
+        schema_code = self.schema_codes.get(schema)
+        return self.schema_index.get(schema_code, array.array("I"))
+
+    def select(self, types=None, schemas=None):
+        """
+        Return positions in plan order of objects matching any of types and any of schemas.
+        None means no restriction, so select() returns every position.
+        """
+        if types is None and schemas is None:
+            return array.array("I", range(len(self.names)))
+
+        # Drive the selection from whichever index is smaller, check the other column by code.
+        type_codes = (
+            None
+            if types is None
+            else {self.type_codes[t] for t in types if t in self.type_codes}
+        )
+        schema_codes = (
+            None
+            if schemas is None
+            else {self.schema_codes[s] for s in schemas if s in self.schema_codes}
+        )
+
+        if type_codes is not None and (
+            schema_codes is None
+            or sum(len(self.type_index[code]) for code in type_codes)
+            <= sum(len(self.schema_index[code]) for code in schema_codes)
+        ):
+            candidates = heapq.merge(*[self.type_index[code] for code in type_codes])
+            column, codes = self.schemas, schema_codes
+        else:
+            candidates = heapq.merge(
+                *[self.schema_index[code] for code in schema_codes]
+            )
+            column, codes = self.types, type_codes
+
+        if codes is None:
+            return array.array("I", candidates)
+
+        return array.array(
+            "I", (position for position in candidates if column[position] in codes)
+        )
+
+    def count_by_type(self):
+        """
+        Return a dictionary of type -> number of objects.
+        """
+        return {
+            self.type_names[code]: len(positions)
+            for code, positions in self.type_index.items()
+        }
+
+    def count_by_schema(self):
+        """
+        Return a dictionary of schema -> number of objects. Objects without a schema are counted under None.
+        """
+        return {
+            self.schema_names[code]: len(positions)
+            for code, positions in self.schema_index.items()
+        }
+
+    def group_by_type(self, positions=None):
+        """
+        Return a dictionary of type -> positions in plan order, optionally limited to positions.
+        """
+        if positions is None:
+            return {
+                self.type_names[code]: positions
+                for code, positions in self.type_index.items()
+            }
+
+        groups = {}
+        for position in positions:
+            script_type = self.type_names[self.types[position]]
+            groups.setdefault(script_type, array.array("I")).append(position)
+        return groups
+
+    def fingerprint(self, positions=None):
+        """
+        Return a hex digest of the objects at positions, all by default, in plan order. Plans listing the same
+        objects in the same order share a fingerprint, changes to an object's definition are not reflected in it.
+        """
+        digest = hashlib.sha256()
+        for position in range(len(self.names)) if positions is None else positions:
+            digest.update(
+                "\0".join(
+                    (
+                        self.type_of(position) or "",
+                        self.schema_of(position) or "",
+                        self.names[position] or "",
+                    )
+                ).encode("utf-8")
+            )
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def to_scripting_objects(self, positions):
+        """
+        Return exact scripting object criteria, as used for IncludeObjectCriteria, for the objects at positions.
+        """
+        scripting_objects = scripting.ScriptingObjects(None)
+        for position in positions:
+            scripting_objects.add_scripting_object(
+                script_type=self.type_of(position),
+                schema=self.schema_of(position),
+                name=self.names[position],
+            )
+        return scripting_objects
@@ -0,0 +1,224 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("mssqlscripter.resourcesampler")
+
+TIME_SERIES_COLUMNS = [
+    "elapsed_seconds",
+    "cpu_seconds",
+    "cpu_percent",
+    "rss_bytes",
+    "threads",
+    "read_bytes",
+    "write_bytes",
+    "completed_count",
+]
+
+
+def read_process_stats(pid):
+    """
+    Read cpu time, resident set size, thread count and disk I/O of a process from procfs.
+    Returns None when the process is gone or procfs is not available. I/O counters are None when the
+    process' io file is not readable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+
+    # The command name may contain spaces, fields are counted from the closing parenthesis.
+    fields = stat[stat.rindex(b")") + 2 :].split()
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    stats = {
+        # Fields 14 and 15: user and system time in clock ticks.
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / clock_ticks,
+        # Field 20: number of threads.
+        "threads": int(fields[17]),
+        # Field 24: resident set size in pages.
+        "rss_bytes": int(fields[21]) * os.sysconf("SC_PAGE_SIZE"),
+        "read_bytes": None,
+        "write_bytes": None,
+    }
+
+    try:
+        with open(f"/proc/{pid}/io", "rb") as io_file:
+            for line in io_file:
+                key, _, value = line.partition(b":")
+                if key == b"read_bytes":
+                    stats["read_bytes"] = int(value)
+                elif key == b"write_bytes":
+                    stats["write_bytes"] = int(value)
+    except OSError:
+        # /proc/<pid>/io requires ptrace access to the process.
+        pass
+
+    return stats
+
+
+class ResourceSample(object):
+    """
+    Resource usage of the sampled process at a point in time.
+    """
+
+    def __init__(self, elapsed_seconds, stats, cpu_percent, completed_count):
+        self.elapsed_seconds = elapsed_seconds
+        self.cpu_seconds = stats["cpu_seconds"]
+        self.cpu_percent = cpu_percent
+        self.rss_bytes = stats["rss_bytes"]
+        self.threads = stats["threads"]
+        self.read_bytes = stats["read_bytes"]
+        self.write_bytes = stats["write_bytes"]
+        self.completed_count = completed_count
+
+
+class ResourceSampler(object):
+    """
+    Periodically sample the resource usage of a process, such as the sql tools service, on a background thread.
+    Each sample carries the scripting progress reported so far so usage can be correlated with objects scripted.
+    """
+
+    THREAD_NAME = "Resource_Sampler_Thread"
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.completed_count = 0
+        self.start_time = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def supported(self):
+        """
+        Sampling relies on procfs and is only available on Linux.
+        """
+        return os.path.exists(f"/proc/{self.pid}/stat")
+
+    def start(self):
+        """
+        Start the sampling thread.
+        """
+        if not self.supported():
+            logger.info("Resource sampling is not supported on this platform.")
+            return
+
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._sample_loop, name=self.THREAD_NAME)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record_progress(self, completed_count):
+        """
+        Record the number of objects scripted so far.
+        """
+        self.completed_count = completed_count
+
+    def stop(self):
+        """
+        Take a final sample and stop the sampling thread.
+        """
+        if not self.thread:
+            return
+
+        self.stop_event.set()
+        self.thread.join(self.interval + 1)
+        self.thread = None
+        self.sample()
+
+    def _sample_loop(self):
+        while not self.stop_event.is_set():
+            if not self.sample():
+                # The process exited.
+                break
+            self.stop_event.wait(self.interval)
+
+    def sample(self):
+        """
+        Take one sample, returns False if the process could not be read.
+        """
+        stats = read_process_stats(self.pid)
+        if stats is None:
+            return False
+
+        elapsed_seconds = time.perf_counter() - self.start_time
+        cpu_percent = 0.0
+        if self.samples:
+            previous = self.samples[-1]
+            elapsed_delta = elapsed_seconds - previous.elapsed_seconds
+            if elapsed_delta > 0:
+                cpu_percent = (
+                    100.0
+                    * (stats["cpu_seconds"] - previous.cpu_seconds)
+                    / elapsed_delta
+                )
+
+        self.samples.append(
+            ResourceSample(elapsed_seconds, stats, cpu_percent, self.completed_count)
+        )
+        return True
+
+    def peaks(self):
+        """
+        Return a dictionary of peak and total resource usage across all samples.
+        """
+        if not self.samples:
+            return {}
+
+        last = self.samples[-1]
+        return {
+            "samples": len(self.samples),
+            "peak_rss_bytes": max(sample.rss_bytes for sample in self.samples),
+            "peak_threads": max(sample.threads for sample in self.samples),
+            "peak_cpu_percent": max(sample.cpu_percent for sample in self.samples),
+            "cpu_seconds": last.cpu_seconds,
+            "read_bytes": last.read_bytes,
+            "write_bytes": last.write_bytes,
+        }
+
+    def report(self, stream):
+        """
+        Write peak resource usage to stream.
+        """
+        peaks = self.peaks()
+        if not peaks:
+            return
+
+        logger.info(
+            "resources pid=%s %s",
+            self.pid,
+            " ".join(f"{key}={value}" for key, value in peaks.items()),
+        )
+        stream.write(
+            f"Sql Tools Service resources: peak rss: {peaks['peak_rss_bytes'] / (1024 * 1024):.1f} MB, "
+            f"peak threads: {peaks['peak_threads']}, peak cpu: {peaks['peak_cpu_percent']:.0f}%, "
+            f"cpu time: {peaks['cpu_seconds']:.2f} s, read: {peaks['read_bytes']} bytes, "
+            f"written: {peaks['write_bytes']} bytes\n"
+        )
+
+    def write_time_series(self, file_path):
+        """
+        Write all samples as comma separated values to file_path.
+        """
+        with io.open(file_path, "w", encoding="utf-8") as time_series:
+            time_series.write(",".join(TIME_SERIES_COLUMNS) + "\n")
+            for sample in self.samples:
+                time_series.write(
+                    ",".join(
+                        (
+                            ""
+                            if getattr(sample, column) is None
+                            else str(getattr(sample, column))
+                        )
+                        for column in TIME_SERIES_COLUMNS
+                    )
+                    + "\n"
+                )
@@ -0,0 +1,199 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import mssqlscripter.argparser as argparser
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.scripterlogging as scripterlogging
+
+logger = logging.getLogger("mssqlscripter.resultcache")
+
+CACHE_FILE_SUFFIX = ".sql"
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Parameters that say where the output goes rather than what it contains.
+UNKEYED_PARAMETERS = ("FilePath", "ConnectionString")
+UNKEYED_OPTIONS = ("AppendToFile",)
+# Parameters the scripter applies itself, so the scripting parameters do not carry them.
+CLIENT_SIDE_PARAMETERS = ("IncludePatterns", "ExcludePatterns", "MatchCase")
+
+
+def get_config_cache_dir():
+    """
+    Retrieve the result cache directory, create it if it doesn't exist.
+    """
+    cache_dir = os.path.join(scripterlogging.get_config_log_dir(), "cache")
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_run_identity(parameters):
+    """
+    Return what a scripting run produces as a dictionary: the connection target without secrets, the formatted
+    scripting parameters, without where the output goes, and the object filter the scripter applies itself.
+    """
+    formatted = scripting.ScriptingParams(parameters).format()
+    for name in UNKEYED_PARAMETERS:
+        formatted.pop(name, None)
+    formatted["ScriptOptions"] = {
+        name: value
+        for name, value in formatted["ScriptOptions"].items()
+        if name not in UNKEYED_OPTIONS
+    }
+
+    return {
+        "target": argparser.get_connection_target(parameters["ConnectionString"]),
+        "parameters": formatted,
+        "client": {name: parameters.get(name) for name in CLIENT_SIDE_PARAMETERS},
+    }
+
+
+def make_key(parameters, plan=None):
+    """
+    Return the key of a scripting run: a digest of its identity and, if given, the plan fingerprint.
+    """
+    key = get_run_identity(parameters)
+    if plan is not None:
+        key["plan"] = plan.fingerprint()
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ResultCache(object):
+    """
+    On disk cache of single file script outputs.
+
+    Each entry is one file named after its key. The modification time of an entry is when it was stored and is
+    used for the time to live, the access time is set on every hit and used to evict the least recently used
+    entries once the cache grows past max_bytes. Entries are written to a temporary file and renamed into place,
+    so concurrent runs never see a partial entry.
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_bytes=DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir or get_config_cache_dir()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def _expired(self, stat, now):
+        return self.ttl_seconds is not None and now - stat.st_mtime > self.ttl_seconds
+
+    def get(self, key):
+        """
+        Return the path of the cached output for key, or None on a miss or an expired entry.
+        """
+        path = self._entry_path(key)
+        now = time.time()
+        try:
+            stat = os.stat(path)
+            if self._expired(stat, now):
+                logger.info("Result cache entry %s expired", key)
+                os.remove(path)
+                return None
+            # Record the hit for LRU eviction, keeping the store time.
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            return None
+
+        logger.info("Result cache hit %s", key)
+        return path
+
+    def copy_to(self, key, file_path, append=False):
+        """
+        Copy the cached output for key to file_path and return True, or return False on a miss.
+        """
+        path = self.get(key)
+        if not path:
+            return False
+
+        try:
+            with open(path, "rb") as source, open(
+                file_path, "ab" if append else "wb"
+            ) as target:
+                shutil.copyfileobj(source, target)
+        except FileNotFoundError:
+            # Evicted by another process between the lookup and the copy.
+            return False
+        return True
+
+    def put(self, key, file_path):
+        """
+        Store the output at file_path under key and evict entries past the size limit.
+        """
+        handle, temp_path = tempfile.mkstemp(
+            prefix=".tmp_", suffix=CACHE_FILE_SUFFIX, dir=self.cache_dir
+        )
+        try:
+            with os.fdopen(handle, "wb") as target, open(file_path, "rb") as source:
+                shutil.copyfileobj(source, target)
+            os.replace(temp_path, self._entry_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        logger.info("Result cache stored %s", key)
+        self.evict()
+
+    def entries(self):
+        """
+        Return (path, stat) of every cache entry.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_FILE_SUFFIX) and not entry.name.startswith(
+                ".tmp_"
+            ):
+                try:
+                    entries.append((entry.path, entry.stat()))
+                except OSError:
+                    pass
+        return entries
+
+    def evict(self):
+        """
+        Remove expired entries, then the least recently used ones until the cache fits in max_bytes.
+        """
+        now = time.time()
+        remaining = []
+        for path, stat in self.entries():
+            if self._expired(stat, now):
+                self._remove(path)
+            else:
+                remaining.append((path, stat))
+
+        total_bytes = sum(stat.st_size for _, stat in remaining)
+        if self.max_bytes is None or total_bytes <= self.max_bytes:
+            return
+
+        remaining.sort(key=lambda entry: entry[1].st_atime)
+        for path, stat in remaining:
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= stat.st_size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            logger.info("Result cache evicted %s", os.path.basename(path))
+        except OSError:
+            pass
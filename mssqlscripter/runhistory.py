@@ -0,0 +1,183 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import os
+import sqlite3
+import time
+
+import mssqlscripter.argparser as argparser
+import mssqlscripter.scripterlogging as scripterlogging
+
+logger = logging.getLogger("mssqlscripter.runhistory")
+
+RUN_HISTORY_FILE_NAME = "run_history.db"
+# Weight of the latest duration in an object's moving average.
+DURATION_SMOOTHING = 0.5
+
+# Seconds assumed to script an object of a type never scripted before, schema only.
+SIZE_CLASS_ESTIMATES = {
+    "Database": 0.5,
+    "Table": 0.5,
+    "View": 0.2,
+    "StoredProcedure": 0.1,
+    "UserDefinedFunction": 0.1,
+    "Trigger": 0.1,
+    "Schema": 0.02,
+    "User": 0.02,
+    "Role": 0.02,
+}
+DEFAULT_SIZE_CLASS_ESTIMATE = 0.1
+# Scripting data takes most of the time of a run, and only tables have data.
+DATA_TABLE_ESTIMATE = 10.0
+
+
+def get_run_history_file():
+    """
+    Retrieve the run history database path.
+    """
+    return os.path.join(scripterlogging.get_config_log_dir(), RUN_HISTORY_FILE_NAME)
+
+
+def get_history_target(connection_string):
+    """
+    Return the server and database a connection string scripts, as run history keys them.
+    """
+    target = argparser.get_connection_target(connection_string)
+    return f'{target.get("Server", "")}/{target.get("Database", "")}'
+
+
+def get_size_class_estimate(script_type, type_of_data):
+    if script_type == "Table" and type_of_data != "SchemaOnly":
+        return DATA_TABLE_ESTIMATE
+    return SIZE_CLASS_ESTIMATES.get(script_type, DEFAULT_SIZE_CLASS_ESTIMATE)
+
+
+class DurationRecorder(object):
+    """
+    Derive per object scripting durations from progress events.
+
+    The scripting service reports progress on several objects before it completes them, so the duration of an
+    object is taken as the time since the previous object completed, or since recording started for the first.
+    """
+
+    COMPLETED_STATUS = "Completed"
+
+    def __init__(self):
+        self.last_completed = time.monotonic()
+        self.durations = {}
+
+    def record_progress(self, response):
+        if response.status != self.COMPLETED_STATUS:
+            return
+
+        now = time.monotonic()
+        scripting_object = response.scripting_object
+        key = (scripting_object.type, scripting_object.schema, scripting_object.name)
+        self.durations[key] = self.durations.get(key, 0) + now - self.last_completed
+        self.last_completed = now
+
+
+class RunHistory(object):
+    """
+    SQLite store of how long objects took to script, per server and database and type of data scripted.
+
+    Durations are kept as a moving average per object. Concurrent runs may update the store at the same time,
+    SQLite serializes their writes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_run_history_file()
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS object_durations ("
+                "target TEXT NOT NULL, "
+                "type_of_data TEXT NOT NULL, "
+                "type TEXT NOT NULL, "
+                "schema TEXT NOT NULL, "
+                "name TEXT NOT NULL, "
+                "duration REAL NOT NULL, "
+                "samples INTEGER NOT NULL, "
+                "updated REAL NOT NULL, "
+                "PRIMARY KEY (target, type_of_data, type, schema, name))"
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, target, type_of_data, durations):
+        """
+        Record a dictionary of (type, schema, name) -> seconds scripted in one run.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO object_durations VALUES (?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (target, type_of_data, type, schema, name) DO UPDATE SET "
+                "duration = duration + ? * (excluded.duration - duration), "
+                "samples = samples + 1, "
+                "updated = excluded.updated",
+                (
+                    (
+                        target,
+                        type_of_data,
+                        script_type or "",
+                        schema or "",
+                        name or "",
+                        duration,
+                        now,
+                        DURATION_SMOOTHING,
+                    )
+                    for (script_type, schema, name), duration in durations.items()
+                ),
+            )
+        logger.info("Recorded %s object durations for %s", len(durations), target)
+
+    def estimate(self, target, type_of_data, catalog, positions):
+        """
+        Return the estimated seconds to script the catalog objects at positions. Objects without history are
+        estimated from the average of their type in this target's history, or from a size class of their type.
+        """
+        known = {}
+        type_totals = {}
+        for script_type, schema, name, duration in self.connection.execute(
+            "SELECT type, schema, name, duration FROM object_durations "
+            "WHERE target = ? AND type_of_data = ?",
+            (target, type_of_data),
+        ):
+            known[(script_type, schema, name)] = duration
+            total = type_totals.setdefault(script_type, [0.0, 0])
+            total[0] += duration
+            total[1] += 1
+
+        type_averages = {
+            script_type: total / count
+            for script_type, (total, count) in type_totals.items()
+        }
+
+        estimates = []
+        from_history = 0
+        for position in positions:
+            script_type = catalog.type_of(position) or ""
+            duration = known.get(
+                (
+                    script_type,
+                    catalog.schema_of(position) or "",
+                    catalog.name_of(position),
+                )
+            )
+            if duration is not None:
+                from_history += 1
+            else:
+                duration = type_averages.get(script_type)
+                if duration is None:
+                    duration = get_size_class_estimate(script_type, type_of_data)
+            estimates.append(duration)
+
+        logger.info(
+            "Estimated %s objects, %s from history", len(estimates), from_history
+        )
+        return estimates
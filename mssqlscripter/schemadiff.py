@@ -0,0 +1,316 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Compare the object scripts of two file per object outputs.
+
+Either side of a comparison is a directory of object files, a tar or zip archive written by --archive, a snapshot
+by id or manifest path, or a connection string scripted with --file-per-object for the comparison. Objects are
+matched by file name and compared by the sha256 of their script without its descriptive headers, whose Script
+Date differs between runs, so only objects whose scripts differ are read in full and diffed, the diffs in parallel
+across processes. Diffs leave out the headers too.
+"""
+
+import concurrent.futures
+import difflib
+import logging
+import os
+import tarfile
+import zipfile
+
+import mssqlscripter.scriptmerge as scriptmerge
+
+logger = logging.getLogger("mssqlscripter.schemadiff")
+
+# Members of an archive that are not object scripts.
+ARCHIVE_MANIFEST_NAME = "manifest.json"
+# Below this many changed objects the diffs are computed in this process, starting a pool would take longer.
+MIN_PARALLEL_DIFFS = 32
+DIFF_CHUNK_SIZE = 16
+
+
+def hash_file(path):
+    with open(path, "rb") as script_file:
+        return scriptmerge.script_digest(script_file.read())
+
+
+class DirectorySource(object):
+    """
+    Object files of a directory.
+    """
+
+    def __init__(self, directory, workers=None):
+        self.directory = directory
+        self.workers = workers
+
+    def hashes(self):
+        names = sorted(
+            entry.name for entry in os.scandir(self.directory) if entry.is_file()
+        )
+        # Reading the files dominates, so they are hashed by several threads at once.
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as executor:
+            digests = executor.map(
+                hash_file, (os.path.join(self.directory, name) for name in names)
+            )
+            return dict(zip(names, digests))
+
+    def read(self, names):
+        scripts = {}
+        for name in names:
+            with open(os.path.join(self.directory, name), "rb") as script_file:
+                scripts[name] = script_file.read()
+        return scripts
+
+
+class ArchiveSource(object):
+    """
+    Object files of a tar or zip archive. Compressed tar archives can only be read front to back, so every read
+    is a single pass over the archive.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+
+    def members(self, names=None):
+        """
+        Yield the name and bytes of the object files of the archive, only those in names if given.
+        """
+        if zipfile.is_zipfile(self.archive_path):
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for info in archive.infolist():
+                    if self.wanted(info.filename, names) and not info.is_dir():
+                        yield info.filename, archive.read(info)
+        else:
+            with tarfile.open(self.archive_path, "r:*") as archive:
+                for info in archive:
+                    if self.wanted(info.name, names) and info.isfile():
+                        yield info.name, archive.extractfile(info).read()
+
+    @staticmethod
+    def wanted(name, names):
+        if names is None:
+            return name != ARCHIVE_MANIFEST_NAME
+        return name in names
+
+    def hashes(self):
+        return {name: scriptmerge.script_digest(data) for name, data in self.members()}
+
+    def read(self, names):
+        return dict(self.members(set(names)))
+
+
+class SnapshotSource(object):
+    """
+    Objects of a snapshot. The manifest holds the digest of every script, so hashing reads nothing else.
+    """
+
+    def __init__(self, store, snapshot_id):
+        self.store = store
+        self.manifest = store.read_manifest(snapshot_id)
+
+    def hashes(self):
+        return {entry["file"]: entry["digest"] for entry in self.manifest["objects"]}
+
+    def read(self, names):
+        digests = self.hashes()
+        return {name: self.store.get_blob(digests[name]) for name in names}
+
+
+class Comparison(object):
+    """
+    Names of the objects added, removed, changed and unchanged from the old to the new side.
+    """
+
+    def __init__(self, old_hashes, new_hashes):
+        self.added = sorted(set(new_hashes) - set(old_hashes))
+        self.removed = sorted(set(old_hashes) - set(new_hashes))
+        self.changed = []
+        self.unchanged = 0
+        for name in sorted(set(old_hashes) & set(new_hashes)):
+            if old_hashes[name] == new_hashes[name]:
+                self.unchanged += 1
+            else:
+                self.changed.append(name)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def unified_diff(name, old_script, new_script, context=3):
+    """
+    Return the unified diff of two scripts of the object file name as text, without their descriptive headers.
+    """
+    old_lines = (
+        scriptmerge.strip_headers(old_script)
+        .decode("utf-8-sig", errors="replace")
+        .splitlines(True)
+    )
+    new_lines = (
+        scriptmerge.strip_headers(new_script)
+        .decode("utf-8-sig", errors="replace")
+        .splitlines(True)
+    )
+    lines = []
+    for line in difflib.unified_diff(
+        old_lines, new_lines, f"a/{name}", f"b/{name}", n=context
+    ):
+        lines.append(line if line.endswith("\n") else line + "\n")
+    return "".join(lines)
+
+
+def _unified_diff(arguments):
+    return unified_diff(*arguments)
+
+
+def compute_diffs(names, old_scripts, new_scripts, context=3, workers=None):
+    """
+    Yield the unified diffs of the named objects in name order, computed by a process pool when there are enough
+    of them to be worth it.
+    """
+    arguments = (
+        (name, old_scripts[name], new_scripts[name], context) for name in names
+    )
+    if len(names) < MIN_PARALLEL_DIFFS or workers == 1:
+        yield from map(_unified_diff, arguments)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_unified_diff, arguments, chunksize=DIFF_CHUNK_SIZE)
+
+
+def compare(
+    old_source, new_source, output, include_diffs=True, context=3, workers=None
+):
+    """
+    Write the added (A), removed (D) and changed (M) objects of new_source compared to old_source to output,
+    followed by the unified diffs of the changed objects. Return the comparison.
+    """
+    comparison = Comparison(old_source.hashes(), new_source.hashes())
+    logger.info(
+        "Compared objects: %s added, %s removed, %s changed, %s unchanged",
+        len(comparison.added),
+        len(comparison.removed),
+        len(comparison.changed),
+        comparison.unchanged,
+    )
+
+    for status, names in (
+        ("A", comparison.added),
+        ("D", comparison.removed),
+        ("M", comparison.changed),
+    ):
+        for name in names:
+            output.write(f"{status}\t{name}\n")
+
+    if include_diffs and comparison.changed:
+        for diff in compute_diffs(
+            comparison.changed,
+            old_source.read(comparison.changed),
+            new_source.read(comparison.changed),
+            context,
+            workers,
+        ):
+            output.write(diff)
+    return comparison
+
+
+def script_live(connection_string, output_dir, scripter_arguments):
+    """
+    Start mssql-scripter scripting the database of connection_string to a file per object in output_dir and
+    return the process. The connection string is passed through the environment to keep it off the command line.
+    Headers are left out, they would only differ in their Script Date.
+    """
+    import subprocess
+    import sys
+
+    import mssqlscripter.argparser as parser
+
+    environment = dict(os.environ)
+    environment[parser.MSSQL_SCRIPTER_CONNECTION_STRING] = connection_string
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "mssqlscripter",
+            *scripter_arguments,
+            "--file-per-object",
+            "-f",
+            output_dir,
+            "--exclude-headers",
+        ],
+        env=environment,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def is_connection_string(source):
+    return "=" in source and not os.path.exists(source)
+
+
+def open_source(source, store_dir=None, workers=None):
+    """
+    Return the source of a directory, archive, snapshot manifest or snapshot id.
+    """
+    import mssqlscripter.archivesink as archivesink
+
+    if os.path.isdir(source):
+        return DirectorySource(source, workers)
+    if os.path.isfile(source) and source.lower().endswith(
+        tuple(archivesink.ARCHIVE_SUFFIXES)
+    ):
+        return ArchiveSource(source)
+
+    import mssqlscripter.snapshotstore as snapshotstore
+
+    return SnapshotSource(snapshotstore.SnapshotStore(store_dir), source)
+
+
+def main(args):
+    """
+    Entry point of mssql-scripter diff. Returns 1 when the sides differ, like diff.
+    """
+    import shutil
+    import sys
+    import tempfile
+
+    import mssqlscripter.argparser as parser
+
+    parameters = parser.parse_diff_arguments(args)
+    temp_dirs = []
+    try:
+        sides = [parameters.OldSource, parameters.NewSource]
+        # Both live sides are scripted at the same time.
+        processes = []
+        for index, source in enumerate(sides):
+            if is_connection_string(source):
+                temp_dirs.append(tempfile.mkdtemp(prefix="mssqlscripter_"))
+                sides[index] = temp_dirs[-1]
+                processes.append(
+                    script_live(source, temp_dirs[-1], parameters.ScripterArguments)
+                )
+        for process in processes:
+            if process.wait() != 0:
+                raise EnvironmentError(
+                    f"Scripting a database to compare failed with exit code {process.returncode}\n"
+                )
+
+        comparison = compare(
+            open_source(sides[0], parameters.SnapshotStore, parameters.Workers),
+            open_source(sides[1], parameters.SnapshotStore, parameters.Workers),
+            sys.stdout,
+            not parameters.NameOnly,
+            parameters.Context,
+            parameters.Workers,
+        )
+        sys.stderr.write(
+            f"{len(comparison.added)} added, {len(comparison.removed)} removed, "
+            f"{len(comparison.changed)} changed, {comparison.unchanged} unchanged\n"
+        )
+        return 1 if comparison else 0
+    finally:
+        for temp_dir in temp_dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -3,9 +3,46 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import atexit
+import glob
 import logging
 import logging.handlers
 import os
+import queue
+import re
+import time
+
+LOG_FILE_MAX_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 10
+
+# Per-run log files are small and pruned as a whole, so disk usage stays bounded no matter how many runs happen.
+RUN_LOG_FILE_BACKUP_COUNT = 1
+RUN_LOG_MAX_FILES = 200
+RUN_LOG_MAX_TOTAL_BYTES = 64 * 1024 * 1024
+# Per-run log file names carry the id of the process writing them.
+RUN_LOG_PID_PATTERN = re.compile(r"^mssql-scripter-\d{8}-\d{6}-(\d+)\.log")
+# Where it can not be told whether the process writing a log still runs, logs modified this recently are kept.
+RUN_LOG_ACTIVE_SECONDS = 3600
+
+# Background listener that owns the file handler, set by initialize_logger().
+_listener = None
+_shutdown_registered = False
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands the record to the listener thread with its message merged but not formatted.
+    """
+
+    def prepare(self, record):
+        """
+        The message is merged with its arguments here, so arguments changed after the call, like lists still
+        being filled, are logged as they were. The listener lives in this process, so the record is not copied
+        and formatting, with its time stamp and traceback, happens on the listener thread.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 def get_config_log_dir():
@@ -25,18 +62,130 @@ def get_config_log_file():
     return os.path.join(get_config_log_dir(), "mssql-scripter.log")
 
 
-def initialize_logger():
+def get_config_run_log_dir():
+    """
+    Retrieve directory holding per-run log files, create it if it doesn't exist.
+    """
+    run_log_dir = os.path.join(get_config_log_dir(), "logs")
+    if not os.path.exists(run_log_dir):
+        os.makedirs(run_log_dir, exist_ok=True)
+    return run_log_dir
+
+
+def get_config_run_log_file():
+    """
+    Retrieve a log file path unique to this process.
+    """
+    return os.path.join(
+        get_config_run_log_dir(),
+        f"mssql-scripter-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.log",
+    )
+
+
+def is_active_run_log(log_file, mtime, now):
+    """
+    Return whether the process writing a per-run log may still be running. Process ids are checked where signal 0
+    probes a process, elsewhere recently modified logs count as active.
+    """
+    match = RUN_LOG_PID_PATTERN.match(os.path.basename(log_file))
+    if match and os.name == "posix":
+        pid = int(match.group(1))
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # The process exists but belongs to another user.
+            return True
+        return True
+    return now - mtime < RUN_LOG_ACTIVE_SECONDS
+
+
+def prune_run_logs(
+    run_log_dir, max_files=RUN_LOG_MAX_FILES, max_total_bytes=RUN_LOG_MAX_TOTAL_BYTES
+):
+    """
+    Delete the oldest per-run log files until both the file count and the total size are within limits. Logs of
+    runs that may still be going count towards the limits but are never deleted. Concurrent runs may prune the
+    same files, so files that disappear underneath us are ignored.
+    """
+    now = time.time()
+    log_files = []
+    for log_file in glob.glob(os.path.join(run_log_dir, "mssql-scripter-*.log*")):
+        try:
+            stat = os.stat(log_file)
+        except OSError:
+            continue
+        log_files.append((stat.st_mtime, stat.st_size, log_file))
+
+    # Newest first, everything past the limits gets removed.
+    log_files.sort(reverse=True)
+    file_count = 0
+    total_bytes = 0
+    for mtime, size, log_file in log_files:
+        file_count += 1
+        total_bytes += size
+        if (
+            file_count > max_files or total_bytes > max_total_bytes
+        ) and not is_active_run_log(log_file, mtime, now):
+            try:
+                os.remove(log_file)
+            except OSError:
+                pass
+
+
+def initialize_logger(level="DEBUG", mode="shared"):
     """
     Initializes root logger for scripter with rotating file handler. Should only be called once from main program.
+    Records are queued and written to the file by a background listener thread so callers never block on disk I/O.
+    In per-run mode each process rotates only its own file, which keeps concurrent runs from racing on rotation.
     """
+    global _listener, _shutdown_registered
+
     scripter_logger = logging.getLogger("mssqlscripter")
-    scripter_logger.setLevel(logging.DEBUG)
-    handler = logging.handlers.RotatingFileHandler(
-        get_config_log_file(), maxBytes=2 * 1024 * 1024, backupCount=10
-    )
+    scripter_logger.setLevel(level)
+    if mode == "per-run":
+        prune_run_logs(get_config_run_log_dir())
+        handler = logging.handlers.RotatingFileHandler(
+            get_config_run_log_file(),
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=RUN_LOG_FILE_BACKUP_COUNT,
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            get_config_log_file(),
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUP_COUNT,
+        )
 
     formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        "%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s"
     )
     handler.setFormatter(formatter)
-    scripter_logger.addHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    scripter_logger.addHandler(DeferredFormatQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    if not _shutdown_registered:
+        # Make sure queued records reach the file even if shutdown_logger() is never called.
+        atexit.register(shutdown_logger)
+        _shutdown_registered = True
+
+    return _listener
+
+
+def shutdown_logger():
+    """
+    Flush queued records to the log file and stop the background listener.
+    """
+    global _listener
+
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
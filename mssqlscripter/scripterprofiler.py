@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+logger = logging.getLogger("mssqlscripter.scripterprofiler")
+
+
+def get_profile_file(log_dir):
+    """
+    Retrieve a profile output path next to the log file that is unique to this run.
+    """
+    return os.path.join(
+        log_dir,
+        f"mssql-scripter-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.pstats",
+    )
+
+
+class ScripterProfiler(object):
+    """
+    Profile the main thread and every thread started through the threading module afterwards, such as the
+    json rpc request and response threads.
+    """
+
+    def __init__(self):
+        self.main_profile = cProfile.Profile()
+        # Profiles of background threads, one per thread.
+        self.thread_profiles = []
+        self.lock = threading.Lock()
+        # From Python 3.12 cProfile is built on sys.monitoring, which already reports events from every thread
+        # and only allows a single active profiler.
+        self.per_thread = sys.version_info < (3, 12)
+
+    def start(self):
+        """
+        Start profiling the calling thread and any thread started from now on.
+        """
+        if self.per_thread:
+            threading.setprofile(self._start_thread_profile)
+        self.main_profile.enable()
+
+    def _start_thread_profile(self, frame, event, arg):
+        """
+        Installed by threading as the profile hook of each new thread. Enabling a profiler replaces this hook,
+        so it only runs once per thread.
+        """
+        profile = cProfile.Profile()
+        with self.lock:
+            self.thread_profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        """
+        Stop profiling and return the combined statistics of all profiled threads.
+        """
+        self.main_profile.disable()
+        if self.per_thread:
+            threading.setprofile(None)
+
+        stats = pstats.Stats(self.main_profile)
+        with self.lock:
+            thread_profiles = list(self.thread_profiles)
+        for profile in thread_profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # The thread never made a profiled call, so there is nothing to add.
+                pass
+
+        return stats
+
+    def stop_and_dump(self, file_path):
+        """
+        Stop profiling and write the combined statistics in pstats format to file_path.
+        """
+        stats = self.stop()
+        stats.dump_stats(file_path)
+        logger.info(
+            "Profile of %s threads written to %s",
+            len(self.thread_profiles) + 1,
+            file_path,
+        )
+        return file_path
@@ -0,0 +1,102 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import os
+import time
+
+logger = logging.getLogger("mssqlscripter.scriptertimings")
+
+
+def get_process_age():
+    """
+    Seconds since the operating system started this process, None when the platform does not expose it.
+    Used to account for interpreter startup that happens before any of our code runs.
+    """
+    try:
+        with open("/proc/self/stat", "rb") as stat_file:
+            stat = stat_file.read()
+        with open("/proc/uptime", "rb") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        # The command name may contain spaces, fields are counted from the closing parenthesis.
+        fields = stat[stat.rindex(b")") + 2 :].split()
+        # Field 22 of /proc/<pid>/stat is the start time in clock ticks since boot.
+        start_ticks = int(fields[19])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PhaseTimer(object):
+    """
+    Record the end of each phase of a scripting run and report the time spent in it.
+    Marking a phase is a single perf_counter call, so the timer is always on. A phase marked again, like the
+    scripting of every request of a split run, adds the time since the previous mark to its duration.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.process_age = get_process_age()
+        # List of (phase name, perf_counter value when the phase ended).
+        self.marks = []
+        # Timing lines of marks made before logging started.
+        self.unlogged = []
+        self.logging = False
+
+    def mark(self, phase):
+        """
+        Mark the end of phase.
+        """
+        now = time.perf_counter()
+        previous = self.marks[-1][1] if self.marks else self.start_time
+        self.marks.append((phase, now))
+        timing = (phase, (now - previous) * 1000, (now - self.start_time) * 1000)
+        if self.logging:
+            self._log(timing)
+        else:
+            self.unlogged.append(timing)
+
+    def start_logging(self):
+        """
+        Log the marks made so far, before the logger was initialized, and every later mark as it is made.
+        """
+        self.logging = True
+        for timing in self.unlogged:
+            self._log(timing)
+        self.unlogged = []
+
+    def _log(self, timing):
+        logger.info("timing phase=%s duration_ms=%.3f elapsed_ms=%.3f", *timing)
+
+    def phases(self):
+        """
+        Return a list of (phase name, duration in seconds) in the order the phases first ended.
+        """
+        phases = []
+        if self.process_age is not None:
+            phases.append(("python_startup", self.process_age))
+
+        # Dictionaries keep the order phases were first marked in.
+        durations = {}
+        previous = self.start_time
+        for phase, end in self.marks:
+            durations[phase] = durations.get(phase, 0.0) + end - previous
+            previous = end
+
+        phases.extend(durations.items())
+        return phases
+
+    def report(self, stream):
+        """
+        Write a human readable table of phase durations to stream.
+        """
+        phases = self.phases()
+        total = sum(duration for _, duration in phases)
+        name_width = max([len(phase) for phase, _ in phases] + [len("total")])
+
+        stream.write("Scripting timings:\n")
+        for phase, duration in phases:
+            stream.write(f"  {phase:<{name_width}}  {duration * 1000:10.1f} ms\n")
+        stream.write(f"  {'total':<{name_width}}  {total * 1000:10.1f} ms\n")
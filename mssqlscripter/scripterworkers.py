@@ -0,0 +1,460 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scriptingservice
+import mssqlscripter.scriptercallbacks as scriptercallbacks
+import mssqlscripter.sqltoolsclient as sqltoolsclient
+
+logger = logging.getLogger("mssqlscripter.scripterworkers")
+
+
+class ToolsServiceWorker(object):
+    """
+    A Sql Tools Service process and the client talking to it.
+    """
+
+    def __init__(self, sqltoolsservice_args, timer=None):
+        logger.debug(
+            "Loading mssqltoolsservice with arguments %s", sqltoolsservice_args
+        )
+        self.client = None
+        # Start mssqltoolsservice program.
+        self.process = subprocess.Popen(
+            sqltoolsservice_args,
+            bufsize=0,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+        try:
+            # Python 2.7 uses the built-in File type when referencing the subprocess.PIPE.
+            # This built-in type for that version blocks on readinto() because it attempts to fill buffer.
+            # Wrap a FileIO around it to use a different implementation that does not attempt to fill the buffer
+            # on readinto().
+            self.std_out_wrapped = io.open(
+                self.process.stdout.fileno(), "rb", buffering=0, closefd=False
+            )
+
+            if timer:
+                timer.mark("tools_service_spawn")
+
+            self.client = sqltoolsclient.SqlToolsClient(
+                self.process.stdin, self.std_out_wrapped, timer
+            )
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def close(self):
+        if self.client:
+            self.client.shutdown()
+            self.client = None
+
+        if self.process:
+            self.process.kill()
+            # 1 second time out, allow tools service process to be killed.
+            time.sleep(0.1)
+            # Close the stdout file handle or else we would get a resource warning (found via pytest).
+            # This must be closed after the process is killed, otherwise we would block because the process is
+            # using it's stdout.
+            self.process.stdout.close()
+            # None value indicates process has not terminated.
+            if not self.process.poll():
+                sys.stderr.write(
+                    "Sql Tools Service process was not shut down properly."
+                )
+            self.process = None
+
+
+def run_scripting_requests(
+    sql_tools_client,
+    scripting_parameters,
+    parameters,
+    on_progress=None,
+    governor=None,
+):
+    """
+    Script the objects scripting_parameters select, returning True if every scripting request succeeded. Each
+    request waits for the load governor, if given, before it starts, and on_progress is called with every
+    progress notification.
+    """
+    # Long include object lists are scripted through several requests on the same tools service.
+    request_parameters = scriptingservice.split_parameters(
+        scripting_parameters, parameters.MaxObjectsPerRequest
+    )
+    if len(request_parameters) > 1:
+        logger.info(
+            "Splitting %s objects across %s scripting requests",
+            len(scripting_parameters["IncludeObjects"]),
+            len(request_parameters),
+        )
+
+    for request_parameter in request_parameters:
+        if governor:
+            governor.before_request()
+
+        try:
+            scripting_request = sql_tools_client.create_request(
+                "scripting_request", request_parameter
+            )
+            scripting_request.execute()
+
+            scripting_failed = False
+            while not scripting_request.completed():
+                response = scripting_request.get_response()
+                if response:
+                    scriptercallbacks.handle_response(
+                        response, parameters.DisplayProgress
+                    )
+                    if isinstance(
+                        response, scriptingservice.ScriptProgressNotificationEvent
+                    ):
+                        if on_progress:
+                            on_progress(response)
+                        if governor:
+                            governor.record_progress(response.completed_count)
+                    if getattr(response, "has_error", False):
+                        scripting_failed = True
+                else:
+                    # The sleep prevents burning up the CPU and lets other threads get scheduled.
+                    time.sleep(0.1)
+        finally:
+            if governor:
+                governor.after_request()
+
+        if scripting_failed:
+            # Later requests would only append to a script that is already incomplete.
+            return False
+
+    return True
+
+
+def run_threads(count, target, name):
+    """
+    Call target with each index below count on its own thread and return the results in index order. The first
+    exception raised by a thread is raised once all threads finished.
+    """
+    results = [None] * count
+    errors = []
+
+    def run(index):
+        try:
+            results[index] = target(index)
+        except Exception as error:
+            logger.exception("%s %s failed", name, index)
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=run, args=(index,), name=f"{name} {index}")
+        for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def run_shards(
+    workers, shard_parameters, parameters, progress_handlers=None, governors=None
+):
+    """
+    Script one set of scripting parameters on each worker concurrently, returning True if every shard succeeded.
+    progress_handlers and governors, if given, hold one entry per worker.
+    """
+
+    def run_shard(index):
+        return run_scripting_requests(
+            workers[index].client,
+            shard_parameters[index],
+            parameters,
+            progress_handlers[index] if progress_handlers else None,
+            governors[index] if governors else None,
+        )
+
+    return all(run_threads(len(shard_parameters), run_shard, "Scripting shard"))
+
+
+def start_workers(worker, sqltoolsservice_args, count):
+    """
+    Return worker followed by enough new workers to make count.
+    """
+    workers = [worker]
+    try:
+        for _ in range(count - 1):
+            workers.append(ToolsServiceWorker(sqltoolsservice_args))
+    except Exception:
+        stop_workers(workers)
+        raise
+    return workers
+
+
+def stop_workers(workers):
+    """
+    Close every worker start_workers started.
+    """
+    for extra_worker in workers[1:]:
+        extra_worker.close()
+
+
+def chain_progress(recorder, on_progress=None):
+    """
+    Return a progress handler feeding the duration recorder and then on_progress, if given.
+    """
+    if not on_progress:
+        return recorder.record_progress
+
+    def handle_progress(response):
+        recorder.record_progress(response)
+        on_progress(response)
+
+    return handle_progress
+
+
+def record_durations(history, target, type_of_data, recorders):
+    """
+    Add the durations the duration recorders observed to the run history.
+    """
+    durations = {}
+    for recorder in recorders:
+        durations.update(recorder.durations)
+    if durations:
+        history.record(target, type_of_data, durations)
+
+
+def script_on_first_worker(
+    worker, scripting_parameters, parameters, make_governor=None, on_progress=None
+):
+    """
+    Script like a run with one worker, for plans without objects to spread across workers. The script then holds
+    what the tools service writes for an empty selection, like its USE statement.
+    """
+    return run_scripting_requests(
+        worker.client,
+        scripting_parameters,
+        parameters,
+        on_progress,
+        make_governor() if make_governor else None,
+    )
+
+
+def script_in_parallel(
+    worker,
+    sqltoolsservice_args,
+    plan,
+    positions,
+    scripting_parameters,
+    parameters,
+    make_governor=None,
+    on_progress=None,
+):
+    """
+    Script the plan objects at positions on parameters.Workers tools services, worker being the first. Objects are
+    assigned to workers longest processing time first using durations from the run history, which is updated with
+    the durations of this run. Single file scripts are written per worker and merged in plan order. on_progress, if
+    given, is called with every progress notification of every worker. Return True if every worker succeeded.
+    """
+    import tempfile
+
+    import mssqlscripter.runhistory as runhistory
+    import mssqlscripter.scriptmerge as scriptmerge
+    import mssqlscripter.shardscheduler as shardscheduler
+
+    if not positions:
+        return script_on_first_worker(
+            worker, scripting_parameters, parameters, make_governor, on_progress
+        )
+
+    target = runhistory.get_history_target(parameters.ConnectionString)
+    type_of_data = parameters.TypeOfDataToScript
+    history = runhistory.RunHistory()
+    try:
+        estimates = history.estimate(target, type_of_data, plan, positions)
+        shards, _ = shardscheduler.schedule_lpt(
+            positions, estimates, parameters.Workers
+        )
+
+        single_file = scripting_parameters["ScriptDestination"] == "ToSingleFile"
+        first_position = min(positions)
+        workers = start_workers(worker, sqltoolsservice_args, len(shards))
+        try:
+            with tempfile.TemporaryDirectory(prefix="mssqlscripter_") as parts_dir:
+                shard_parameters = []
+                for index, shard in enumerate(shards):
+                    shard_parameter = dict(
+                        scripting_parameters,
+                        IncludeObjects=plan.to_scripting_objects(shard),
+                    )
+                    if single_file:
+                        shard_parameter.update(
+                            FilePath=os.path.join(parts_dir, f"{index:06}.sql"),
+                            AppendToFile=False,
+                        )
+                        # Only the shard with the first object of the plan starts the merged script.
+                        if shard[0] != first_position:
+                            shard_parameter["ScriptUseDatabase"] = False
+                    shard_parameters.append(shard_parameter)
+
+                recorders = [runhistory.DurationRecorder() for _ in shards]
+                succeeded = run_shards(
+                    workers,
+                    shard_parameters,
+                    parameters,
+                    [chain_progress(recorder, on_progress) for recorder in recorders],
+                    [make_governor() for _ in shards] if make_governor else None,
+                )
+
+                if single_file and succeeded:
+                    scriptmerge.merge_scripts(
+                        [
+                            shard_parameter["FilePath"]
+                            for shard_parameter in shard_parameters
+                        ],
+                        shards,
+                        plan,
+                        parameters.FilePath,
+                        parameters.AppendToFile,
+                    )
+        finally:
+            stop_workers(workers)
+
+        record_durations(history, target, type_of_data, recorders)
+        return succeeded
+    finally:
+        history.close()
+
+
+def script_in_batches(
+    worker,
+    sqltoolsservice_args,
+    plan,
+    positions,
+    scripting_parameters,
+    parameters,
+    make_governor=None,
+    on_progress=None,
+):
+    """
+    Script the plan objects at positions on parameters.Workers tools services, worker being the first. Each worker
+    is given the next batch of objects as soon as its previous scripting request completes, so a worker held up by
+    a slow object does not hold up the objects after it. A single file script is written per batch and the batches
+    are joined in plan order. on_progress is called like script_in_parallel calls it. Return True if every batch
+    succeeded.
+    """
+    import tempfile
+
+    import mssqlscripter.batchdispatcher as batchdispatcher
+    import mssqlscripter.runhistory as runhistory
+    import mssqlscripter.scriptmerge as scriptmerge
+
+    if not positions:
+        return script_on_first_worker(
+            worker, scripting_parameters, parameters, make_governor, on_progress
+        )
+
+    single_file = scripting_parameters["ScriptDestination"] == "ToSingleFile"
+    dispatcher = batchdispatcher.BatchDispatcher(
+        positions, parameters.Workers, parameters.MaxObjectsPerRequest
+    )
+    workers = start_workers(
+        worker, sqltoolsservice_args, min(parameters.Workers, len(positions))
+    )
+    recorders = [runhistory.DurationRecorder() for _ in workers]
+    progress_handlers = [
+        chain_progress(recorder, on_progress) for recorder in recorders
+    ]
+    part_paths = {}
+
+    with tempfile.TemporaryDirectory(prefix="mssqlscripter_") as parts_dir:
+
+        def run_worker(index):
+            try:
+                return run_batches(index)
+            except Exception:
+                # The other workers stop after their current batch, the run fails anyway.
+                dispatcher.stop()
+                raise
+
+        def run_batches(index):
+            governor = make_governor() if make_governor else None
+            while True:
+                batch = dispatcher.next_batch()
+                if batch is None:
+                    return True
+
+                batch_number, batch_positions = batch
+                batch_parameters = dict(
+                    scripting_parameters,
+                    IncludeObjects=plan.to_scripting_objects(batch_positions),
+                )
+                if single_file:
+                    part_paths[batch_number] = os.path.join(
+                        parts_dir, f"{batch_number:06}.sql"
+                    )
+                    batch_parameters.update(
+                        FilePath=part_paths[batch_number], AppendToFile=False
+                    )
+                    # Batches after the first continue the script of the first one.
+                    if batch_number:
+                        batch_parameters["ScriptUseDatabase"] = False
+
+                start_time = time.perf_counter()
+                if not run_scripting_requests(
+                    workers[index].client,
+                    batch_parameters,
+                    parameters,
+                    progress_handlers[index],
+                    governor,
+                ):
+                    dispatcher.stop()
+                    return False
+                dispatcher.record(
+                    len(batch_positions), time.perf_counter() - start_time
+                )
+
+        try:
+            succeeded = all(run_threads(len(workers), run_worker, "Scripting worker"))
+        finally:
+            stop_workers(workers)
+
+        if single_file and succeeded:
+            scriptmerge.concatenate_scripts(
+                [part_paths[batch_number] for batch_number in sorted(part_paths)],
+                parameters.FilePath,
+                parameters.AppendToFile,
+            )
+
+    logger.info(
+        "Scripted %s objects in %s batches on %s workers",
+        len(positions),
+        dispatcher.batch_count,
+        len(workers),
+    )
+    history = runhistory.RunHistory()
+    try:
+        record_durations(
+            history,
+            runhistory.get_history_target(parameters.ConnectionString),
+            parameters.TypeOfDataToScript,
+            recorders,
+        )
+    finally:
+        history.close()
+    return succeeded
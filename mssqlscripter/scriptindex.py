@@ -0,0 +1,195 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Sidecar index of the objects in a single file script, for random access to the script of one object.
+
+The index is a JSON file next to the script, named like the script with INDEX_FILE_SUFFIX added, holding the
+byte offset and length of every object the script holds and of the preamble before them:
+
+    import mssqlscripter.scriptindex as scriptindex
+
+    with scriptindex.ScriptIndex("./adventureworks.sql") as index:
+        script = index.get_script("dbo", "uspGetBillOfMaterials")
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import mssqlscripter.scriptsplitter as scriptsplitter
+
+logger = logging.getLogger("mssqlscripter.scriptindex")
+
+INDEX_FILE_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+
+def get_index_path(script_path):
+    return script_path + INDEX_FILE_SUFFIX
+
+
+def build_index(script_path):
+    """
+    Scan the script at script_path for object boundaries and return its index.
+    """
+    objects = []
+    preamble = (0, 0)
+    buffer = scriptsplitter.open_script(script_path)
+    if buffer is not None:
+        try:
+            preamble, objects = scriptsplitter.find_objects(buffer)
+            size = len(buffer)
+        finally:
+            buffer.close()
+    else:
+        size = 0
+
+    return {
+        "version": INDEX_VERSION,
+        "size": size,
+        "preamble": [preamble[0], preamble[1] - preamble[0]],
+        "objects": [
+            [
+                script_object.type,
+                script_object.schema,
+                script_object.name,
+                script_object.start,
+                script_object.end - script_object.start,
+            ]
+            for script_object in objects
+        ],
+    }
+
+
+def write_index(script_path, plan=None):
+    """
+    Write the index of the script at script_path next to it and return the index path. Objects of the plan, if
+    given, that the scan did not find are logged.
+    """
+    index = build_index(script_path)
+    if plan is not None:
+        found = {
+            (script_type, schema, name)
+            for script_type, schema, name, _, _ in index["objects"]
+        }
+        missing = [
+            scripting_object
+            for scripting_object in plan
+            if (scripting_object.type, scripting_object.schema, scripting_object.name)
+            not in found
+        ]
+        if missing:
+            logger.warning(
+                "%s objects of the plan have no header in %s, first %s",
+                len(missing),
+                script_path,
+                missing[0],
+            )
+
+    index_path = get_index_path(script_path)
+    handle, temp_path = tempfile.mkstemp(
+        prefix=".tmp_", suffix=INDEX_FILE_SUFFIX, dir=os.path.dirname(index_path) or "."
+    )
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+        os.replace(temp_path, index_path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    logger.info("Indexed %s objects of %s", len(index["objects"]), script_path)
+    return index_path
+
+
+class IndexEntry(object):
+    """
+    Location of the script of one object in a single file script.
+    """
+
+    __slots__ = ("type", "schema", "name", "offset", "length")
+
+    def __init__(self, script_type, schema, name, offset, length):
+        self.type = script_type
+        self.schema = schema
+        self.name = name
+        self.offset = offset
+        self.length = length
+
+    def __repr__(self):
+        return f"IndexEntry({self.type!r}, {self.schema!r}, {self.name!r}, {self.offset}, {self.length})"
+
+
+class ScriptIndex(object):
+    """
+    Random access to the objects of a single file script through its sidecar index. The script is memory mapped,
+    so reading one object only reads its own pages. Raises ValueError if the index does not match the script.
+    """
+
+    def __init__(self, script_path, index_path=None):
+        self.script_path = script_path
+        with open(
+            index_path or get_index_path(script_path), encoding="utf-8"
+        ) as index_file:
+            index = json.load(index_file)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported script index version {index.get('version')}")
+        if os.path.getsize(script_path) != index["size"]:
+            raise ValueError(f"The index of {script_path} is out of date")
+
+        self.preamble = tuple(index["preamble"])
+        self.entries = [IndexEntry(*entry) for entry in index["objects"]]
+        self.names = {}
+        for entry in self.entries:
+            self.names.setdefault((entry.schema, entry.name), []).append(entry)
+        self.buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def find(self, schema, name, script_type=None):
+        """
+        Return the entries of objects with the given schema and name, optionally restricted to a type.
+        """
+        return [
+            entry
+            for entry in self.names.get((schema, name), ())
+            if script_type is None or entry.type == script_type
+        ]
+
+    def read(self, offset, length):
+        if self.buffer is None:
+            self.buffer = scriptsplitter.open_script(self.script_path)
+        return self.buffer[offset : offset + length]
+
+    def get_script(self, schema, name, script_type=None, include_preamble=False):
+        """
+        Return the script of the object with the given schema, name and optionally type as bytes, starting with
+        the preamble of the script, like its USE statement, with include_preamble. Raises KeyError if the script
+        has no such object.
+        """
+        entries = self.find(schema, name, script_type)
+        if not entries:
+            raise KeyError(f"{schema}.{name}")
+        script = b"".join(self.read(entry.offset, entry.length) for entry in entries)
+        if include_preamble:
+            script = self.read(*self.preamble) + script
+        return script
@@ -0,0 +1,240 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Merge of single file scripts written by parallel workers into one script in plan order.
+
+Every object of a script starts with the descriptive header SMO writes for it, for example
+/****** Object:  Table [dbo].[Customer]    Script Date: 1/1/2020 12:00:00 AM ******/. Shard scripts are indexed
+into per object segments by these headers, the segments of all shards are merged by their plan position and copied
+to the output without reading them into memory. Shard scripts that cannot be indexed, for example because they do
+not script their objects in plan order, are concatenated whole instead.
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import re
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scriptingservice
+
+logger = logging.getLogger("mssqlscripter.scriptmerge")
+
+UTF8_BOM = b"\xef\xbb\xbf"
+COPY_BUFFER_SIZE = 1024 * 1024
+HEADER_PATTERN = re.compile(rb"^/\*{6} Object:  (\S+) (.+?)\s+Script Date: ")
+# Whole descriptive header lines, their Script Date differs between runs scripting the same object.
+HEADER_LINE_PATTERN = re.compile(
+    rb"/\*{6} Object:  [^\r\n]*?Script Date: [^\r\n]*(?:\r?\n)?"
+)
+# Objects scripted around the other objects of their script. After their header and statements come the other
+# objects, and after those, without a header, statements like setting the database READ_WRITE from master.
+WRAPPING_TYPES = {"Database"}
+TRAILER_PATTERN = re.compile(rb"^USE \[master\]\s*$")
+
+
+class ScriptSegment(object):
+    """
+    The bytes of a script file from start to end holding the script of the object at a plan position.
+    """
+
+    __slots__ = ("position", "path", "start", "end")
+
+    def __init__(self, position, path, start, end=None):
+        self.position = position
+        self.path = path
+        self.start = start
+        self.end = end
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __repr__(self):
+        return (
+            f"ScriptSegment({self.position}, {self.path!r}, {self.start}, {self.end})"
+        )
+
+
+def parse_header(line):
+    """
+    Return the type, schema and name of the object a header line starts, or None if line is not a header.
+    """
+    match = HEADER_PATTERN.match(line)
+    if not match:
+        return None
+    schema, name = scriptingservice.parse_object_name(
+        match.group(2).decode("utf-8", errors="replace")
+    )
+    return match.group(1).decode("utf-8", errors="replace"), schema, name
+
+
+def strip_headers(data):
+    """
+    Return script bytes without their descriptive header lines.
+    """
+    return HEADER_LINE_PATTERN.sub(b"", data)
+
+
+def script_digest(data):
+    """
+    Return the sha256 hex digest of script bytes without their descriptive headers, so scripts of an object made
+    at different times, or with and without headers, share a digest.
+    """
+    return hashlib.sha256(strip_headers(data)).hexdigest()
+
+
+def index_script(path, catalog, positions):
+    """
+    Split the script at path into segments per object of the plan catalog, given the positions scripted to it.
+
+    Headers of objects outside positions, like indexes SMO scripts with their table, stay in the segment before
+    them. Bytes before the first header, like the USE statement, belong to the first segment. The statements a
+    database object ends the script with, after the last header, become a segment positioned after every object
+    of the plan. Raises ValueError if the objects are not scripted in plan order.
+    """
+    positions = set(positions)
+    segments = []
+    wrapped = False
+    trailer_start = None
+    with open(path, "rb", buffering=COPY_BUFFER_SIZE) as script_file:
+        offset = 0
+        for line in script_file:
+            text = line
+            if offset == 0 and line.startswith(UTF8_BOM):
+                text = line[len(UTF8_BOM) :]
+            header = parse_header(text) if text.startswith(b"/*") else None
+            if header:
+                script_type, schema, name = header
+                candidates = [
+                    position
+                    for position in catalog.find(schema, name, script_type)
+                    if position in positions
+                ]
+                if candidates:
+                    segment = ScriptSegment(candidates[0], path, offset)
+                    if segments:
+                        if segment.position <= segments[-1].position:
+                            raise ValueError(
+                                f"{path} does not script {script_type} {schema}.{name} in plan order"
+                            )
+                        segments[-1].end = offset
+                    else:
+                        # The first segment also carries what comes before its header.
+                        segment.start = 0
+                    segments.append(segment)
+                    wrapped = wrapped or script_type in WRAPPING_TYPES
+                trailer_start = None
+            elif wrapped and trailer_start is None and TRAILER_PATTERN.match(text):
+                trailer_start = offset
+            offset += len(line)
+
+    if segments:
+        segments[-1].end = offset
+        if trailer_start is not None:
+            segments[-1].end = trailer_start
+            segments.append(ScriptSegment(len(catalog), path, trailer_start, offset))
+    elif offset and positions:
+        raise ValueError(f"{path} has no descriptive headers to merge it by")
+    return segments
+
+
+def copy_range(source, target, start, length):
+    """
+    Copy length bytes from offset start of the source file to the current position of the target file, in the
+    kernel where the platform supports it.
+    """
+    target.flush()
+    source_fd = source.fileno()
+    target_fd = target.fileno()
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range:
+        try:
+            while length > 0:
+                copied = copy_file_range(
+                    source_fd, target_fd, min(length, COPY_BUFFER_SIZE), start
+                )
+                if not copied:
+                    break
+                start += copied
+                length -= copied
+            return
+        except OSError:
+            # Not supported between these files, for example across file systems on older kernels.
+            pass
+
+    os.lseek(source_fd, start, os.SEEK_SET)
+    while length > 0:
+        chunk = os.read(source_fd, min(length, COPY_BUFFER_SIZE))
+        if not chunk:
+            break
+        os.write(target_fd, chunk)
+        length -= len(chunk)
+
+
+def write_segments(segments, file_path, append=False):
+    """
+    Copy segments in the given order to file_path. Byte order marks are only kept at the start of the output.
+    """
+    sources = {}
+    first = True
+    try:
+        with open(file_path, "ab" if append else "wb") as output:
+            for segment in segments:
+                source = sources.get(segment.path)
+                if source is None:
+                    source = sources[segment.path] = open(segment.path, "rb")
+                start = segment.start
+                if start == 0 and not first:
+                    source.seek(0)
+                    if source.read(len(UTF8_BOM)) == UTF8_BOM:
+                        start = len(UTF8_BOM)
+                copy_range(source, output, start, segment.end - start)
+                first = False
+    finally:
+        for source in sources.values():
+            source.close()
+
+
+def merge_scripts(shard_paths, shard_positions, catalog, file_path, append=False):
+    """
+    Merge the single file scripts of shards into one script at file_path in plan order, streaming a k-way merge
+    of their per object segments. shard_positions holds the plan positions scripted to each shard, which must
+    have been scripted with descriptive headers. A shard script that cannot be split into segments is not lost,
+    the shard scripts are then concatenated in the order of their first plan position instead.
+    """
+    shards = [
+        (path, positions)
+        for path, positions in zip(shard_paths, shard_positions)
+        if os.path.exists(path)
+    ]
+    try:
+        shard_segments = [
+            index_script(path, catalog, positions) for path, positions in shards
+        ]
+    except ValueError as error:
+        logger.warning("%s, concatenating the shard scripts instead of merging", error)
+        shards.sort(key=lambda shard: min(shard[1], default=len(catalog)))
+        concatenate_scripts([path for path, _ in shards], file_path, append)
+        return
+
+    logger.info(
+        "Merging %s segments of %s shard scripts into %s",
+        sum(len(segments) for segments in shard_segments),
+        len(shard_segments),
+        file_path,
+    )
+    write_segments(heapq.merge(*shard_segments), file_path, append)
+
+
+def concatenate_scripts(paths, file_path, append=False):
+    """
+    Concatenate whole scripts to file_path in the given order.
+    """
+    segments = [
+        ScriptSegment(index, path, 0, os.path.getsize(path))
+        for index, path in enumerate(paths)
+    ]
+    write_segments(segments, file_path, append)
@@ -0,0 +1,203 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Split a single file script into a file per object or a file per object type.
+
+The script is memory mapped and searched as bytes for the descriptive header SMO writes before every object. A
+header only starts an object where a batch ends, at the start of the script or after a GO batch separator, so
+header like comments inside a procedure body are left alone. Object slices are written straight from the mapping,
+which keeps memory flat however large the script is.
+"""
+
+import collections
+import concurrent.futures
+import logging
+import mmap
+import os
+import re
+
+import mssqlscripter.scriptmerge as scriptmerge
+
+logger = logging.getLogger("mssqlscripter.scriptsplitter")
+
+HEADER_START = b"/****** Object:  "
+# Objects SMO scripts with their parent, they stay in the file of the object before them.
+CHILD_OBJECT_TYPES = frozenset(("Index", "Statistic", "FullTextIndex"))
+UNSAFE_FILE_NAME_CHARACTERS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+WRITE_CHUNK_SIZE = 8 * 1024 * 1024
+
+ScriptObject = collections.namedtuple(
+    "ScriptObject", ["type", "schema", "name", "start", "end"]
+)
+
+
+def open_script(path):
+    """
+    Memory map the script at path read only, return None for an empty script.
+    """
+    with open(path, "rb") as script_file:
+        if not os.fstat(script_file.fileno()).st_size:
+            return None
+        # The mapping stays valid after the file is closed.
+        return mmap.mmap(script_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def ends_batch(buffer, position, start):
+    """
+    Return True if only white space lies between position and the GO batch separator ending the line before it,
+    or between start and position.
+    """
+    line_end = position
+    while line_end > start and buffer[line_end - 1 : line_end] in (
+        b"\n",
+        b"\r",
+        b" ",
+        b"\t",
+    ):
+        line_end -= 1
+    if line_end == start:
+        return True
+    line_start = buffer.rfind(b"\n", start, line_end) + 1 or start
+    return buffer[max(line_start, start) : line_end].strip().upper() == b"GO"
+
+
+def find_objects(buffer):
+    """
+    Find the objects of a single file script held by a bytes like buffer supporting find, in script order.
+    Return the preamble before the first object, as a (start, end) pair, and the list of objects.
+    """
+    start = len(scriptmerge.UTF8_BOM) if buffer[:3] == scriptmerge.UTF8_BOM else 0
+    objects = []
+    preamble_end = len(buffer)
+    previous = None
+    position = buffer.find(HEADER_START, start)
+    while position != -1:
+        line_end = buffer.find(b"\n", position)
+        if line_end == -1:
+            line_end = len(buffer)
+        at_line_start = position == start or buffer[position - 1 : position] == b"\n"
+        header = (
+            scriptmerge.parse_header(buffer[position : line_end + 1])
+            if at_line_start
+            else None
+        )
+        if header and header[0] not in CHILD_OBJECT_TYPES:
+            batch_start = previous.start if previous else start
+            if not ends_batch(buffer, position, batch_start):
+                header = None
+        if header and header[0] not in CHILD_OBJECT_TYPES:
+            if previous:
+                objects.append(previous._replace(end=position))
+            else:
+                preamble_end = position
+            script_type, schema, name = header
+            previous = ScriptObject(script_type, schema, name, position, None)
+        position = buffer.find(HEADER_START, line_end)
+
+    if previous:
+        objects.append(previous._replace(end=len(buffer)))
+    return (0, preamble_end if objects else len(buffer)), objects
+
+
+def object_file_name(script_object):
+    """
+    File name of an object like the ones file per object scripting uses, schema.name.type.sql.
+    """
+    name = ".".join(
+        part
+        for part in (script_object.schema, script_object.name, script_object.type)
+        if part
+    )
+    return UNSAFE_FILE_NAME_CHARACTERS.sub("_", name) + ".sql"
+
+
+def write_slices(view, preamble, slices, file_path):
+    """
+    Write the preamble and the (start, end) slices of a memoryview to file_path.
+    """
+    with open(file_path, "wb") as output:
+        for start, end in (preamble,) + tuple(slices):
+            for chunk_start in range(start, end, WRITE_CHUNK_SIZE):
+                output.write(
+                    view[chunk_start : min(end, chunk_start + WRITE_CHUNK_SIZE)]
+                )
+
+
+def split_script(script_path, output_dir, by_type=False, workers=None):
+    """
+    Split the single file script at script_path into output_dir, a file per object or with by_type a file per
+    object type. Every file starts with what the script has before its first object, like the USE statement.
+    Return the number of objects found.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    buffer = open_script(script_path)
+    if buffer is None:
+        return 0
+
+    try:
+        preamble, objects = find_objects(buffer)
+        if not objects:
+            raise ValueError(
+                f"{script_path} has no object headers to split it by, script it without --exclude-headers"
+            )
+
+        files = collections.OrderedDict()
+        for script_object in objects:
+            file_name = (
+                UNSAFE_FILE_NAME_CHARACTERS.sub("_", script_object.type) + ".sql"
+                if by_type
+                else object_file_name(script_object)
+            )
+            files.setdefault(file_name, []).append(
+                (script_object.start, script_object.end)
+            )
+
+        logger.info(
+            "Splitting %s objects of %s into %s files",
+            len(objects),
+            script_path,
+            len(files),
+        )
+        view = memoryview(buffer)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        write_slices,
+                        view,
+                        preamble,
+                        slices,
+                        os.path.join(output_dir, file_name),
+                    )
+                    for file_name, slices in files.items()
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            view.release()
+        return len(objects)
+    finally:
+        buffer.close()
+
+
+def main(args):
+    """
+    Entry point of mssql-scripter split.
+    """
+    import sys
+
+    import mssqlscripter.argparser as parser
+
+    parameters = parser.parse_split_arguments(args)
+    count = split_script(
+        parameters.ScriptPath,
+        parameters.OutputDirectory,
+        parameters.SplitBy == "type",
+        parameters.Workers,
+    )
+    sys.stderr.write(f"Split {count} objects into {parameters.OutputDirectory}\n")
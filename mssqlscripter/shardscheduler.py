@@ -0,0 +1,42 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import array
+import heapq
+import logging
+
+logger = logging.getLogger("mssqlscripter.shardscheduler")
+
+
+def schedule_lpt(positions, estimates, workers):
+    """
+    Assign plan positions to workers longest processing time first: objects are taken from the longest estimate
+    down and each goes to the worker with the least estimated work so far. Return shards and their loads, each
+    shard holding its positions in plan order.
+
+    The largest load is at most 4/3 of the best possible, so wall time approaches the total estimate divided by
+    the number of workers unless a single object dominates.
+    """
+    workers = max(1, min(workers, len(positions)))
+    shards = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    heap = [(0.0, worker) for worker in range(workers)]
+
+    order = sorted(range(len(positions)), key=estimates.__getitem__, reverse=True)
+    for index in order:
+        load, worker = heapq.heappop(heap)
+        shards[worker].append(positions[index])
+        load += estimates[index]
+        loads[worker] = load
+        heapq.heappush(heap, (load, worker))
+
+    shards = [array.array("I", sorted(shard)) for shard in shards]
+    logger.info(
+        "Scheduled %s objects on %s workers, estimated loads %s",
+        len(positions),
+        workers,
+        ", ".join(f"{load:.1f}s" for load in loads),
+    )
+    return shards, loads
@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import mssqlscripter.filelock as filelock
+import mssqlscripter.scripterlogging as scripterlogging
+
+logger = logging.getLogger("mssqlscripter.singleflight")
+
+LOCK_FILE_SUFFIX = ".lock"
+RESULT_FILE_SUFFIX = ".sql"
+# Published results are only read by runs that were waiting on the flight, older ones are removed.
+RESULT_TTL_SECONDS = 3600
+
+
+def get_config_flight_dir():
+    """
+    Retrieve the directory coordinating identical concurrent runs, create it if it doesn't exist.
+    """
+    flight_dir = os.path.join(scripterlogging.get_config_log_dir(), "flights")
+    if not os.path.exists(flight_dir):
+        os.makedirs(flight_dir, exist_ok=True)
+    return flight_dir
+
+
+class SingleFlight(object):
+    """
+    Coalesce identical scripting runs started concurrently on one machine.
+
+    The first run of a key takes the flight lock and scripts. Runs of the same key started while it holds the lock
+    wait for it, then copy the output it published instead of scripting themselves. If the leading run fails, the
+    next waiter takes over and scripts.
+    """
+
+    def __init__(self, key, flight_dir=None):
+        self.key = key
+        self.flight_dir = flight_dir or get_config_flight_dir()
+        self.lock = filelock.FileLock(
+            os.path.join(self.flight_dir, key + LOCK_FILE_SUFFIX)
+        )
+        self.result_path = os.path.join(self.flight_dir, key + RESULT_FILE_SUFFIX)
+
+    def join(self, file_path, append=False, timeout=None):
+        """
+        Join the flight of this key. Return True if a run already in flight published its output, which is copied to
+        file_path. Otherwise return False with the flight lock held, the caller scripts and then calls land.
+        """
+        joined_at = time.time()
+        if self.lock.acquire(blocking=False):
+            logger.info("Leading scripting flight %s", self.key)
+            return False
+
+        logger.info("Waiting for identical scripting run in flight %s", self.key)
+        if not self.lock.acquire(timeout=timeout):
+            raise TimeoutError(
+                f"Timed out waiting for identical scripting run {self.key}"
+            )
+
+        try:
+            published_at = os.stat(self.result_path).st_mtime
+        except OSError:
+            published_at = None
+
+        if published_at is None or published_at < joined_at:
+            # The run we waited for failed, script in its place.
+            logger.info("Scripting flight %s published no output, leading", self.key)
+            return False
+
+        try:
+            with open(self.result_path, "rb") as source, open(
+                file_path, "ab" if append else "wb"
+            ) as target:
+                shutil.copyfileobj(source, target)
+        finally:
+            self.lock.release()
+        logger.info("Received output of scripting flight %s", self.key)
+        return True
+
+    def land(self, file_path=None):
+        """
+        Publish the output at file_path for the waiting runs, if given, and release the flight lock.
+        """
+        if not self.lock.locked:
+            return
+
+        try:
+            if file_path:
+                handle, temp_path = tempfile.mkstemp(
+                    prefix=".tmp_", suffix=RESULT_FILE_SUFFIX, dir=self.flight_dir
+                )
+                try:
+                    with os.fdopen(handle, "wb") as target, open(
+                        file_path, "rb"
+                    ) as source:
+                        shutil.copyfileobj(source, target)
+                    os.replace(temp_path, self.result_path)
+                except Exception:
+                    os.remove(temp_path)
+                    raise
+                logger.info("Published output of scripting flight %s", self.key)
+            self.prune()
+        finally:
+            self.lock.release()
+
+    def prune(self, max_age=RESULT_TTL_SECONDS):
+        """
+        Remove published results older than max_age seconds.
+        """
+        now = time.time()
+        for entry in os.scandir(self.flight_dir):
+            if not entry.name.endswith(RESULT_FILE_SUFFIX):
+                continue
+            try:
+                if now - entry.stat().st_mtime > max_age:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,241 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+import zlib
+
+import mssqlscripter.objectsink as objectsink
+import mssqlscripter.scriptmerge as scriptmerge
+import mssqlscripter.scripterlogging as scripterlogging
+
+logger = logging.getLogger("mssqlscripter.snapshotstore")
+
+SNAPSHOT_DIR_NAME = "snapshots"
+BLOB_DIR_NAME = "blobs"
+MANIFEST_DIR_NAME = "manifests"
+MANIFEST_SUFFIX = ".json"
+MANIFEST_VERSION = 1
+UNSAFE_ID_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]")
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def get_config_snapshot_dir():
+    """
+    Retrieve the snapshot store directory, create it if it doesn't exist.
+    """
+    snapshot_dir = os.path.join(scripterlogging.get_config_log_dir(), SNAPSHOT_DIR_NAME)
+    if not os.path.exists(snapshot_dir):
+        os.makedirs(snapshot_dir, exist_ok=True)
+    return snapshot_dir
+
+
+def write_atomically(path, data):
+    """
+    Write data to path through a temporary file renamed into place, so readers never see a partial file.
+    """
+    handle, temp_path = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+class SnapshotStore(object):
+    """
+    Content addressed store of object scripts and the snapshots referring to them.
+
+    Every script is stored once as a zlib compressed blob named by its scriptmerge.script_digest, under
+    blobs/<first two digits>/<digest>, however many snapshots hold it. The digest leaves out the descriptive
+    headers, whose Script Date changes with every run, so a blob holds the script as it was first stored. A
+    snapshot is a manifest under manifests/ listing the objects of a run with the digest of their script, so
+    listing and comparing snapshots only reads manifests. Several processes may write to a store at once.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or get_config_snapshot_dir()
+        self.blob_dir = os.path.join(self.root, BLOB_DIR_NAME)
+        self.manifest_dir = os.path.join(self.root, MANIFEST_DIR_NAME)
+        for directory in (self.blob_dir, self.manifest_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def put_blob(self, data):
+        """
+        Store data unless an identical blob is stored already, and return its digest.
+        """
+        digest = scriptmerge.script_digest(data)
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomically(path, zlib.compress(data))
+        return digest
+
+    def get_blob(self, digest):
+        with open(self.blob_path(digest), "rb") as blob_file:
+            return zlib.decompress(blob_file.read())
+
+    def manifest_path(self, snapshot_id):
+        return os.path.join(self.manifest_dir, snapshot_id + MANIFEST_SUFFIX)
+
+    def write_manifest(self, target, type_of_data, objects, succeeded=True):
+        """
+        Store the manifest of a snapshot of objects, dictionaries of type, schema, name, digest and file, and
+        return the snapshot id.
+        """
+        created = time.time()
+        snapshot_id = "-".join(
+            (
+                time.strftime("%Y%m%dT%H%M%S", time.gmtime(created)),
+                UNSAFE_ID_CHARACTERS.sub("_", target),
+                uuid.uuid4().hex[:8],
+            )
+        )
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "id": snapshot_id,
+            "target": target,
+            "type_of_data": type_of_data,
+            "created": created,
+            "succeeded": succeeded,
+            "objects": objects,
+        }
+        write_atomically(
+            self.manifest_path(snapshot_id),
+            json.dumps(manifest, indent=1).encode("utf-8"),
+        )
+        logger.info("Stored snapshot %s of %s objects", snapshot_id, len(objects))
+        return snapshot_id
+
+    def read_manifest(self, snapshot_id):
+        """
+        Return the manifest of a snapshot, given by id or by the path of its manifest file.
+        """
+        path = snapshot_id
+        if not os.path.isfile(path):
+            path = self.manifest_path(snapshot_id)
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported snapshot version {manifest.get('version')}")
+        return manifest
+
+    def snapshots(self):
+        """
+        Return the ids of the stored snapshots, oldest first.
+        """
+        return sorted(
+            name[: -len(MANIFEST_SUFFIX)]
+            for name in os.listdir(self.manifest_dir)
+            if name.endswith(MANIFEST_SUFFIX) and not name.startswith(".tmp_")
+        )
+
+    def restore(self, snapshot_id, output_dir):
+        """
+        Write the objects of a snapshot to output_dir, a file per object like the run that took it wrote them.
+        Return the number of files written. Raises ValueError, before writing anything, if an entry of the manifest
+        names a file outside output_dir or is not a blob digest.
+
+        Blobs are shared by scripts that only differ in their descriptive headers, so a restored script carries the
+        headers, and Script Date, of the first run that stored it rather than of the snapshot's own run.
+        """
+        manifest = self.read_manifest(snapshot_id)
+        real_output_dir = os.path.realpath(output_dir)
+        paths = []
+        for entry in manifest["objects"]:
+            path = os.path.realpath(os.path.join(real_output_dir, entry["file"]))
+            if os.path.dirname(path) != real_output_dir:
+                raise ValueError(
+                    f"Snapshot object file {entry['file']!r} is not a file of the output directory"
+                )
+            if not DIGEST_PATTERN.match(entry["digest"]):
+                raise ValueError(
+                    f"Snapshot object digest {entry['digest']!r} is not a digest"
+                )
+            paths.append(path)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+        for path, entry in zip(paths, manifest["objects"]):
+            with open(path, "wb") as object_file:
+                object_file.write(self.get_blob(entry["digest"]))
+        return len(manifest["objects"])
+
+
+class SnapshotSink(objectsink.ObjectFileSink):
+    """
+    Takes a snapshot of a file per object run: every completed object file is stored in the snapshot store and
+    removed, and the manifest of the run is written when the sink is closed.
+    """
+
+    def __init__(self, store, source_dir, target, type_of_data):
+        super().__init__(source_dir)
+        self.store = store
+        self.target = target
+        self.type_of_data = type_of_data
+        self.objects = []
+        self.snapshot_id = None
+
+    def take_file(self, file_name, script_type, schema, name, duration=None):
+        path = os.path.join(self.source_dir, file_name)
+        with open(path, "rb") as script_file:
+            data = script_file.read()
+        digest = self.store.put_blob(data)
+        os.remove(path)
+
+        with self.lock:
+            self.objects.append(
+                {
+                    "type": script_type,
+                    "schema": schema,
+                    "name": name,
+                    "digest": digest,
+                    "size": len(data),
+                    "file": file_name,
+                }
+            )
+
+    def close(self, succeeded=True):
+        """
+        Store the files left in the source directory and write the manifest of the snapshot.
+        """
+        self.take_remaining_files()
+        # Completion order varies between runs, file names do not.
+        self.objects.sort(key=lambda entry: entry["file"])
+        self.snapshot_id = self.store.write_manifest(
+            self.target, self.type_of_data, self.objects, succeeded
+        )
+
+
+def main(args):
+    """
+    Entry point of mssql-scripter snapshot.
+    """
+    import sys
+
+    import mssqlscripter.argparser as parser
+
+    parameters = parser.parse_snapshot_arguments(args)
+    store = SnapshotStore(parameters.SnapshotStore)
+    if parameters.Command == "list":
+        for snapshot_id in store.snapshots():
+            manifest = store.read_manifest(snapshot_id)
+            sys.stdout.write(
+                f"{snapshot_id}\t{manifest['target']}\t{len(manifest['objects'])} objects"
+                f"{'' if manifest['succeeded'] else ' (failed run)'}\n"
+            )
+    else:
+        count = store.restore(parameters.SnapshotId, parameters.OutputDirectory)
+        sys.stderr.write(f"Restored {count} objects to {parameters.OutputDirectory}\n")
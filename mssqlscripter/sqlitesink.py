@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+import mssqlscripter.objectsink as objectsink
+
+logger = logging.getLogger("mssqlscripter.sqlitesink")
+
+# Scripts are inserted in one transaction per this many objects, or sooner once a batch gets this old.
+BATCH_SIZE = 500
+BATCH_SECONDS = 1.0
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "run_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "target TEXT NOT NULL, "
+    "type_of_data TEXT NOT NULL, "
+    "started REAL NOT NULL, "
+    "finished REAL, "
+    "succeeded INTEGER, "
+    "object_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS objects ("
+    "run_id INTEGER NOT NULL REFERENCES runs (run_id), "
+    "type TEXT, "
+    "schema TEXT, "
+    "name TEXT NOT NULL, "
+    "script TEXT NOT NULL, "
+    "content_hash TEXT NOT NULL, "
+    "duration REAL, "
+    "scripted_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS objects_schema_name ON objects (schema, name)",
+    "CREATE INDEX IF NOT EXISTS objects_type ON objects (type)",
+    "CREATE INDEX IF NOT EXISTS objects_run ON objects (run_id)",
+]
+
+
+def read_script(path):
+    """
+    Return the text of the script file at path and the sha256 of its bytes.
+    """
+    with open(path, "rb") as script_file:
+        data = script_file.read()
+    return data.decode("utf-8-sig", errors="replace"), hashlib.sha256(data).hexdigest()
+
+
+class SqliteSink(objectsink.ObjectFileSink):
+    """
+    Stores the script of every object of a file per object run as a row of a SQLite database.
+
+    Each completed object file is read, hashed and removed, and its row is queued; queued rows are inserted in
+    batched transactions. Each run gets a row in the runs table that its objects refer to, so runs can be compared
+    with indexed queries.
+    """
+
+    def __init__(self, database_path, source_dir, target, type_of_data):
+        super().__init__(source_dir)
+        self.database_path = database_path
+        self.pending = []
+        self.batch_started = None
+        self.object_count = 0
+
+        self.connection = sqlite3.connect(
+            database_path, timeout=30, check_same_thread=False
+        )
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            self.run_id = self.connection.execute(
+                "INSERT INTO runs (target, type_of_data, started) VALUES (?, ?, ?)",
+                (target, type_of_data, time.time()),
+            ).lastrowid
+        logger.info("Storing scripts of run %s in %s", self.run_id, database_path)
+
+    def take_file(self, file_name, script_type, schema, name, duration=None):
+        path = os.path.join(self.source_dir, file_name)
+        script, content_hash = read_script(path)
+        os.remove(path)
+
+        with self.lock:
+            if not self.pending:
+                self.batch_started = time.monotonic()
+            self.pending.append(
+                (
+                    self.run_id,
+                    script_type,
+                    schema,
+                    name,
+                    script,
+                    content_hash,
+                    duration,
+                    time.time(),
+                )
+            )
+            self.object_count += 1
+            if (
+                len(self.pending) >= BATCH_SIZE
+                or time.monotonic() - self.batch_started >= BATCH_SECONDS
+            ):
+                self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self.pending
+            )
+        logger.debug("Stored %s object scripts", len(self.pending))
+        self.pending = []
+
+    def close(self, succeeded=True):
+        """
+        Store the files left in the source directory, finish the run and close the database.
+        """
+        try:
+            self.take_remaining_files()
+            with self.lock:
+                self._flush()
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE runs SET finished = ?, succeeded = ?, object_count = ? WHERE run_id = ?",
+                    (time.time(), int(succeeded), self.object_count, self.run_id),
+                )
+        finally:
+            self.connection.close()
+        logger.info(
+            "Stored %s object scripts of run %s in %s",
+            self.object_count,
+            self.run_id,
+            self.database_path,
+        )
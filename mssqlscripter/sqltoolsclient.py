@@ -4,9 +4,11 @@
 # --------------------------------------------------------------------------------------------
 
 import logging
+import time
 
 import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
 import mssqlscripter.jsonrpc.jsonrpcclient as json_rpc_client
+import mssqlscripter.plancatalog as plancatalog
 
 logger = logging.getLogger("mssqlscripter.sqltoolsclient")
 
@@ -16,15 +18,35 @@ class SqlToolsClient(object):
     Create sql tools service requests.
     """
 
-    def __init__(self, input_stream, output_stream):
+    # Events buffered before the response thread waits for the main thread, progress notifications are
+    # coalesced to the latest one of each operation instead.
+    MAX_EVENT_QUEUE_SIZE = 1000
+    # Only notifications of objects still in progress are coalesced. Run history durations and object sinks need
+    # the notification completing every object.
+    COALESCED_PROGRESS_STATUSES = ["Progress"]
+    # A cancel arriving after the tools service started writing scripts does not stop it, the plan request then
+    # scripts every object to the null device. Plan requests still running this long after their cancel are
+    # logged, and their cancel response is waited for this long after they complete.
+    PLAN_CANCEL_TIMEOUT = 5
+
+    def __init__(self, input_stream, output_stream, timer=None):
         """
-        Initializes the sql tools client.
+        Initializes the sql tools client. Requests created by this client mark their phases on timer if given.
         """
         self.current_id = 1
+        self.timer = timer
+        # Large scripting plans are parsed straight into a PlanCatalog instead of being buffered whole.
         self.json_rpc_client = json_rpc_client.JsonRpcClient(
-            input_stream, output_stream
+            input_stream,
+            output_stream,
+            streamed_arrays={"scriptingObjects": plancatalog.PlanCatalog},
+            max_queue_size=self.MAX_EVENT_QUEUE_SIZE,
+            coalesced_methods=[scripting.ScriptingRequest.PROGRESS_METHOD_NAME],
+            coalesced_statuses=self.COALESCED_PROGRESS_STATUSES,
         )
         self.json_rpc_client.start()
+        if self.timer:
+            self.timer.mark("tools_client_start")
 
         logger.info("Sql Tools Client Initialized")
 
@@ -35,13 +57,111 @@ class SqlToolsClient(object):
         request = None
         if request_type == "scripting_request":
             request = scripting.ScriptingRequest(
-                self.current_id, self.json_rpc_client, parameters
+                self.current_id, self.json_rpc_client, parameters, self.timer
             )
-            logger.info(f"Scripting request id: {self.current_id} created.")
+            logger.info("Scripting request id: %s created.", self.current_id)
             self.current_id += 1
 
             return request
 
+    def cancel_scripting(self, operation_id):
+        """
+        Cancel a running scripting operation and return the id of the cancel request. The operation still ends
+        with a canceled ScriptCompleteEvent.
+        """
+        logger.info("Cancelling scripting operation: %s", operation_id)
+        cancel_id = self.current_id
+        self.json_rpc_client.submit_request(
+            scripting.ScriptingRequest.CANCEL_METHOD_NAME,
+            {"operationId": operation_id},
+            cancel_id,
+        )
+        self.current_id += 1
+        return cancel_id
+
+    def get_scripting_plan(self, parameters, max_objects_per_request=None):
+        """
+        Return the PlanCatalog of the objects parameters would script, without scripting them. Include object
+        lists longer than max_objects_per_request are planned through several requests, like they are scripted,
+        and their plans are joined in request order without repeating objects.
+        """
+        request_parameters = scripting.split_parameters(
+            parameters, max_objects_per_request
+        )
+        if len(request_parameters) == 1:
+            return self._get_request_plan(parameters)
+
+        catalog = plancatalog.PlanCatalog()
+        for request_parameter in request_parameters:
+            for scripting_object in self._get_request_plan(request_parameter):
+                if not catalog.find(
+                    scripting_object.schema,
+                    scripting_object.name,
+                    scripting_object.type,
+                ):
+                    catalog.append(
+                        scripting_object.type,
+                        scripting_object.schema,
+                        scripting_object.name,
+                    )
+        return catalog
+
+    def _get_request_plan(self, parameters):
+        """
+        Return the plan of one scripting request, which is cancelled as soon as its plan arrives.
+        """
+        request = self.create_request("scripting_request", parameters)
+        request.execute()
+
+        catalog = None
+        cancel_id = None
+        cancel_time = None
+        while not request.completed():
+            response = request.get_response()
+            if isinstance(response, scripting.ScriptPlanNotificationEvent):
+                catalog = plancatalog.PlanCatalog.from_plan(response)
+                cancel_id = self.cancel_scripting(response.operation_id)
+                cancel_time = time.monotonic()
+            elif isinstance(response, scripting.ScriptCompleteEvent):
+                if response.has_error and cancel_id is None:
+                    raise RuntimeError(
+                        f"Scripting plan request failed: {response.error_message}"
+                    )
+            elif not response:
+                if (
+                    cancel_time is not None
+                    and time.monotonic() - cancel_time > self.PLAN_CANCEL_TIMEOUT
+                ):
+                    logger.warning(
+                        "Scripting plan request id: %s is still running %s seconds after its cancel, "
+                        "waiting for it to script every object",
+                        request.id,
+                        self.PLAN_CANCEL_TIMEOUT,
+                    )
+                    cancel_time = None
+                # The sleep prevents burning up the CPU and lets other threads get scheduled.
+                time.sleep(0.1)
+
+        if cancel_id is not None:
+            self._finish_cancel(cancel_id)
+
+        if catalog is None:
+            raise RuntimeError("Scripting plan request completed without a plan")
+
+        return catalog
+
+    def _finish_cancel(self, cancel_id):
+        """
+        Remove the response queue of a cancel request once its response arrived.
+        """
+        deadline = time.monotonic() + self.PLAN_CANCEL_TIMEOUT
+        while (
+            not self.json_rpc_client.has_response(cancel_id)
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        self.json_rpc_client.request_finished(cancel_id)
+
     def shutdown(self):
         logger.info("Shutting down Sql Tools Client")
         self.json_rpc_client.shutdown()
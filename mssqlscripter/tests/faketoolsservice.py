@@ -0,0 +1,333 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Fake Sql Tools Service for tests that run mssql-scripter end to end without a SQL Server.
+
+It speaks the scripting subset of the json rpc protocol over stdin and stdout and scripts a fixed catalog of
+objects, so its output only depends on the objects and options it is asked for. install() writes an executable
+named like the real service that runs this module, point MSSQLTOOLSSERVICE_PATH at its directory to use it.
+The catalog can be replaced through a JSON file named by FAKE_TOOLS_SERVICE_CATALOG, whose entries may carry a
+"delay" in seconds spent scripting the object and an "error" message failing the scripting request when the
+object is reached. FAKE_TOOLS_SERVICE_SCRIPT_DATE replaces the Script Date of the
+descriptive headers.
+"""
+
+import json
+import os
+import queue
+import stat
+import sys
+import threading
+import time
+import uuid
+
+DATABASE_NAME = "FakeDatabase"
+SCRIPT_DATE = os.environ.get("FAKE_TOOLS_SERVICE_SCRIPT_DATE", "1/1/2020 12:00:00 AM")
+
+DEFAULT_CATALOG = [
+    {"type": "Database", "schema": None, "name": DATABASE_NAME},
+    {"type": "Schema", "schema": None, "name": "Sales"},
+    {"type": "Table", "schema": "dbo", "name": "Customer"},
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "Table", "schema": "Sales", "name": "Order"},
+    {"type": "View", "schema": "Sales", "name": "vStore"},
+    {"type": "StoredProcedure", "schema": "dbo", "name": "uspGetCustomer"},
+    {"type": "StoredProcedure", "schema": "Sales", "name": "uspGetStore"},
+    {"type": "UserDefinedFunction", "schema": "dbo", "name": "ufnTax"},
+    {"type": "Trigger", "schema": "Sales", "name": "trStore"},
+]
+
+
+def install(directory):
+    """
+    Write an executable fake tools service to directory and return its path.
+    """
+    path = os.path.join(directory, "MicrosoftSqlToolsServiceLayer")
+    with open(path, "w", encoding="utf-8") as service_file:
+        service_file.write(f"#!{sys.executable}\n")
+        service_file.write("import runpy, sys\n")
+        service_file.write(f"sys.path.insert(0, {repr(os.path.dirname(__file__))})\n")
+        service_file.write(
+            'runpy.run_module("faketoolsservice", run_name="__main__")\n'
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def load_catalog():
+    catalog_path = os.environ.get("FAKE_TOOLS_SERVICE_CATALOG")
+    if not catalog_path:
+        return DEFAULT_CATALOG
+    with open(catalog_path, encoding="utf-8") as catalog_file:
+        return json.load(catalog_file)
+
+
+def qualified_name(scripting_object):
+    if scripting_object["schema"]:
+        return f'[{scripting_object["schema"]}].[{scripting_object["name"]}]'
+    return f'[{scripting_object["name"]}]'
+
+
+def script_object(scripting_object, options):
+    """
+    Return the deterministic script of one object, headed like SMO does.
+    """
+    lines = []
+    if options.get("IncludeDescriptiveHeaders", True):
+        lines.append(
+            f'/****** Object:  {scripting_object["type"]} {qualified_name(scripting_object)}    '
+            f"Script Date: {SCRIPT_DATE} ******/"
+        )
+    verb = "DROP" if options.get("ScriptCreateDrop") == "ScriptDrop" else "CREATE"
+    lines.append(
+        f'{verb} {scripting_object["type"].upper()} {qualified_name(scripting_object)}'
+    )
+    if scripting_object["type"] == "Table" and options.get("TypeOfDataToScript") in (
+        "SchemaAndData",
+        "DataOnly",
+    ):
+        lines.append(
+            f"INSERT {qualified_name(scripting_object)} ([Id]) VALUES (N'{scripting_object['name']}')"
+        )
+    lines.append("GO")
+    return "\n".join(lines) + "\n"
+
+
+def matches(scripting_object, criteria):
+    return all(
+        criteria.get(key) is None or criteria[key] == scripting_object[field]
+        for key, field in (("Type", "type"), ("Schema", "schema"), ("Name", "name"))
+    )
+
+
+def select_objects(catalog, params):
+    """
+    Apply the include and exclude criteria, schemas and types of a scripting request to the catalog.
+    """
+    selected = []
+    for scripting_object in catalog:
+        include_criteria = params.get("IncludeObjectCriteria") or []
+        if include_criteria and not any(
+            matches(scripting_object, criteria) for criteria in include_criteria
+        ):
+            continue
+        if any(
+            matches(scripting_object, criteria)
+            for criteria in params.get("ExcludeObjectCriteria") or []
+        ):
+            continue
+        if (
+            params.get("IncludeSchemas")
+            and scripting_object["schema"] not in params["IncludeSchemas"]
+        ):
+            continue
+        if (
+            params.get("ExcludeSchemas")
+            and scripting_object["schema"] in params["ExcludeSchemas"]
+        ):
+            continue
+        if (
+            params.get("IncludeTypes")
+            and scripting_object["type"] not in params["IncludeTypes"]
+        ):
+            continue
+        if (
+            params.get("ExcludeTypes")
+            and scripting_object["type"] in params["ExcludeTypes"]
+        ):
+            continue
+        selected.append(scripting_object)
+    return selected
+
+
+class FakeScriptingError(Exception):
+    pass
+
+
+class FakeToolsService(object):
+    def __init__(self, input_stream, output_stream):
+        self.input_stream = input_stream
+        self.output_stream = output_stream
+        self.output_lock = threading.Lock()
+        self.cancelled = set()
+        self.operations = queue.Queue()
+        self.sequence_number = 0
+
+    def send(self, message):
+        message["jsonrpc"] = "2.0"
+        content = json.dumps(message).encode("utf-8")
+        with self.output_lock:
+            self.output_stream.write(
+                f"Content-Length: {len(content)}\r\n\r\n".encode("ascii") + content
+            )
+            self.output_stream.flush()
+
+    def notify(self, method, params):
+        self.sequence_number += 1
+        params["sequenceNumber"] = self.sequence_number
+        self.send({"method": method, "params": params})
+
+    def read_message(self):
+        length = None
+        while True:
+            line = self.input_stream.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                if length is not None:
+                    break
+                continue
+            name, _, value = line.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(self.input_stream.read(length).decode("utf-8"))
+
+    def run(self):
+        scripter = threading.Thread(target=self.run_operations, daemon=True)
+        scripter.start()
+        while True:
+            message = self.read_message()
+            if message is None:
+                break
+            method = message.get("method")
+            if method == "scripting/script":
+                operation_id = str(uuid.uuid4())
+                self.send(
+                    {"id": message["id"], "result": {"operationId": operation_id}}
+                )
+                self.operations.put((operation_id, message["params"]))
+            elif method == "scripting/scriptCancel":
+                self.cancelled.add(message["params"]["operationId"])
+                self.send({"id": message["id"], "result": {}})
+            elif "id" in message:
+                self.send({"id": message["id"], "result": None})
+        self.operations.put(None)
+
+    def run_operations(self):
+        while True:
+            operation = self.operations.get()
+            if operation is None:
+                return
+            self.script(*operation)
+
+    def script(self, operation_id, params):
+        options = params.get("ScriptOptions") or {}
+        selected = select_objects(load_catalog(), params)
+        plan = [
+            {key: scripting_object[key] for key in ("type", "schema", "name")}
+            for scripting_object in selected
+        ]
+        self.notify(
+            "scripting/scriptPlanNotification",
+            {"operationId": operation_id, "scriptingObjects": plan, "count": len(plan)},
+        )
+
+        # Give a cancel sent on the plan notification the chance to arrive before any output is written.
+        time.sleep(0.05)
+        canceled = operation_id in self.cancelled
+        error_message = None
+        if not canceled:
+            try:
+                canceled = self.write_scripts(operation_id, params, options, selected)
+            except FakeScriptingError as error:
+                error_message = str(error)
+
+        self.notify(
+            "scripting/scriptComplete",
+            {
+                "operationId": operation_id,
+                "errorDetails": None,
+                "errorMessage": error_message,
+                "hasError": error_message is not None,
+                "canceled": canceled,
+                "success": not canceled and error_message is None,
+            },
+        )
+
+    def write_scripts(self, operation_id, params, options, selected):
+        """
+        Script the selected objects, return True if the operation was cancelled part way. Raises FakeScriptingError
+        on an object failing to script.
+        """
+        single_file = params.get("ScriptDestination") != "ToFilePerObject"
+        output = None
+        if single_file:
+            output = open(
+                params["FilePath"],
+                "a" if options.get("AppendToFile") else "w",
+                encoding="utf-8",
+                newline="",
+            )
+            if options.get("ScriptUseDatabase", True):
+                output.write(f"USE [{DATABASE_NAME}]\nGO\n")
+
+        try:
+            for completed_count, scripting_object in enumerate(selected):
+                if operation_id in self.cancelled:
+                    return True
+
+                plan_object = {
+                    key: scripting_object[key] for key in ("type", "schema", "name")
+                }
+                self.notify(
+                    "scripting/scriptProgressNotification",
+                    {
+                        "operationId": operation_id,
+                        "scriptingObject": plan_object,
+                        "status": "Progress",
+                        "completedCount": completed_count,
+                        "totalCount": len(selected),
+                        "errorDetails": None,
+                        "errorMessage": None,
+                    },
+                )
+                time.sleep(scripting_object.get("delay", 0))
+                if scripting_object.get("error"):
+                    raise FakeScriptingError(scripting_object["error"])
+
+                script = script_object(scripting_object, options)
+                if single_file:
+                    output.write(script)
+                else:
+                    file_name = ".".join(
+                        part
+                        for part in (
+                            scripting_object["schema"],
+                            scripting_object["name"],
+                            scripting_object["type"],
+                            "sql",
+                        )
+                        if part
+                    )
+                    with open(
+                        os.path.join(params["FilePath"], file_name),
+                        "w",
+                        encoding="utf-8",
+                        newline="",
+                    ) as object_file:
+                        object_file.write(script)
+
+                self.notify(
+                    "scripting/scriptProgressNotification",
+                    {
+                        "operationId": operation_id,
+                        "scriptingObject": plan_object,
+                        "status": "Completed",
+                        "completedCount": completed_count + 1,
+                        "totalCount": len(selected),
+                        "errorDetails": None,
+                        "errorMessage": None,
+                    },
+                )
+        finally:
+            if output:
+                output.close()
+        return False
+
+
+if __name__ == "__main__":
+    FakeToolsService(sys.stdin.buffer, sys.stdout.buffer).run()
@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+import mssqlscripter.archivesink as archivesink
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.plancatalog as plancatalog
+
+SAMPLE_PLAN = [
+    {"type": "Table", "schema": "dbo", "name": "Customer"},
+    {"type": "View", "schema": "Sales", "name": "vStore"},
+]
+
+
+def progress(status, scripting_object):
+    return scripting.ScriptProgressNotificationEvent(
+        {
+            "operationId": "1",
+            "sequenceNumber": 1,
+            "scriptingObject": scripting_object,
+            "status": status,
+            "completedCount": 0,
+            "totalCount": 2,
+        }
+    )
+
+
+class ArchiveSinkTests(unittest.TestCase):
+    """
+    Archive sink tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, "objects")
+        os.makedirs(self.source_dir)
+        self.catalog = plancatalog.PlanCatalog.from_objects(SAMPLE_PLAN)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_object(self, name, content):
+        with open(os.path.join(self.source_dir, name), "w") as object_file:
+            object_file.write(content)
+
+    def run_sink(self, archive_name):
+        archive_path = os.path.join(self.temp_dir.name, archive_name)
+        sink = archivesink.ArchiveSink(archive_path, self.source_dir)
+        sink.write_manifest(self.catalog, [0, 1])
+
+        self.write_object("dbo.Customer.Table.sql", "CREATE TABLE")
+        sink.record_progress(progress("Progress", SAMPLE_PLAN[0]))
+        self.assertTrue(os.listdir(self.source_dir))
+        sink.record_progress(progress("Completed", SAMPLE_PLAN[0]))
+        self.assertEqual(os.listdir(self.source_dir), [])
+
+        # Files not matched to a completed object are archived on close.
+        self.write_object("Sales.vStore.View.sql", "CREATE VIEW")
+        sink.close()
+        self.assertEqual(os.listdir(self.source_dir), [])
+        return archive_path
+
+    def test_zip_archive(self):
+        """
+        Verify completed object files move into a zip archive after the manifest.
+        """
+        with zipfile.ZipFile(self.run_sink("objects.zip")) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [
+                    archivesink.MANIFEST_NAME,
+                    "dbo.Customer.Table.sql",
+                    "Sales.vStore.View.sql",
+                ],
+            )
+            manifest = json.loads(archive.read(archivesink.MANIFEST_NAME))
+            self.assertEqual(
+                [entry["member"] for entry in manifest["objects"]],
+                ["dbo.Customer.Table.sql", "Sales.vStore.View.sql"],
+            )
+            self.assertEqual(archive.read("dbo.Customer.Table.sql"), b"CREATE TABLE")
+
+    def test_tar_archive(self):
+        """
+        Verify completed object files move into a compressed tar archive.
+        """
+        with tarfile.open(self.run_sink("objects.tar.gz")) as archive:
+            self.assertEqual(
+                archive.getnames(),
+                [
+                    archivesink.MANIFEST_NAME,
+                    "dbo.Customer.Table.sql",
+                    "Sales.vStore.View.sql",
+                ],
+            )
+            self.assertEqual(
+                archive.extractfile("Sales.vStore.View.sql").read(), b"CREATE VIEW"
+            )
+
+        with self.assertRaises(ValueError):
+            archivesink.get_tar_mode("objects.rar")
+        # Every archive suffix diff reads back can be written.
+        for suffix in archivesink.ARCHIVE_SUFFIXES:
+            archivesink.get_tar_mode(f"objects{suffix.upper()}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import contextlib
+import io
 import os
+import tempfile
 import unittest
 
 import mssqlscripter.argparser as parser
@@ -82,6 +85,93 @@ class TestParser(unittest.TestCase):
             "Server=TestServer;Database=mydatabase;User Id=my_username;Password=PLACEHOLDER;",
         )
 
+    def test_object_lists_from_files(self):
+        """
+        Verify object names are read from files and merged without duplicates.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            include_file = os.path.join(temp_dir, "include.txt")
+            with io.open(include_file, "w", encoding="utf-8-sig") as object_file:
+                object_file.write("dbo.t1\n\n# comment\n  [Sales.Old].[t2]  \ndbo.t1\n")
+
+            exclude_file = os.path.join(temp_dir, "exclude.txt")
+            with io.open(exclude_file, "w", encoding="utf-8") as object_file:
+                object_file.write("dbo.t3\n")
+
+            parameters = parser.parse_arguments(
+                [
+                    "-S",
+                    "TestServer",
+                    "--include-objects",
+                    "dbo.t0",
+                    f"@{include_file}",
+                    "dbo.t1",
+                    "--exclude-objects-file",
+                    exclude_file,
+                ]
+            )
+            self.assertEqual(
+                parameters.IncludeObjects, ["dbo.t0", "dbo.t1", "[Sales.Old].[t2]"]
+            )
+            self.assertEqual(parameters.ExcludeObjects, ["dbo.t3"])
+
+            parameters = parser.parse_arguments(
+                ["-S", "TestServer", "--include-objects-file", include_file]
+            )
+            self.assertEqual(parameters.IncludeObjects, ["dbo.t1", "[Sales.Old].[t2]"])
+            self.assertIsNone(parameters.ExcludeObjects)
+
+    def test_invalid_combinations(self):
+        """
+        Verify options that can not be used together are rejected.
+        """
+        for args in (
+            ["--workers", "2", "--sample-resources"],
+            ["--workers", "2", "--resource-samples-file", "samples.csv"],
+        ):
+            with self.subTest(args=args):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        parser.parse_arguments(["-S", "TestServer", *args])
+
+    def test_invalid_values(self):
+        """
+        Verify counts and limits out of their range are rejected.
+        """
+        for args in (
+            ["--workers", "0"],
+            ["--workers", "-2"],
+            ["--max-objects-per-request", "-1"],
+            ["--max-server-requests", "-1"],
+            ["--max-server-request-rate", "-0.5"],
+        ):
+            with self.subTest(args=args):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        parser.parse_arguments(["-S", "TestServer", *args])
+
+    def test_split_workers(self):
+        """
+        Verify the split command needs at least one worker.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".sql") as script_file:
+            with contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    parser.parse_split_arguments(
+                        [script_file.name, "-o", "split", "--workers", "0"]
+                    )
+
+    def test_fleet_spot_check(self):
+        """
+        Verify fleet databases spot check reused scripts unless told not to.
+        """
+        parameters = parser.parse_fleet_arguments(["targets.txt", "-o", "fleet"])
+        self.assertEqual(parameters.SpotCheck, 10)
+        parameters = parser.parse_fleet_arguments(
+            ["targets.txt", "-o", "fleet", "--spot-check", "0"]
+        )
+        self.assertEqual(parameters.SpotCheck, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
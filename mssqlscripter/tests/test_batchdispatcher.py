@@ -0,0 +1,69 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mssqlscripter.batchdispatcher as batchdispatcher
+
+
+class BatchDispatcherTests(unittest.TestCase):
+    """
+    Batch dispatcher tests.
+    """
+
+    def drain(self, dispatcher):
+        batches = []
+        while True:
+            batch = dispatcher.next_batch()
+            if batch is None:
+                return batches
+            batches.append(batch)
+
+    def test_batches_cover_positions_in_order(self):
+        """
+        Verify batches are numbered in plan order and cover every position once.
+        """
+        positions = list(range(100))
+        batches = self.drain(batchdispatcher.BatchDispatcher(positions, 4))
+
+        self.assertEqual([number for number, _ in batches], list(range(len(batches))))
+        self.assertEqual(
+            [position for _, batch in batches for position in batch], positions
+        )
+        self.assertEqual(len(batches[0][1]), batchdispatcher.INITIAL_BATCH_SIZE)
+        # The tail of the plan is spread over the workers one object at a time.
+        self.assertEqual(len(batches[-1][1]), 1)
+
+    def test_batch_size_follows_latency(self):
+        """
+        Verify batches grow when objects are fast and shrink when they are slow.
+        """
+        dispatcher = batchdispatcher.BatchDispatcher(
+            list(range(10000)), 2, max_batch_size=500, target_batch_seconds=2.0
+        )
+        dispatcher.record(10, 0.1)
+        self.assertEqual(dispatcher.batch_size(), 200)
+        dispatcher.record(10, 0.0001)
+        self.assertGreater(dispatcher.batch_size(), 200)
+        dispatcher.record(1, 0.0)
+        dispatcher.record(1, 0.0)
+        self.assertLessEqual(dispatcher.batch_size(), 500)
+
+        for _ in range(20):
+            dispatcher.record(1, 10.0)
+        self.assertEqual(dispatcher.batch_size(), 1)
+
+    def test_stop(self):
+        """
+        Verify no batches are handed out once dispatching stopped.
+        """
+        dispatcher = batchdispatcher.BatchDispatcher(list(range(10)), 2)
+        self.assertIsNotNone(dispatcher.next_batch())
+        dispatcher.stop()
+        self.assertIsNone(dispatcher.next_batch())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.fleet as fleet
+
+
+class FleetTests(unittest.TestCase):
+    """
+    Fleet tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.representative_dir = self.write_directory(
+            "tenant1",
+            {
+                "tenant1.Database.sql": b"CREATE DATABASE [tenant1]",
+                "dbo.Customer.Table.sql": b"CREATE TABLE [dbo].[Customer]",
+                "dbo.uspGetCustomer.StoredProcedure.sql": b"CREATE PROCEDURE",
+            },
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_directory(self, name, scripts):
+        directory = os.path.join(self.temp_dir.name, name)
+        os.makedirs(directory)
+        for file_name, script in scripts.items():
+            with open(os.path.join(directory, file_name), "wb") as script_file:
+                script_file.write(script)
+        return directory
+
+    def test_database_names(self):
+        """
+        Verify databases are named after their database and names are made unique.
+        """
+        self.assertEqual(
+            fleet.get_database_names(
+                [
+                    "Server=a;Database=tenant1;Integrated Security=True;",
+                    "Server=b;Initial Catalog=Tenant1;Integrated Security=True;",
+                    "Server=c:1433;Integrated Security=True;",
+                ]
+            ),
+            ["tenant1", "Tenant1_2", "c_1433"],
+        )
+
+    def test_spot_check(self):
+        """
+        Verify scripts that differ or are missing fail the spot check.
+        """
+        output_dir = self.write_directory(
+            "tenant2",
+            {
+                "dbo.Customer.Table.sql": b"CREATE TABLE [dbo].[Customer]",
+                "dbo.uspGetCustomer.StoredProcedure.sql": b"CREATE PROCEDURE -- changed",
+            },
+        )
+        self.assertEqual(
+            fleet.spot_check(
+                self.representative_dir,
+                output_dir,
+                [
+                    "dbo.Customer.Table.sql",
+                    "dbo.uspGetCustomer.StoredProcedure.sql",
+                    "dbo.Order.Table.sql",
+                ],
+            ),
+            ["dbo.uspGetCustomer.StoredProcedure.sql", "dbo.Order.Table.sql"],
+        )
+
+    def test_spot_check_ignores_script_dates(self):
+        """
+        Verify scripts made at different times pass the spot check.
+        """
+        header = "/****** Object:  Table [dbo].[Customer]    Script Date: {} ******/\n"
+        representative_dir = self.write_directory(
+            "representative",
+            {
+                "dbo.Customer.Table.sql": (
+                    header.format("1/1/2020 12:00:00 AM") + "CREATE TABLE\n"
+                ).encode()
+            },
+        )
+        output_dir = self.write_directory(
+            "tenant2",
+            {
+                "dbo.Customer.Table.sql": (
+                    header.format("1/1/2020 12:05:00 AM") + "CREATE TABLE\n"
+                ).encode()
+            },
+        )
+        self.assertEqual(
+            fleet.spot_check(
+                representative_dir, output_dir, ["dbo.Customer.Table.sql"]
+            ),
+            [],
+        )
+
+    def test_fill_from(self):
+        """
+        Verify missing scripts are linked from the representative, except its own database.
+        """
+        output_dir = self.write_directory(
+            "tenant2", {"tenant2.Database.sql": b"CREATE DATABASE [tenant2]"}
+        )
+        self.assertEqual(
+            fleet.fill_from(
+                self.representative_dir,
+                output_dir,
+                {"tenant1.Database.sql"},
+                link=True,
+            ),
+            2,
+        )
+        self.assertEqual(
+            sorted(os.listdir(output_dir)),
+            [
+                "dbo.Customer.Table.sql",
+                "dbo.uspGetCustomer.StoredProcedure.sql",
+                "tenant2.Database.sql",
+            ],
+        )
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(output_dir, "dbo.Customer.Table.sql"),
+                os.path.join(self.representative_dir, "dbo.Customer.Table.sql"),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
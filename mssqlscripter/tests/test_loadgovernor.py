@@ -0,0 +1,110 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import tempfile
+import time
+import unittest
+
+import mssqlscripter.filelock as filelock
+import mssqlscripter.loadgovernor as loadgovernor
+
+CONNECTION_STRING = "Server=tcp:MyServer,1433;Database=db;User Id=me;Password=secret;"
+
+
+class LoadGovernorTests(unittest.TestCase):
+    """
+    Load governor tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_server_key(self):
+        """
+        Verify connections to the same server share a key that holds no secrets.
+        """
+        key = loadgovernor.get_server_key(CONNECTION_STRING)
+        self.assertTrue(key.startswith("myserver_1433-"))
+        self.assertNotIn("secret", key)
+        self.assertEqual(
+            loadgovernor.get_server_key("Data Source=myserver,1433;Database=other"),
+            key,
+        )
+        self.assertNotEqual(loadgovernor.get_server_key("Server=other"), key)
+
+    def test_file_semaphore(self):
+        """
+        Verify a file semaphore hands out at most its number of slots.
+        """
+        first = filelock.FileSemaphore(self.temp_dir.name, "server", 2)
+        second = filelock.FileSemaphore(self.temp_dir.name, "server", 2)
+        third = filelock.FileSemaphore(self.temp_dir.name, "server", 2)
+
+        self.assertTrue(first.acquire(blocking=False))
+        self.assertTrue(second.acquire(blocking=False))
+        self.assertFalse(third.acquire(timeout=0.1))
+        second.release()
+        self.assertTrue(third.acquire(blocking=False))
+        first.release()
+        third.release()
+
+    def test_concurrency_limit(self):
+        """
+        Verify governors of the same server share the concurrency limit.
+        """
+        governors = [
+            loadgovernor.LoadGovernor(
+                CONNECTION_STRING, max_concurrent=1, governor_dir=self.temp_dir.name
+            )
+            for _ in range(2)
+        ]
+        governors[0].before_request()
+        self.assertFalse(governors[1].semaphore.acquire(blocking=False))
+        governors[0].after_request()
+        governors[1].before_request()
+        governors[1].after_request()
+
+    def test_rate_limit(self):
+        """
+        Verify requests against a server are spaced by the rate limit across governors.
+        """
+        governors = [
+            loadgovernor.LoadGovernor(
+                CONNECTION_STRING, max_rate=5, governor_dir=self.temp_dir.name
+            )
+            for _ in range(2)
+        ]
+        started = time.monotonic()
+        for governor in governors * 2:
+            governor.before_request()
+            governor.after_request()
+        # Four requests at five per second take at least three intervals.
+        self.assertGreaterEqual(time.monotonic() - started, 0.55)
+
+    def test_latency_tracker(self):
+        """
+        Verify per object latency is compared against the warm up baseline.
+        """
+        tracker = loadgovernor.LatencyTracker()
+        now = 0.0
+        for completed_count in range(0, loadgovernor.WARMUP_OBJECTS + 1, 2):
+            tracker.record_progress(completed_count, now)
+            now += 0.2
+        self.assertAlmostEqual(tracker.baseline, 0.1)
+        self.assertFalse(tracker.degraded)
+
+        # Counts start over with the next request.
+        tracker.reset_request()
+        for completed_count in range(0, 20):
+            tracker.record_progress(completed_count, now)
+            now += 0.5
+        self.assertTrue(tracker.degraded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,387 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+
+import mssqlscripter.scriptindex as scriptindex
+import mssqlscripter.tests.faketoolsservice as faketoolsservice
+
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@unittest.skipIf(
+    platform.system() == "Windows", "The fake tools service is a script with a shebang"
+)
+class MainTests(unittest.TestCase):
+    """
+    End to end tests of mssql-scripter against the fake tools service.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        service_dir = os.path.join(self.temp_dir.name, "service")
+        os.makedirs(service_dir)
+        faketoolsservice.install(service_dir)
+
+        self.environment = dict(
+            os.environ,
+            # Keep logs, caches and run history of the runs out of the user's home.
+            HOME=self.temp_dir.name,
+            USERPROFILE=self.temp_dir.name,
+            MSSQLTOOLSSERVICE_PATH=service_dir,
+            PYTHONPATH=REPOSITORY_ROOT,
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def run_scripter(self, *args, returncode=0):
+        return self.run_command("-S", "localhost", *args, returncode=returncode)
+
+    def run_command(self, *args, returncode=0):
+        result = subprocess.run(
+            [sys.executable, "-m", "mssqlscripter", *args],
+            env=self.environment,
+            capture_output=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, returncode, result.stderr)
+        return result.stdout.decode("utf-8")
+
+    def read_bytes(self, name):
+        with io.open(self.path(name), "rb") as script_file:
+            return script_file.read()
+
+    def read_directory(self, directory):
+        contents = {}
+        for name in os.listdir(directory):
+            with io.open(
+                os.path.join(directory, name), encoding="utf-8"
+            ) as script_file:
+                contents[name] = script_file.read()
+        return contents
+
+    def test_script_to_stdout(self):
+        """
+        Verify every object is scripted to stdout in plan order.
+        """
+        output = self.run_scripter()
+        self.assertTrue(output.startswith("USE [FakeDatabase]"))
+        for previous, current in zip(
+            faketoolsservice.DEFAULT_CATALOG, faketoolsservice.DEFAULT_CATALOG[1:]
+        ):
+            self.assertLess(
+                output.index(faketoolsservice.qualified_name(previous)),
+                output.index(faketoolsservice.qualified_name(current)),
+            )
+
+    def test_include_patterns(self):
+        """
+        Verify only objects matching the patterns are scripted.
+        """
+        output = self.run_scripter(
+            "--include-patterns", "Sales.*", "--exclude-patterns", "Table:*"
+        )
+        self.assertIn("[Sales].[vStore]", output)
+        self.assertIn("[Sales].[trStore]", output)
+        self.assertNotIn("[Sales].[Store]", output)
+        self.assertNotIn("[dbo].", output)
+
+    def test_parallel_file_per_object(self):
+        """
+        Verify scripting with several workers writes the same files as one worker and records run history.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("serial"))
+        self.run_scripter(
+            "--file-per-object", "-f", self.path("parallel"), "--workers", "3"
+        )
+
+        serial = self.read_directory(self.path("serial"))
+        self.assertEqual(len(serial), len(faketoolsservice.DEFAULT_CATALOG))
+        self.assertEqual(self.read_directory(self.path("parallel")), serial)
+        self.assertTrue(
+            os.path.exists(self.path(os.path.join(".mssqlscripter", "run_history.db")))
+        )
+
+    def test_parallel_single_file(self):
+        """
+        Verify the scripts of several workers merge into the same single file script as one worker writes.
+        """
+        self.run_scripter("-f", self.path("serial.sql"))
+        self.run_scripter("-f", self.path("parallel.sql"), "--workers", "3")
+        self.assertEqual(self.read_bytes("parallel.sql"), self.read_bytes("serial.sql"))
+
+        # Shards are also split into several requests without repeating the USE statement.
+        self.run_scripter(
+            "-f", self.path("serial.sql"), "--max-objects-per-request", "2"
+        )
+        self.run_scripter(
+            "-f",
+            self.path("parallel.sql"),
+            "--workers",
+            "2",
+            "--max-objects-per-request",
+            "2",
+        )
+        serial = self.read_bytes("serial.sql")
+        self.assertEqual(self.read_bytes("parallel.sql"), serial)
+        self.assertEqual(serial.count(b"USE [FakeDatabase]"), 1)
+
+    def test_parallel_empty_selection(self):
+        """
+        Verify several workers script a selection without objects like one worker does.
+        """
+        self.run_scripter(
+            "-f", self.path("serial.sql"), "--include-objects", "dbo.Nope"
+        )
+        self.run_scripter(
+            "-f",
+            self.path("parallel.sql"),
+            "--include-objects",
+            "dbo.Nope",
+            "--workers",
+            "2",
+        )
+
+        serial = self.read_bytes("serial.sql")
+        self.assertEqual(serial, b"USE [FakeDatabase]\nGO\n")
+        self.assertEqual(self.read_bytes("parallel.sql"), serial)
+
+        self.run_scripter(
+            "-f",
+            self.path("dynamic.sql"),
+            "--include-objects",
+            "dbo.Nope",
+            "--workers",
+            "2",
+            "--dynamic-dispatch",
+        )
+        self.assertEqual(self.read_bytes("dynamic.sql"), serial)
+
+    def test_dynamic_dispatch(self):
+        """
+        Verify scripting batches on several workers writes the same single file script as one worker.
+        """
+        self.run_scripter("-f", self.path("serial.sql"))
+        self.run_scripter(
+            "-f", self.path("parallel.sql"), "--workers", "3", "--dynamic-dispatch"
+        )
+
+        serial = self.read_bytes("serial.sql")
+        self.assertEqual(self.read_bytes("parallel.sql"), serial)
+        self.assertEqual(serial.count(b"USE [FakeDatabase]"), 1)
+
+    def test_archive(self):
+        """
+        Verify --archive holds the same object files as a directory run and nothing is left on disk.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("objects"))
+        self.run_scripter(
+            "--file-per-object", "--archive", self.path("objects.zip"), "--workers", "2"
+        )
+
+        with zipfile.ZipFile(self.path("objects.zip")) as archive:
+            names = archive.namelist()
+            self.assertEqual(names[0], "manifest.json")
+            self.assertEqual(
+                {
+                    name: archive.read(name).decode("utf-8")
+                    for name in names
+                    if name != "manifest.json"
+                },
+                self.read_directory(self.path("objects")),
+            )
+
+    def test_sqlite_output(self):
+        """
+        Verify --sqlite-output stores the same object scripts as a directory run.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("objects"))
+        self.run_scripter(
+            "--file-per-object", "--sqlite-output", self.path("scripts.db")
+        )
+
+        connection = sqlite3.connect(self.path("scripts.db"))
+        try:
+            scripts = sorted(
+                script for script, in connection.execute("SELECT script FROM objects")
+            )
+        finally:
+            connection.close()
+        self.assertEqual(
+            scripts, sorted(self.read_directory(self.path("objects")).values())
+        )
+
+    def test_snapshot(self):
+        """
+        Verify snapshots of identical runs on different days share their scripts and restore like a directory run.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("objects"))
+        for script_date in (faketoolsservice.SCRIPT_DATE, "1/2/2020 12:00:00 AM"):
+            self.environment["FAKE_TOOLS_SERVICE_SCRIPT_DATE"] = script_date
+            self.run_scripter(
+                "--file-per-object",
+                "--snapshot",
+                "--snapshot-store",
+                self.path("store"),
+            )
+
+        output = self.run_command("snapshot", "--store", self.path("store"), "list")
+        snapshot_ids = [line.split("\t")[0] for line in output.splitlines()]
+        self.assertEqual(len(snapshot_ids), 2)
+        blobs = sum(
+            len(files)
+            for _, _, files in os.walk(os.path.join(self.path("store"), "blobs"))
+        )
+        self.assertEqual(blobs, len(faketoolsservice.DEFAULT_CATALOG))
+
+        self.run_command(
+            "snapshot",
+            "--store",
+            self.path("store"),
+            "restore",
+            snapshot_ids[1],
+            "-o",
+            self.path("restored"),
+        )
+        self.assertEqual(
+            self.read_directory(self.path("restored")),
+            self.read_directory(self.path("objects")),
+        )
+
+    def test_diff(self):
+        """
+        Verify a live run compares equal to a directory run until an object changes.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("objects"))
+        connection_string = "Server=localhost;Integrated Security=True;"
+        self.assertEqual(
+            self.run_command("diff", self.path("objects"), connection_string), ""
+        )
+
+        with open(
+            os.path.join(self.path("objects"), "dbo.Customer.Table.sql"), "a"
+        ) as script_file:
+            script_file.write("-- changed\n")
+        os.remove(os.path.join(self.path("objects"), "Sales.Store.Table.sql"))
+        output = self.run_command(
+            "diff", self.path("objects"), connection_string, returncode=1
+        )
+        self.assertTrue(
+            output.startswith("A\tSales.Store.Table.sql\nM\tdbo.Customer.Table.sql\n"),
+            output,
+        )
+        self.assertIn("--- a/dbo.Customer.Table.sql\n", output)
+        self.assertIn("\n--- changed\n", output)
+
+    def test_diff_failed_live_side(self):
+        """
+        Verify a live side failing to script fails the comparison instead of showing its objects as removed.
+        """
+        self.run_scripter("--file-per-object", "-f", self.path("objects"))
+        catalog = [dict(entry) for entry in faketoolsservice.DEFAULT_CATALOG]
+        catalog[5]["error"] = "Scripting failed"
+        with open(self.path("catalog.json"), "w", encoding="utf-8") as catalog_file:
+            json.dump(catalog, catalog_file)
+        self.environment["FAKE_TOOLS_SERVICE_CATALOG"] = self.path("catalog.json")
+
+        self.run_scripter("--file-per-object", "-f", self.path("failed"), returncode=1)
+        output = self.run_command(
+            "diff",
+            self.path("objects"),
+            "Server=localhost;Integrated Security=True;",
+            returncode=1,
+        )
+        self.assertNotIn("D\t", output)
+
+    def test_fleet(self):
+        """
+        Verify databases sharing a schema reuse the scripts of the first of them.
+        """
+        self.run_scripter(
+            "--file-per-object", "-f", self.path("objects"), "--exclude-use-database"
+        )
+        with open(self.path("targets.txt"), "w", encoding="utf-8") as targets_file:
+            for database in ("tenant1", "tenant2", "tenant3"):
+                targets_file.write(
+                    f"Server=localhost;Database={database};Integrated Security=True;\n"
+                )
+
+        self.run_command(
+            "fleet",
+            self.path("targets.txt"),
+            "-o",
+            self.path("fleet"),
+            "--spot-check",
+            "3",
+            "--workers",
+            "2",
+        )
+        with open(
+            os.path.join(self.path("fleet"), "fleet.json"), encoding="utf-8"
+        ) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(len(manifest["groups"]), 1)
+        self.assertEqual(
+            [
+                (database["name"], database["status"], database["representative"])
+                for database in manifest["databases"]
+            ],
+            [
+                ("tenant1", "scripted", None),
+                ("tenant2", "reused", "tenant1"),
+                ("tenant3", "reused", "tenant1"),
+            ],
+        )
+        for database in ("tenant1", "tenant2", "tenant3"):
+            self.assertEqual(
+                self.read_directory(os.path.join(self.path("fleet"), database)),
+                self.read_directory(self.path("objects")),
+            )
+
+    def test_index(self):
+        """
+        Verify --index writes an index that reads back single objects.
+        """
+        self.run_scripter("-f", self.path("script.sql"), "--index")
+        with scriptindex.ScriptIndex(self.path("script.sql")) as index:
+            self.assertEqual(len(index), len(faketoolsservice.DEFAULT_CATALOG))
+            self.assertEqual(
+                index.get_script("Sales", "vStore").decode("utf-8"),
+                faketoolsservice.script_object(faketoolsservice.DEFAULT_CATALOG[5], {}),
+            )
+
+    def test_split(self):
+        """
+        Verify the split command writes a file per object of a single file script.
+        """
+        self.run_scripter("-f", self.path("script.sql"))
+        self.run_command("split", self.path("script.sql"), "-o", self.path("split"))
+
+        files = self.read_directory(self.path("split"))
+        self.assertEqual(len(files), len(faketoolsservice.DEFAULT_CATALOG))
+        self.assertEqual(
+            files["Sales.vStore.View.sql"],
+            "USE [FakeDatabase]\nGO\n"
+            + faketoolsservice.script_object(
+                faketoolsservice.DEFAULT_CATALOG[5], {"ScriptUseDatabase": True}
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mssqlscripter.objectfilter as objectfilter
+import mssqlscripter.plancatalog as plancatalog
+
+SAMPLE_PLAN = [
+    {"type": "Database", "schema": None, "name": "AdventureWorks2014"},
+    {"type": "Schema", "schema": None, "name": "Sales"},
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "Table", "schema": "dbo", "name": "tmp_orders"},
+    {"type": "View", "schema": "Sales", "name": "vStoreWithContacts"},
+    {"type": "Table", "schema": "dbo", "name": "tmpX"},
+    {"type": "StoredProcedure", "schema": "dbo", "name": "tmp_cleanup"},
+    {"type": "Table", "schema": "Sales.Archive", "name": "Store"},
+]
+
+
+class ObjectFilterTests(unittest.TestCase):
+    """
+    Object filter tests.
+    """
+
+    def setUp(self):
+        self.catalog = plancatalog.PlanCatalog.from_objects(SAMPLE_PLAN)
+
+    def select(self, include=None, exclude=None, case_sensitive=False):
+        object_filter = objectfilter.ObjectFilter(include, exclude, case_sensitive)
+        return list(object_filter.select(self.catalog))
+
+    def test_compile(self):
+        """
+        Verify wildcards compile to literal, prefix or regular expression matches.
+        """
+        pattern = objectfilter.ObjectPattern("Sales.*")
+        self.assertEqual(pattern.schema.kind, objectfilter.NameMatcher.LITERAL)
+        self.assertEqual(pattern.name.kind, objectfilter.NameMatcher.ANY)
+
+        pattern = objectfilter.ObjectPattern("dbo.tmp_%")
+        self.assertEqual(pattern.name.kind, objectfilter.NameMatcher.PREFIX)
+
+        pattern = objectfilter.ObjectPattern("Table:*.t?p*")
+        self.assertEqual(pattern.type.kind, objectfilter.NameMatcher.LITERAL)
+        self.assertEqual(pattern.schema.kind, objectfilter.NameMatcher.ANY)
+        self.assertEqual(pattern.name.kind, objectfilter.NameMatcher.REGEX)
+
+    def test_select(self):
+        """
+        Verify patterns over schema, name and type select objects in plan order.
+        """
+        self.assertEqual(self.select(["Sales.*"]), [2, 4])
+        self.assertEqual(self.select(["dbo.tmp_%"]), [3, 6])
+        self.assertEqual(self.select(["Table:dbo.tmp*"]), [3, 5])
+        self.assertEqual(self.select(["Store"]), [2, 7])
+        self.assertEqual(self.select(["[Sales.Archive].*"]), [7])
+        self.assertEqual(self.select(["*.?Store*"]), [4])
+        self.assertEqual(self.select(["*Procedure:*"]), [6])
+        self.assertEqual(self.select(["re:dbo\\.tmp[A-Z]"], case_sensitive=True), [5])
+        self.assertEqual(self.select(["View:re:.*Contacts"]), [4])
+        self.assertEqual(self.select(["nothing.*"]), [])
+
+    def test_case_sensitivity(self):
+        """
+        Verify patterns ignore case unless asked not to.
+        """
+        self.assertEqual(self.select(["sales.store"]), [2])
+        self.assertEqual(self.select(["sales.store"], case_sensitive=True), [])
+        self.assertEqual(self.select(["table:dbo.TMP%"]), [3, 5])
+
+    def test_exclude(self):
+        """
+        Verify exclude patterns remove objects from the includes or from the whole plan.
+        """
+        self.assertEqual(self.select(["dbo.*"], ["dbo.tmpX"]), [3, 6])
+        self.assertEqual(self.select(exclude=["Sales.*", "dbo.*"]), [0, 1, 7])
+
+    def test_to_criteria(self):
+        """
+        Verify the selection is emitted as exact include object criteria.
+        """
+        object_filter = objectfilter.ObjectFilter(["dbo.tmp_%"])
+        self.assertEqual(
+            object_filter.to_criteria(self.catalog).format(),
+            [
+                {"Type": "Table", "Schema": "dbo", "Name": "tmp_orders"},
+                {"Type": "StoredProcedure", "Schema": "dbo", "Name": "tmp_cleanup"},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
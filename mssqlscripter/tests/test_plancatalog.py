@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.plancatalog as plancatalog
+
+SAMPLE_PLAN = [
+    {"type": "Database", "schema": None, "name": "AdventureWorks2014"},
+    {"type": "Schema", "schema": None, "name": "Sales"},
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "Table", "schema": "Person", "name": "Person"},
+    {"type": "View", "schema": "Sales", "name": "vStoreWithContacts"},
+    {"type": "Table", "schema": "Sales", "name": "Customer"},
+    {"type": "Trigger", "schema": "Sales", "name": "Store"},
+]
+
+
+class PlanCatalogTests(unittest.TestCase):
+    """
+    Plan catalog tests.
+    """
+
+    def setUp(self):
+        plan_event = scripting.ScriptPlanNotificationEvent(
+            {
+                "operationId": "1",
+                "sequenceNumber": 1,
+                "scriptingObjects": SAMPLE_PLAN,
+                "count": len(SAMPLE_PLAN),
+            }
+        )
+        self.catalog = plancatalog.PlanCatalog.from_plan(plan_event)
+
+    def test_round_trip(self):
+        """
+        Verify objects come back in plan order.
+        """
+        self.assertEqual(len(self.catalog), len(SAMPLE_PLAN))
+        self.assertEqual(
+            list(self.catalog),
+            [scripting.ScriptingObject.from_dict(item) for item in SAMPLE_PLAN],
+        )
+        self.assertEqual(self.catalog.type_of(2), "Table")
+        self.assertEqual(self.catalog.schema_of(1), None)
+
+    def test_find(self):
+        """
+        Verify lookups by schema and name, including names shared by several types.
+        """
+        self.assertEqual(self.catalog.find("Sales", "Store"), [2, 6])
+        self.assertEqual(self.catalog.find("Sales", "Store", "Trigger"), [6])
+        self.assertEqual(self.catalog.find("dbo", "Store"), [])
+        self.assertEqual(self.catalog.find(None, "Sales"), [1])
+
+        # Objects appended after the index was built are found too.
+        position = self.catalog.append("Table", "dbo", "Store")
+        self.assertEqual(self.catalog.find("dbo", "Store"), [position])
+
+    def test_positions_with_name(self):
+        """
+        Verify exact and prefix name lookups through the sorted name index.
+        """
+        self.assertEqual(sorted(self.catalog.positions_with_name("Store")), [2, 6])
+        self.assertEqual(
+            sorted(self.catalog.positions_with_name("S", prefix=True)), [1, 2, 6]
+        )
+        self.assertEqual(list(self.catalog.positions_with_name("store")), [])
+        self.assertEqual(
+            sorted(self.catalog.positions_with_name("store", case_sensitive=False)),
+            [2, 6],
+        )
+
+        # The index follows objects appended after it was built.
+        position = self.catalog.append("Table", "Sales", "SalesOrder")
+        self.assertIn(position, self.catalog.positions_with_name("S", prefix=True))
+
+    def test_select(self):
+        """
+        Verify filtering by type and schema keeps plan order.
+        """
+        self.assertEqual(list(self.catalog.select(types=["Table"])), [2, 3, 5])
+        self.assertEqual(
+            list(self.catalog.select(types=["Table", "View"], schemas=["Sales"])),
+            [2, 4, 5],
+        )
+        self.assertEqual(list(self.catalog.select(schemas=["Person"])), [3])
+        self.assertEqual(list(self.catalog.select(types=["Index"])), [])
+        self.assertEqual(len(self.catalog.select()), len(SAMPLE_PLAN))
+
+    def test_grouping(self):
+        """
+        Verify counts and groups by type and schema.
+        """
+        self.assertEqual(
+            self.catalog.count_by_type(),
+            {"Database": 1, "Schema": 1, "Table": 3, "View": 1, "Trigger": 1},
+        )
+        self.assertEqual(
+            self.catalog.count_by_schema(), {None: 2, "Sales": 4, "Person": 1}
+        )
+        groups = self.catalog.group_by_type(self.catalog.select(schemas=["Sales"]))
+        self.assertEqual(list(groups["Table"]), [2, 5])
+
+    def test_fingerprint(self):
+        """
+        Verify plans of the same objects share a fingerprint, optionally leaving objects out.
+        """
+        tenant_plan = [dict(SAMPLE_PLAN[0], name="Tenant2")] + SAMPLE_PLAN[1:]
+        tenant_catalog = plancatalog.PlanCatalog.from_objects(tenant_plan)
+        self.assertNotEqual(self.catalog.fingerprint(), tenant_catalog.fingerprint())
+        shared = range(1, len(SAMPLE_PLAN))
+        self.assertEqual(
+            self.catalog.fingerprint(shared), tenant_catalog.fingerprint(shared)
+        )
+
+    def test_to_scripting_objects(self):
+        """
+        Verify selected objects are converted to exact include criteria.
+        """
+        criteria = self.catalog.to_scripting_objects([2, 4]).format()
+        self.assertEqual(
+            criteria,
+            [
+                {"Type": "Table", "Schema": "Sales", "Name": "Store"},
+                {"Type": "View", "Schema": "Sales", "Name": "vStoreWithContacts"},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import mssqlscripter.resourcesampler as resourcesampler
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "Requires procfs.")
+class ResourceSamplerTests(unittest.TestCase):
+    """
+    Resource sampler tests.
+    """
+
+    def test_read_process_stats(self):
+        """
+        Verify procfs stats of the current process are parsed.
+        """
+        stats = resourcesampler.read_process_stats(os.getpid())
+
+        self.assertGreater(stats["rss_bytes"], 0)
+        self.assertGreaterEqual(stats["threads"], 1)
+        self.assertGreaterEqual(stats["cpu_seconds"], 0)
+
+    def test_read_missing_process(self):
+        """
+        Verify a process that does not exist yields no stats.
+        """
+        self.assertIsNone(resourcesampler.read_process_stats(2**22 + 1))
+
+    def test_sampler_records_progress_and_peaks(self):
+        """
+        Verify samples carry scripting progress and peaks are reported.
+        """
+        sampler = resourcesampler.ResourceSampler(os.getpid(), interval=0.01)
+        sampler.start()
+        sampler.record_progress(5)
+        time.sleep(0.1)
+        sampler.record_progress(10)
+        sampler.stop()
+
+        self.assertGreater(len(sampler.samples), 1)
+        self.assertEqual(sampler.samples[-1].completed_count, 10)
+        peaks = sampler.peaks()
+        self.assertGreater(peaks["peak_rss_bytes"], 0)
+
+        report = io.StringIO()
+        sampler.report(report)
+        self.assertIn("peak rss", report.getvalue())
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            time_series_file = os.path.join(output_dir, "samples.csv")
+            sampler.write_time_series(time_series_file)
+            with io.open(time_series_file, encoding="utf-8") as time_series:
+                lines = time_series.read().splitlines()
+
+        self.assertEqual(lines[0], ",".join(resourcesampler.TIME_SERIES_COLUMNS))
+        self.assertEqual(len(lines), len(sampler.samples) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
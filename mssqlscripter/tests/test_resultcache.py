@@ -0,0 +1,154 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import tempfile
+import time
+import unittest
+
+import mssqlscripter.argparser as parser
+import mssqlscripter.plancatalog as plancatalog
+import mssqlscripter.resultcache as resultcache
+
+SAMPLE_PLAN = [
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "View", "schema": "Sales", "name": "vStoreWithContacts"},
+]
+
+
+class ResultCacheTests(unittest.TestCase):
+    """
+    Result cache tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        os.makedirs(self.cache_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        with io.open(path, "w", encoding="utf-8") as script_file:
+            script_file.write(content)
+        return path
+
+    def read_file(self, path):
+        with io.open(path, encoding="utf-8") as script_file:
+            return script_file.read()
+
+    def test_connection_target(self):
+        """
+        Verify connection targets drop secrets and normalize synonymous keywords.
+        """
+        self.assertEqual(
+            parser.get_connection_target(
+                "Data Source=tcp:MyServer,1433;Initial Catalog=db;UID=me;PWD='a;''b'"
+            ),
+            {"Server": "myserver,1433", "Database": "db", "User Id": "me"},
+        )
+        self.assertEqual(
+            parser.get_connection_target(
+                "Server=myserver,1433;Database=db;User Id=me;Password=other"
+            ),
+            {"Server": "myserver,1433", "Database": "db", "User Id": "me"},
+        )
+
+    def test_make_key(self):
+        """
+        Verify the key ignores secrets and output location but not options or the plan.
+        """
+        plan = plancatalog.PlanCatalog.from_objects(SAMPLE_PLAN)
+        parameters = vars(
+            parser.parse_arguments(
+                ["--connection-string", "Server=s;Database=d;User Id=u;Password=p1;"]
+            )
+        )
+        key = resultcache.make_key(parameters, plan)
+
+        same_target = dict(
+            parameters,
+            ConnectionString="server=S;database=d;user id=u;password=p2;",
+            FilePath="/elsewhere.sql",
+            AppendToFile=True,
+        )
+        self.assertEqual(resultcache.make_key(same_target, plan), key)
+
+        self.assertNotEqual(
+            resultcache.make_key(dict(parameters, ScriptCreateDrop="ScriptDrop"), plan),
+            key,
+        )
+        plan.append("Table", "dbo", "New")
+        self.assertNotEqual(resultcache.make_key(parameters, plan), key)
+
+    def test_make_key_with_patterns(self):
+        """
+        Verify runs selecting objects with different patterns get different keys.
+        """
+
+        def make_key(*args):
+            return resultcache.make_key(
+                vars(
+                    parser.parse_arguments(
+                        ["--connection-string", "Server=s;Database=d;", *args]
+                    )
+                )
+            )
+
+        key = make_key("--include-patterns", "Sales.*")
+        self.assertEqual(make_key("--include-patterns", "Sales.*"), key)
+        self.assertNotEqual(make_key("--include-patterns", "dbo.*"), key)
+        self.assertNotEqual(
+            make_key("--include-patterns", "Sales.*", "--match-case"), key
+        )
+        self.assertNotEqual(make_key("--exclude-patterns", "Sales.*"), key)
+
+    def test_hit_and_ttl(self):
+        """
+        Verify stored outputs are copied back until they expire.
+        """
+        cache = resultcache.ResultCache(self.cache_dir, ttl_seconds=60)
+        cache.put("k1", self.write_file("script.sql", "CREATE TABLE t1\n"))
+
+        target = os.path.join(self.temp_dir.name, "out.sql")
+        self.assertTrue(cache.copy_to("k1", target))
+        self.assertEqual(self.read_file(target), "CREATE TABLE t1\n")
+        self.assertTrue(cache.copy_to("k1", target, append=True))
+        self.assertEqual(self.read_file(target), "CREATE TABLE t1\n" * 2)
+        self.assertFalse(cache.copy_to("k2", target))
+
+        # Age the entry past its time to live.
+        path = cache.get("k1")
+        stored = time.time() - 120
+        os.utime(path, (stored, stored))
+        self.assertIsNone(cache.get("k1"))
+        self.assertFalse(os.path.exists(path))
+
+    def test_lru_eviction(self):
+        """
+        Verify the least recently used entries are evicted once the cache is over its size limit.
+        """
+        cache = resultcache.ResultCache(self.cache_dir, max_bytes=250)
+        source = self.write_file("script.sql", "x" * 100)
+
+        cache.put("k1", source)
+        cache.put("k2", source)
+        now = time.time()
+        os.utime(cache.get("k1"), (now - 10, now - 10))
+        os.utime(cache.get("k2"), (now - 20, now - 20))
+        # k1 was used more recently than k2.
+        cache.get("k1")
+
+        cache.put("k3", source)
+        self.assertIsNotNone(cache.get("k1"))
+        self.assertIsNone(cache.get("k2"))
+        self.assertIsNotNone(cache.get("k3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
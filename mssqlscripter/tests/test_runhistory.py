@@ -0,0 +1,122 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.plancatalog as plancatalog
+import mssqlscripter.runhistory as runhistory
+import mssqlscripter.shardscheduler as shardscheduler
+
+SAMPLE_PLAN = [
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "Table", "schema": "Sales", "name": "Order"},
+    {"type": "View", "schema": "Sales", "name": "vStore"},
+    {"type": "StoredProcedure", "schema": "dbo", "name": "uspGetCustomer"},
+    {"type": "Rule", "schema": "dbo", "name": "rPositive"},
+]
+
+
+class RunHistoryTests(unittest.TestCase):
+    """
+    Run history and shard scheduler tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history = runhistory.RunHistory(
+            os.path.join(self.temp_dir.name, "run_history.db")
+        )
+        self.catalog = plancatalog.PlanCatalog.from_objects(SAMPLE_PLAN)
+
+    def tearDown(self):
+        self.history.close()
+        self.temp_dir.cleanup()
+
+    def test_estimates(self):
+        """
+        Verify estimates come from history, then the type average, then the size class of the type.
+        """
+        self.history.record(
+            "server/db", "SchemaOnly", {("Table", "Sales", "Store"): 4.0}
+        )
+        self.history.record(
+            "server/db", "SchemaOnly", {("Table", "Sales", "Store"): 2.0}
+        )
+        # Other targets and types of data do not count.
+        self.history.record(
+            "server/db", "SchemaAndData", {("View", "Sales", "vStore"): 9.0}
+        )
+
+        estimates = self.history.estimate(
+            "server/db", "SchemaOnly", self.catalog, range(len(self.catalog))
+        )
+        self.assertEqual(
+            estimates,
+            [
+                3.0,
+                3.0,
+                runhistory.SIZE_CLASS_ESTIMATES["View"],
+                runhistory.SIZE_CLASS_ESTIMATES["StoredProcedure"],
+                runhistory.DEFAULT_SIZE_CLASS_ESTIMATE,
+            ],
+        )
+
+        estimates = self.history.estimate(
+            "other/db", "SchemaAndData", self.catalog, [0]
+        )
+        self.assertEqual(estimates, [runhistory.DATA_TABLE_ESTIMATE])
+
+    def test_duration_recorder(self):
+        """
+        Verify durations are only recorded when objects complete.
+        """
+        recorder = runhistory.DurationRecorder()
+
+        def progress(status, name):
+            return scripting.ScriptProgressNotificationEvent(
+                {
+                    "operationId": "1",
+                    "sequenceNumber": 1,
+                    "scriptingObject": {"type": "Table", "schema": "dbo", "name": name},
+                    "status": status,
+                    "completedCount": 0,
+                    "totalCount": 2,
+                }
+            )
+
+        recorder.record_progress(progress("Progress", "t1"))
+        recorder.record_progress(progress("Progress", "t2"))
+        self.assertEqual(recorder.durations, {})
+        recorder.record_progress(progress("Completed", "t1"))
+        recorder.record_progress(progress("Completed", "t2"))
+        self.assertEqual(
+            sorted(recorder.durations), [("Table", "dbo", "t1"), ("Table", "dbo", "t2")]
+        )
+
+    def test_schedule_lpt(self):
+        """
+        Verify long objects are spread over workers and shards keep plan order.
+        """
+        positions = list(range(8))
+        estimates = [8.0, 1.0, 1.0, 7.0, 1.0, 1.0, 5.0, 4.0]
+        shards, loads = shardscheduler.schedule_lpt(positions, estimates, 3)
+
+        self.assertEqual(
+            sorted(position for shard in shards for position in shard), positions
+        )
+        for shard in shards:
+            self.assertEqual(list(shard), sorted(shard))
+        self.assertEqual(sorted(loads), [9.0, 9.0, 10.0])
+
+        # Never more workers than objects.
+        shards, loads = shardscheduler.schedule_lpt([0, 1], [1.0, 1.0], 4)
+        self.assertEqual(len(shards), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+
+import mssqlscripter.schemadiff as schemadiff
+import mssqlscripter.snapshotstore as snapshotstore
+
+OLD_SCRIPTS = {
+    "dbo.Customer.Table.sql": b"CREATE TABLE [dbo].[Customer]\nGO\n",
+    "dbo.Order.Table.sql": b"CREATE TABLE [dbo].[Order]\nGO\n",
+    "dbo.uspGetCustomer.StoredProcedure.sql": b"CREATE PROCEDURE\nSELECT 1\nGO\n",
+}
+NEW_SCRIPTS = {
+    "dbo.Customer.Table.sql": b"CREATE TABLE [dbo].[Customer]\nGO\n",
+    "dbo.uspGetCustomer.StoredProcedure.sql": b"CREATE PROCEDURE\nSELECT 2\nGO\n",
+    "dbo.vCustomer.View.sql": b"CREATE VIEW [dbo].[vCustomer]\nGO\n",
+}
+
+
+class SchemaDiffTests(unittest.TestCase):
+    """
+    Schema diff tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_directory(self, name, scripts):
+        directory = os.path.join(self.temp_dir.name, name)
+        os.makedirs(directory)
+        for file_name, script in scripts.items():
+            with open(os.path.join(directory, file_name), "wb") as script_file:
+                script_file.write(script)
+        return directory
+
+    def compare(self, old_source, new_source):
+        output = io.StringIO()
+        comparison = schemadiff.compare(old_source, new_source, output, workers=1)
+        return comparison, output.getvalue()
+
+    def test_compare_directories(self):
+        """
+        Verify added, removed and changed objects are listed and only changed objects are diffed.
+        """
+        comparison, output = self.compare(
+            schemadiff.DirectorySource(self.write_directory("old", OLD_SCRIPTS)),
+            schemadiff.DirectorySource(self.write_directory("new", NEW_SCRIPTS)),
+        )
+        self.assertTrue(comparison)
+        self.assertEqual(comparison.unchanged, 1)
+        self.assertEqual(
+            output,
+            "A\tdbo.vCustomer.View.sql\n"
+            "D\tdbo.Order.Table.sql\n"
+            "M\tdbo.uspGetCustomer.StoredProcedure.sql\n"
+            "--- a/dbo.uspGetCustomer.StoredProcedure.sql\n"
+            "+++ b/dbo.uspGetCustomer.StoredProcedure.sql\n"
+            "@@ -1,3 +1,3 @@\n"
+            " CREATE PROCEDURE\n"
+            "-SELECT 1\n"
+            "+SELECT 2\n"
+            " GO\n",
+        )
+
+    def test_script_dates_are_ignored(self):
+        """
+        Verify scripts differing only in the Script Date of their headers compare equal and diffs leave headers out.
+        """
+        header = "/****** Object:  Table [dbo].[Customer]    Script Date: {} ******/\n"
+        old_scripts = {
+            "dbo.Customer.Table.sql": (
+                header.format("1/1/2020 12:00:00 AM") + "CREATE TABLE\nGO\n"
+            ).encode(),
+            "dbo.Order.Table.sql": (
+                header.format("1/1/2020 12:00:00 AM") + "CREATE TABLE\nGO\n"
+            ).encode(),
+        }
+        new_scripts = {
+            "dbo.Customer.Table.sql": (
+                header.format("1/2/2020 12:00:00 AM") + "CREATE TABLE\nGO\n"
+            ).encode(),
+            "dbo.Order.Table.sql": b"CREATE TABLE (Id INT)\nGO\n",
+        }
+        comparison, output = self.compare(
+            schemadiff.DirectorySource(self.write_directory("old", old_scripts)),
+            schemadiff.DirectorySource(self.write_directory("new", new_scripts)),
+        )
+        self.assertEqual(comparison.unchanged, 1)
+        self.assertEqual(comparison.changed, ["dbo.Order.Table.sql"])
+        self.assertNotIn("Script Date", output)
+
+    def test_compare_archive_and_snapshot(self):
+        """
+        Verify archives and snapshots compare like the directories they were made of.
+        """
+        archive_path = os.path.join(self.temp_dir.name, "old.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr(schemadiff.ARCHIVE_MANIFEST_NAME, "{}")
+            for file_name, script in OLD_SCRIPTS.items():
+                archive.writestr(file_name, script)
+
+        store = snapshotstore.SnapshotStore(os.path.join(self.temp_dir.name, "store"))
+        snapshot_id = store.write_manifest(
+            "server/database",
+            "SchemaOnly",
+            [
+                {"file": file_name, "digest": store.put_blob(script)}
+                for file_name, script in NEW_SCRIPTS.items()
+            ],
+        )
+
+        _, expected = self.compare(
+            schemadiff.DirectorySource(self.write_directory("old", OLD_SCRIPTS)),
+            schemadiff.DirectorySource(self.write_directory("new", NEW_SCRIPTS)),
+        )
+        _, output = self.compare(
+            schemadiff.ArchiveSource(archive_path),
+            schemadiff.SnapshotSource(store, snapshot_id),
+        )
+        self.assertEqual(output, expected)
+
+    def test_parallel_diffs(self):
+        """
+        Verify diffs computed by the process pool come in name order.
+        """
+        names = [f"dbo.Table{index:03}.Table.sql" for index in range(40)]
+        old_scripts = {name: f"CREATE TABLE {name}\n".encode() for name in names}
+        new_scripts = {
+            name: f"CREATE TABLE {name} (Id INT)\n".encode() for name in names
+        }
+        self.assertEqual(
+            list(schemadiff.compute_diffs(names, old_scripts, new_scripts, workers=2)),
+            list(schemadiff.compute_diffs(names, old_scripts, new_scripts, workers=1)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
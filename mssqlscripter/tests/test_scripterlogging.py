@@ -0,0 +1,150 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import mssqlscripter.scripterlogging as scripterlogging
+
+
+class ScripterLoggingTests(unittest.TestCase):
+    """
+    Scripter logging tests.
+    """
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.original_home = os.environ.get("HOME")
+        os.environ["HOME"] = self.home
+        self.scripter_logger = logging.getLogger("mssqlscripter")
+        self.original_handlers = list(self.scripter_logger.handlers)
+        self.original_level = self.scripter_logger.level
+
+    def tearDown(self):
+        scripterlogging.shutdown_logger()
+        self.scripter_logger.handlers = self.original_handlers
+        self.scripter_logger.setLevel(self.original_level)
+        if self.original_home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = self.original_home
+        shutil.rmtree(self.home)
+
+    def test_queued_records_flushed_on_shutdown(self):
+        """
+        Verify records are written by the listener and respect the configured level.
+        """
+        scripterlogging.initialize_logger("INFO")
+        test_logger = logging.getLogger("mssqlscripter.tests")
+
+        test_logger.debug("payload %s", "not written")
+        test_logger.info("request %s created", 7)
+        scripterlogging.shutdown_logger()
+
+        with io.open(scripterlogging.get_config_log_file(), encoding="utf-8") as log:
+            content = log.read()
+
+        self.assertIn("request 7 created", content)
+        self.assertNotIn("not written", content)
+
+    def test_arguments_logged_as_passed(self):
+        """
+        Verify arguments changed after logging are written as they were when logged.
+        """
+        scripterlogging.initialize_logger("INFO")
+        objects = ["dbo.Customer"]
+        logging.getLogger("mssqlscripter.tests").info("objects %s", objects)
+        objects.append("dbo.Changed")
+        scripterlogging.shutdown_logger()
+
+        with io.open(scripterlogging.get_config_log_file(), encoding="utf-8") as log:
+            content = log.read()
+
+        self.assertIn("objects ['dbo.Customer']", content)
+        self.assertNotIn("dbo.Changed", content)
+
+    def test_debug_payload_not_formatted_above_debug(self):
+        """
+        Verify payload arguments are never formatted when the level filters them out.
+        """
+
+        class Payload(object):
+            formatted = False
+
+            def __str__(self):
+                Payload.formatted = True
+                return "payload"
+
+        scripterlogging.initialize_logger("WARNING")
+        logging.getLogger("mssqlscripter.tests").debug("%s", Payload())
+        scripterlogging.shutdown_logger()
+
+        self.assertFalse(Payload.formatted)
+
+    def test_per_run_log_file(self):
+        """
+        Verify per-run mode writes to a log file owned by this process.
+        """
+        scripterlogging.initialize_logger("INFO", "per-run")
+        logging.getLogger("mssqlscripter.tests").info("per run message")
+        scripterlogging.shutdown_logger()
+
+        run_log_dir = scripterlogging.get_config_run_log_dir()
+        run_logs = os.listdir(run_log_dir)
+        self.assertEqual(len(run_logs), 1)
+        self.assertIn(str(os.getpid()), run_logs[0])
+        self.assertFalse(os.path.exists(scripterlogging.get_config_log_file()))
+
+    def test_prune_run_logs(self):
+        """
+        Verify the oldest per-run logs are removed once count or size limits are exceeded.
+        """
+        run_log_dir = scripterlogging.get_config_run_log_dir()
+        for index in range(5):
+            log_file = os.path.join(run_log_dir, f"mssql-scripter-{index}.log")
+            with io.open(log_file, "wb") as log:
+                log.write(b"x" * 10)
+            os.utime(log_file, (index, index))
+
+        scripterlogging.prune_run_logs(run_log_dir, max_files=3, max_total_bytes=1000)
+        self.assertEqual(
+            sorted(os.listdir(run_log_dir)),
+            ["mssql-scripter-2.log", "mssql-scripter-3.log", "mssql-scripter-4.log"],
+        )
+
+        scripterlogging.prune_run_logs(run_log_dir, max_files=3, max_total_bytes=15)
+        self.assertEqual(os.listdir(run_log_dir), ["mssql-scripter-4.log"])
+
+    def test_prune_keeps_logs_of_running_processes(self):
+        """
+        Verify pruning never deletes the log of a run that is still going.
+        """
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        run_log_dir = scripterlogging.get_config_run_log_dir()
+        for name, pid in (("running", os.getpid()), ("finished", finished.pid)):
+            log_file = os.path.join(
+                run_log_dir, f"mssql-scripter-20200101-000000-{pid}.log"
+            )
+            with io.open(log_file, "wb") as log:
+                log.write(name.encode())
+            os.utime(log_file, (0, 0))
+
+        scripterlogging.prune_run_logs(run_log_dir, max_files=0, max_total_bytes=0)
+        expected = [f"mssql-scripter-20200101-000000-{os.getpid()}.log"]
+        if os.name != "posix":
+            # Without process probes only recently modified logs are kept.
+            expected = []
+        self.assertEqual(os.listdir(run_log_dir), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+import mssqlscripter.jsonrpc.jsonrpcclient as json_rpc_client
+import mssqlscripter.scripterprofiler as scripterprofiler
+
+
+class ScripterProfilerTests(unittest.TestCase):
+    """
+    Scripter profiler tests.
+    """
+
+    def test_profile_includes_response_thread(self):
+        """
+        Verify work done on the json rpc response thread shows up in the profile.
+        """
+        output_dir = tempfile.mkdtemp()
+        try:
+            profiler = scripterprofiler.ScripterProfiler()
+            profiler.start()
+
+            input_stream = io.BytesIO()
+            output_stream = io.BytesIO(
+                b'Content-Length: 15\r\n\r\n{"key":"value"}' * 100
+            )
+            rpc_client = json_rpc_client.JsonRpcClient(input_stream, output_stream)
+            rpc_client.start()
+            rpc_client.response_thread.join(5)
+            rpc_client.shutdown()
+
+            profile_file = profiler.stop_and_dump(
+                scripterprofiler.get_profile_file(output_dir)
+            )
+            self.assertTrue(os.path.exists(profile_file))
+
+            profiled_functions = [
+                function_name
+                for _, _, function_name in pstats.Stats(profile_file).stats.keys()
+            ]
+            self.assertIn("read_response", profiled_functions)
+            self.assertIn("_listen_for_response", profiled_functions)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
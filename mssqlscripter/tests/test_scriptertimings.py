@@ -0,0 +1,131 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import sys
+import unittest
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.scriptertimings as scriptertimings
+
+
+class StubJsonRpcClient(object):
+    """
+    Json rpc client that replays canned responses.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def submit_request(self, method, params, id=None):
+        pass
+
+    def get_response(self, id=0):
+        return self.responses.pop(0) if self.responses else None
+
+    def request_finished(self, id):
+        pass
+
+
+class PhaseTimerTests(unittest.TestCase):
+    """
+    Phase timer tests.
+    """
+
+    def test_repeated_marks_accumulate(self):
+        """
+        Verify phases are reported in the order they first ended and repeated marks add to their duration.
+        """
+        timer = scriptertimings.PhaseTimer()
+        timer.mark("parse_arguments")
+        timer.mark("scripting")
+        timer.mark("script_response")
+        timer.mark("scripting")
+
+        phases = [phase for phase, _ in timer.phases() if phase != "python_startup"]
+        self.assertEqual(phases, ["parse_arguments", "scripting", "script_response"])
+        durations = dict(timer.phases())
+        self.assertAlmostEqual(
+            durations["scripting"],
+            (timer.marks[1][1] - timer.marks[0][1])
+            + (timer.marks[3][1] - timer.marks[2][1]),
+        )
+        for _, duration in timer.phases():
+            self.assertGreaterEqual(duration, 0)
+
+        report = io.StringIO()
+        timer.report(report)
+        self.assertIn("script_response", report.getvalue())
+        self.assertIn("total", report.getvalue())
+
+    def test_marks_logged_once_logging_starts(self):
+        """
+        Verify marks made before logging started are logged when it starts.
+        """
+        timer = scriptertimings.PhaseTimer()
+        timer.mark("parse_arguments")
+        with self.assertLogs("mssqlscripter.scriptertimings", "INFO") as logs:
+            timer.start_logging()
+            timer.mark("initialize")
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("phase=parse_arguments", logs.output[0])
+        self.assertIn("phase=initialize", logs.output[1])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Requires procfs.")
+    def test_process_age(self):
+        """
+        Verify interpreter startup is accounted for on platforms with procfs.
+        """
+        self.assertGreaterEqual(scriptertimings.get_process_age(), 0)
+
+    def test_scripting_request_marks_phases(self):
+        """
+        Verify a scripting request marks the response, plan and completion phases.
+        """
+        responses = [
+            {"id": "1", "result": {"operationId": "1"}},
+            {
+                "method": "scripting/scriptPlanNotification",
+                "params": {
+                    "operationId": "1",
+                    "sequenceNumber": 1,
+                    "scriptingObjects": [],
+                    "count": 0,
+                },
+            },
+            {
+                "method": "scripting/scriptComplete",
+                "params": {
+                    "operationId": "1",
+                    "sequenceNumber": 2,
+                    "errorDetails": None,
+                    "errorMessage": None,
+                    "hasError": False,
+                    "canceled": False,
+                    "success": True,
+                },
+            },
+        ]
+        timer = scriptertimings.PhaseTimer()
+        parameters = {
+            "FilePath": "Sample_File_Path",
+            "ConnectionString": "Sample_connection_string",
+            "ScriptDestination": "ToSingleFile",
+        }
+        request = scripting.ScriptingRequest(
+            1, StubJsonRpcClient(responses), parameters, timer
+        )
+        request.execute()
+        while not request.completed():
+            request.get_response()
+
+        self.assertEqual(
+            [phase for phase, _ in timer.marks],
+            ["script_response", "plan_notification", "scripting"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.plancatalog as plancatalog
+import mssqlscripter.scriptindex as scriptindex
+
+
+def header(script_type, name):
+    return f"/****** Object:  {script_type} {name}    Script Date: 1/1/2020 12:00:00 AM ******/\r\n"
+
+
+PREAMBLE = "USE [db]\r\nGO\r\n"
+CUSTOMER = (
+    header("Table", "[dbo].[Customer]") + "CREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+)
+PROCEDURE = (
+    header("StoredProcedure", "[dbo].[uspGetCustomer]")
+    + "CREATE PROCEDURE [dbo].[uspGetCustomer] AS\r\nSELECT 1\r\nGO\r\n"
+)
+
+
+class ScriptIndexTests(unittest.TestCase):
+    """
+    Script index tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.temp_dir.name, "script.sql")
+        with open(self.script_path, "wb") as script_file:
+            script_file.write((PREAMBLE + CUSTOMER + PROCEDURE).encode("utf-8"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_get_script(self):
+        """
+        Verify the script of one object is read through the index.
+        """
+        plan = plancatalog.PlanCatalog.from_objects(
+            [
+                {"type": "Table", "schema": "dbo", "name": "Customer"},
+                {"type": "StoredProcedure", "schema": "dbo", "name": "uspGetCustomer"},
+            ]
+        )
+        index_path = scriptindex.write_index(self.script_path, plan)
+        self.assertEqual(index_path, self.script_path + scriptindex.INDEX_FILE_SUFFIX)
+
+        with scriptindex.ScriptIndex(self.script_path) as index:
+            self.assertEqual(len(index), 2)
+            self.assertEqual(
+                index.get_script("dbo", "uspGetCustomer"), PROCEDURE.encode("utf-8")
+            )
+            self.assertEqual(
+                index.get_script("dbo", "Customer", "Table", include_preamble=True),
+                (PREAMBLE + CUSTOMER).encode("utf-8"),
+            )
+            self.assertEqual(index.find("dbo", "Customer", "View"), [])
+            with self.assertRaises(KeyError):
+                index.get_script("dbo", "Missing")
+
+    def test_stale_index(self):
+        """
+        Verify an index is refused once its script changed.
+        """
+        scriptindex.write_index(self.script_path)
+        with open(self.script_path, "ab") as script_file:
+            script_file.write(CUSTOMER.encode("utf-8"))
+        with self.assertRaises(ValueError):
+            scriptindex.ScriptIndex(self.script_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.plancatalog as plancatalog
+import mssqlscripter.scriptmerge as scriptmerge
+
+SAMPLE_PLAN = [
+    {"type": "Table", "schema": "dbo", "name": "Customer"},
+    {"type": "Table", "schema": "Sales", "name": "Store"},
+    {"type": "View", "schema": "Sales", "name": "vStore"},
+    {"type": "StoredProcedure", "schema": "dbo", "name": "uspGetCustomer"},
+]
+
+
+def header(script_type, name):
+    return f"/****** Object:  {script_type} {name}    Script Date: 1/1/2020 12:00:00 AM ******/\r\n"
+
+
+class ScriptMergeTests(unittest.TestCase):
+    """
+    Script merge tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.catalog = plancatalog.PlanCatalog.from_objects(SAMPLE_PLAN)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, content, bom=False):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as script_file:
+            if bom:
+                script_file.write(scriptmerge.UTF8_BOM)
+            script_file.write(content.encode("utf-8"))
+        return path
+
+    def read(self, path):
+        with open(path, "rb") as script_file:
+            return script_file.read()
+
+    def test_merge_in_plan_order(self):
+        """
+        Verify shard scripts merge by plan position, keeping the preamble and headers of objects outside the plan.
+        """
+        first = self.write(
+            "first.sql",
+            "USE [db]\r\nGO\r\n"
+            + header("Table", "[dbo].[Customer]")
+            + "CREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+            + header("Index", "[IX_Customer]")
+            + "CREATE INDEX [IX_Customer]\r\nGO\r\n"
+            + header("View", "[Sales].[vStore]")
+            + "CREATE VIEW [Sales].[vStore]\r\nGO\r\n",
+            bom=True,
+        )
+        second = self.write(
+            "second.sql",
+            header("Table", "[Sales].[Store]")
+            + "CREATE TABLE [Sales].[Store]\r\nGO\r\n"
+            + header("StoredProcedure", "[dbo].[uspGetCustomer]")
+            + "CREATE PROCEDURE [dbo].[uspGetCustomer]\r\nGO\r\n",
+            bom=True,
+        )
+        output = os.path.join(self.temp_dir.name, "merged.sql")
+        scriptmerge.merge_scripts(
+            [first, second], [[0, 2], [1, 3]], self.catalog, output
+        )
+
+        expected = (
+            "USE [db]\r\nGO\r\n"
+            + header("Table", "[dbo].[Customer]")
+            + "CREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+            + header("Index", "[IX_Customer]")
+            + "CREATE INDEX [IX_Customer]\r\nGO\r\n"
+            + header("Table", "[Sales].[Store]")
+            + "CREATE TABLE [Sales].[Store]\r\nGO\r\n"
+            + header("View", "[Sales].[vStore]")
+            + "CREATE VIEW [Sales].[vStore]\r\nGO\r\n"
+            + header("StoredProcedure", "[dbo].[uspGetCustomer]")
+            + "CREATE PROCEDURE [dbo].[uspGetCustomer]\r\nGO\r\n"
+        )
+        self.assertEqual(
+            self.read(output), scriptmerge.UTF8_BOM + expected.encode("utf-8")
+        )
+
+        # Appending keeps what was in the file.
+        scriptmerge.concatenate_scripts([first], output, append=True)
+        self.assertTrue(self.read(output).endswith(self.read(first)[3:]))
+
+    def test_merge_database_trailer(self):
+        """
+        Verify the statements a database object ends its script with stay at the end of the merged script.
+        """
+        catalog = plancatalog.PlanCatalog.from_objects(
+            [{"type": "Database", "schema": None, "name": "db"}] + SAMPLE_PLAN
+        )
+        database = (
+            "USE [master]\r\nGO\r\n"
+            + header("Database", "[db]")
+            + "CREATE DATABASE [db]\r\nGO\r\nUSE [db]\r\nGO\r\n"
+        )
+        trailer = "USE [master]\r\nGO\r\nALTER DATABASE [db] SET  READ_WRITE \r\nGO\r\n"
+        first = self.write(
+            "first.sql",
+            database
+            + header("Table", "[dbo].[Customer]")
+            + "CREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+            + trailer,
+        )
+        second = self.write(
+            "second.sql",
+            header("Table", "[Sales].[Store]")
+            + "CREATE TABLE [Sales].[Store]\r\nGO\r\n",
+        )
+        output = os.path.join(self.temp_dir.name, "merged.sql")
+        scriptmerge.merge_scripts([first, second], [[0, 1], [2]], catalog, output)
+
+        self.assertEqual(
+            self.read(output),
+            (
+                database
+                + header("Table", "[dbo].[Customer]")
+                + "CREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+                + header("Table", "[Sales].[Store]")
+                + "CREATE TABLE [Sales].[Store]\r\nGO\r\n"
+                + trailer
+            ).encode("utf-8"),
+        )
+
+    def test_merge_out_of_order_shards(self):
+        """
+        Verify shard scripts that cannot be merged are concatenated rather than lost.
+        """
+        first = self.write(
+            "first.sql",
+            header("View", "[Sales].[vStore]")
+            + "GO\r\n"
+            + header("Table", "[dbo].[Customer]")
+            + "GO\r\n",
+        )
+        second = self.write(
+            "second.sql", header("Table", "[Sales].[Store]") + "GO\r\n" + "-- end\r\n"
+        )
+        output = os.path.join(self.temp_dir.name, "merged.sql")
+        scriptmerge.merge_scripts([second, first], [[1], [0, 2]], self.catalog, output)
+        self.assertEqual(self.read(output), self.read(first) + self.read(second))
+
+    def test_out_of_order_script(self):
+        """
+        Verify scripts that do not follow the plan order are refused.
+        """
+        path = self.write(
+            "shard.sql",
+            header("View", "[Sales].[vStore]")
+            + "GO\r\n"
+            + header("Table", "[dbo].[Customer]")
+            + "GO\r\n",
+        )
+        with self.assertRaises(ValueError):
+            scriptmerge.index_script(path, self.catalog, [0, 2])
+
+        path = self.write("no_headers.sql", "CREATE TABLE [dbo].[Customer]\r\nGO\r\n")
+        with self.assertRaises(ValueError):
+            scriptmerge.index_script(path, self.catalog, [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.scriptsplitter as scriptsplitter
+
+
+def header(script_type, name):
+    return f"/****** Object:  {script_type} {name}    Script Date: 1/1/2020 12:00:00 AM ******/\r\n"
+
+
+PREAMBLE = "﻿USE [db]\r\nGO\r\n"
+CUSTOMER = (
+    header("Table", "[dbo].[Customer]")
+    + "CREATE TABLE [dbo].[Customer]([Id] [int])\r\nGO\r\n"
+    + header("Index", "[IX_Customer]")
+    + "CREATE INDEX [IX_Customer] ON [dbo].[Customer]([Id])\r\nGO\r\n\r\n"
+)
+PROCEDURE = (
+    header("StoredProcedure", "[dbo].[uspScript]")
+    + "CREATE PROCEDURE [dbo].[uspScript] AS\r\nPRINT 1\r\n"
+    # A header like comment inside the body does not start an object.
+    + header("Table", "[dbo].[Fake]")
+    + "PRINT 2\r\nGO\r\n"
+)
+VIEW = (
+    header("View", "[Sales].[v.Store]") + "CREATE VIEW [Sales].[v.Store] AS\r\nGO\r\n"
+)
+SCRIPT = PREAMBLE + CUSTOMER + PROCEDURE + VIEW
+
+
+class ScriptSplitterTests(unittest.TestCase):
+    """
+    Script splitter tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.temp_dir.name, "script.sql")
+        with open(self.script_path, "wb") as script_file:
+            script_file.write(SCRIPT.encode("utf-8"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_directory(self, directory):
+        contents = {}
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), "rb") as script_file:
+                contents[name] = script_file.read().decode("utf-8")
+        return contents
+
+    def test_find_objects(self):
+        """
+        Verify objects are found at headers that start a batch, and child objects stay with their parent.
+        """
+        data = SCRIPT.encode("utf-8")
+        preamble, objects = scriptsplitter.find_objects(data)
+
+        self.assertEqual(data[preamble[0] : preamble[1]], PREAMBLE.encode("utf-8"))
+        self.assertEqual(
+            [(o.type, o.schema, o.name) for o in objects],
+            [
+                ("Table", "dbo", "Customer"),
+                ("StoredProcedure", "dbo", "uspScript"),
+                ("View", "Sales", "v.Store"),
+            ],
+        )
+        self.assertEqual(
+            [data[o.start : o.end].decode("utf-8") for o in objects],
+            [CUSTOMER, PROCEDURE, VIEW],
+        )
+
+    def test_split_by_object(self):
+        """
+        Verify every object is written to its own file after the preamble.
+        """
+        output_dir = os.path.join(self.temp_dir.name, "objects")
+        self.assertEqual(
+            scriptsplitter.split_script(self.script_path, output_dir, workers=2), 3
+        )
+        self.assertEqual(
+            self.read_directory(output_dir),
+            {
+                "dbo.Customer.Table.sql": PREAMBLE + CUSTOMER,
+                "dbo.uspScript.StoredProcedure.sql": PREAMBLE + PROCEDURE,
+                "Sales.v.Store.View.sql": PREAMBLE + VIEW,
+            },
+        )
+
+    def test_split_by_type(self):
+        """
+        Verify objects of a type are bundled in script order.
+        """
+        with open(self.script_path, "ab") as script_file:
+            script_file.write(
+                (
+                    header("Table", "[dbo].[Order]")
+                    + "CREATE TABLE [dbo].[Order]\r\nGO\r\n"
+                ).encode("utf-8")
+            )
+        output_dir = os.path.join(self.temp_dir.name, "types")
+        scriptsplitter.split_script(self.script_path, output_dir, by_type=True)
+
+        contents = self.read_directory(output_dir)
+        self.assertEqual(
+            sorted(contents), ["StoredProcedure.sql", "Table.sql", "View.sql"]
+        )
+        self.assertTrue(contents["Table.sql"].startswith(PREAMBLE + CUSTOMER))
+        self.assertTrue(
+            contents["Table.sql"].endswith("CREATE TABLE [dbo].[Order]\r\nGO\r\n")
+        )
+
+    def test_script_without_headers(self):
+        """
+        Verify scripts without headers are refused and empty scripts have no objects.
+        """
+        with open(self.script_path, "wb") as script_file:
+            script_file.write(b"CREATE TABLE [dbo].[Customer]\r\nGO\r\n")
+        with self.assertRaises(ValueError):
+            scriptsplitter.split_script(self.script_path, self.temp_dir.name)
+
+        open(self.script_path, "wb").close()
+        self.assertEqual(
+            scriptsplitter.split_script(self.script_path, self.temp_dir.name), 0
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
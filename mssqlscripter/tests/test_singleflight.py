@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import mssqlscripter.filelock as filelock
+import mssqlscripter.singleflight as singleflight
+
+
+class SingleFlightTests(unittest.TestCase):
+    """
+    Single flight tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.flight_dir = os.path.join(self.temp_dir.name, "flights")
+        os.makedirs(self.flight_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def start_waiter(self, file_path):
+        """
+        Join the flight from another thread, which blocks while the leader holds the lock.
+        """
+        waiter = singleflight.SingleFlight("key", self.flight_dir)
+        result = {}
+
+        def join():
+            result["received"] = waiter.join(file_path)
+
+        thread = threading.Thread(target=join)
+        thread.start()
+        # Give the waiter time to join before the leader lands.
+        time.sleep(0.2)
+        self.assertTrue(thread.is_alive())
+        return waiter, thread, result
+
+    def test_file_lock(self):
+        """
+        Verify a file lock excludes other holders until released.
+        """
+        lock_path = self.path("test.lock")
+        first = filelock.FileLock(lock_path)
+        second = filelock.FileLock(lock_path)
+
+        self.assertTrue(first.acquire(blocking=False))
+        self.assertFalse(second.acquire(blocking=False))
+        self.assertFalse(second.acquire(timeout=0.1))
+        first.release()
+        with second:
+            self.assertTrue(second.locked)
+        self.assertFalse(second.locked)
+
+    def test_waiter_receives_output(self):
+        """
+        Verify a run joining while an identical run is in flight receives its output.
+        """
+        leader = singleflight.SingleFlight("key", self.flight_dir)
+        self.assertFalse(leader.join(self.path("leader.sql")))
+
+        waiter, thread, result = self.start_waiter(self.path("waiter.sql"))
+
+        with io.open(self.path("leader.sql"), "w", encoding="utf-8") as script_file:
+            script_file.write("CREATE TABLE t1\n")
+        leader.land(self.path("leader.sql"))
+        thread.join(10)
+
+        self.assertTrue(result["received"])
+        self.assertFalse(waiter.lock.locked)
+        with io.open(self.path("waiter.sql"), encoding="utf-8") as script_file:
+            self.assertEqual(script_file.read(), "CREATE TABLE t1\n")
+
+        # A run starting after the flight landed leads a new one.
+        late = singleflight.SingleFlight("key", self.flight_dir)
+        self.assertFalse(late.join(self.path("late.sql")))
+        late.land()
+
+    def test_waiter_takes_over_failed_flight(self):
+        """
+        Verify a waiter leads in place of a run that failed.
+        """
+        leader = singleflight.SingleFlight("key", self.flight_dir)
+        self.assertFalse(leader.join(self.path("leader.sql")))
+
+        waiter, thread, result = self.start_waiter(self.path("waiter.sql"))
+        leader.land()
+        thread.join(10)
+
+        self.assertFalse(result["received"])
+        self.assertTrue(waiter.lock.locked)
+        waiter.land()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.snapshotstore as snapshotstore
+
+CUSTOMER = {"type": "Table", "schema": "dbo", "name": "Customer"}
+
+
+def progress(status, scripting_object):
+    return scripting.ScriptProgressNotificationEvent(
+        {
+            "operationId": "1",
+            "sequenceNumber": 1,
+            "scriptingObject": scripting_object,
+            "status": status,
+            "completedCount": 0,
+            "totalCount": 1,
+        }
+    )
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    """
+    Snapshot store tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = snapshotstore.SnapshotStore(
+            os.path.join(self.temp_dir.name, "store")
+        )
+        self.source_dir = os.path.join(self.temp_dir.name, "objects")
+        os.makedirs(self.source_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def count_blobs(self):
+        return sum(len(files) for _, _, files in os.walk(self.store.blob_dir))
+
+    def take_snapshot(self, target, scripts):
+        sink = snapshotstore.SnapshotSink(
+            self.store, self.source_dir, target, "SchemaOnly"
+        )
+        for file_name, script in scripts.items():
+            with open(os.path.join(self.source_dir, file_name), "wb") as object_file:
+                object_file.write(script)
+        sink.record_progress(progress("Completed", CUSTOMER))
+        sink.close()
+        self.assertEqual(os.listdir(self.source_dir), [])
+        return sink.snapshot_id
+
+    def test_blobs(self):
+        """
+        Verify identical blobs are stored once and read back.
+        """
+        digest = self.store.put_blob(b"CREATE TABLE")
+        self.assertEqual(self.store.put_blob(b"CREATE TABLE"), digest)
+        self.assertEqual(self.count_blobs(), 1)
+        self.assertEqual(self.store.get_blob(digest), b"CREATE TABLE")
+
+    def test_blobs_ignore_script_dates(self):
+        """
+        Verify scripts of an object made at different times share a blob.
+        """
+        header = "/****** Object:  Table [dbo].[Customer]    Script Date: {} ******/\n"
+        first = (header.format("1/1/2020 12:00:00 AM") + "CREATE TABLE\n").encode()
+        second = (header.format("1/2/2020 12:00:00 AM") + "CREATE TABLE\n").encode()
+        digest = self.store.put_blob(first)
+        self.assertEqual(self.store.put_blob(second), digest)
+        self.assertNotEqual(self.store.put_blob(b"CREATE VIEW\n"), digest)
+        self.assertEqual(self.count_blobs(), 2)
+        self.assertEqual(self.store.get_blob(digest), first)
+
+    def test_snapshots_share_scripts(self):
+        """
+        Verify snapshots of identical databases share their blobs and restore their files.
+        """
+        scripts = {
+            "dbo.Customer.Table.sql": b"CREATE TABLE [dbo].[Customer]",
+            "dbo.uspGetCustomer.StoredProcedure.sql": b"CREATE PROCEDURE",
+        }
+        first = self.take_snapshot("server/tenant1", scripts)
+        second = self.take_snapshot("server/tenant2", scripts)
+        self.assertEqual(self.store.snapshots(), sorted([first, second]))
+        self.assertEqual(self.count_blobs(), 2)
+
+        manifest = self.store.read_manifest(second)
+        self.assertEqual(manifest["target"], "server/tenant2")
+        self.assertEqual(
+            [(entry["type"], entry["name"]) for entry in manifest["objects"]],
+            [("Table", "Customer"), (None, "dbo.uspGetCustomer.StoredProcedure.sql")],
+        )
+
+        output_dir = os.path.join(self.temp_dir.name, "restored")
+        self.assertEqual(self.store.restore(first, output_dir), 2)
+        for file_name, script in scripts.items():
+            with open(os.path.join(output_dir, file_name), "rb") as object_file:
+                self.assertEqual(object_file.read(), script)
+
+    def test_restore_rejects_paths(self):
+        """
+        Verify a manifest naming files outside the output directory is not restored.
+        """
+        digest = self.store.put_blob(b"CREATE TABLE")
+        output_dir = os.path.join(self.temp_dir.name, "restored")
+        for file_name in ("../escaped.sql", "sub/dbo.Customer.Table.sql", "..", ""):
+            with self.subTest(file_name=file_name):
+                snapshot_id = self.store.write_manifest(
+                    "server/database",
+                    "SchemaOnly",
+                    [{"file": file_name, "digest": digest}],
+                )
+                with self.assertRaises(ValueError):
+                    self.store.restore(snapshot_id, output_dir)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.temp_dir.name, "escaped.sql"))
+        )
+        self.assertFalse(os.path.exists(output_dir))
+
+        # Object names may hold dots of their own.
+        snapshot_id = self.store.write_manifest(
+            "server/database",
+            "SchemaOnly",
+            [{"file": "dbo.Customer..Table.sql", "digest": digest}],
+        )
+        self.assertEqual(self.store.restore(snapshot_id, output_dir), 1)
+        self.assertTrue(
+            os.path.exists(os.path.join(output_dir, "dbo.Customer..Table.sql"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
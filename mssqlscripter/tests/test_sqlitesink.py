@@ -0,0 +1,123 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import mssqlscripter.jsonrpc.contracts.scriptingservice as scripting
+import mssqlscripter.sqlitesink as sqlitesink
+
+CUSTOMER = {"type": "Table", "schema": "dbo", "name": "Customer"}
+CUSTOMER_SCRIPT = "USE [db]\r\nGO\r\nCREATE TABLE [dbo].[Customer]\r\nGO\r\n"
+STORE_SCRIPT = (
+    "USE [db]\r\nGO\r\n"
+    "/****** Object:  View [Sales].[vStore]    Script Date: 1/1/2020 12:00:00 AM ******/\r\n"
+    "CREATE VIEW [Sales].[vStore]\r\nGO\r\n"
+)
+
+
+def progress(status, scripting_object):
+    return scripting.ScriptProgressNotificationEvent(
+        {
+            "operationId": "1",
+            "sequenceNumber": 1,
+            "scriptingObject": scripting_object,
+            "status": status,
+            "completedCount": 0,
+            "totalCount": 2,
+        }
+    )
+
+
+class SqliteSinkTests(unittest.TestCase):
+    """
+    SQLite sink tests.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, "objects")
+        os.makedirs(self.source_dir)
+        self.database_path = os.path.join(self.temp_dir.name, "scripts.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_object(self, name, content):
+        with open(os.path.join(self.source_dir, name), "wb") as object_file:
+            object_file.write(content.encode("utf-8"))
+
+    def run_sink(self):
+        sink = sqlitesink.SqliteSink(
+            self.database_path, self.source_dir, "localhost/db", "SchemaOnly"
+        )
+        self.write_object("dbo.Customer.Table.sql", CUSTOMER_SCRIPT)
+        sink.record_progress(progress("Progress", CUSTOMER))
+        sink.record_progress(progress("Completed", CUSTOMER))
+        self.assertEqual(os.listdir(self.source_dir), [])
+
+        # Files not matched to a completed object are stored by their header on close.
+        self.write_object("Sales_vStore.sql", STORE_SCRIPT)
+        sink.close()
+        self.assertEqual(os.listdir(self.source_dir), [])
+        return sink.run_id
+
+    def test_store_runs(self):
+        """
+        Verify object scripts of every run are stored with their hash and run.
+        """
+        first_run = self.run_sink()
+        second_run = self.run_sink()
+        self.assertNotEqual(first_run, second_run)
+
+        connection = sqlite3.connect(self.database_path)
+        try:
+            self.assertEqual(
+                connection.execute(
+                    "SELECT run_id, target, succeeded, object_count FROM runs ORDER BY run_id"
+                ).fetchall(),
+                [
+                    (first_run, "localhost/db", 1, 2),
+                    (second_run, "localhost/db", 1, 2),
+                ],
+            )
+            rows = connection.execute(
+                "SELECT type, schema, name, script, content_hash FROM objects "
+                "WHERE run_id = ? ORDER BY name",
+                (second_run,),
+            ).fetchall()
+            self.assertEqual(
+                rows,
+                [
+                    (
+                        "Table",
+                        "dbo",
+                        "Customer",
+                        CUSTOMER_SCRIPT,
+                        hashlib.sha256(CUSTOMER_SCRIPT.encode("utf-8")).hexdigest(),
+                    ),
+                    (
+                        "View",
+                        "Sales",
+                        "vStore",
+                        STORE_SCRIPT,
+                        hashlib.sha256(STORE_SCRIPT.encode("utf-8")).hexdigest(),
+                    ),
+                ],
+            )
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN SELECT script FROM objects WHERE schema = ? AND name = ?",
+                ("dbo", "Customer"),
+            ).fetchall()
+            self.assertIn("objects_schema_name", str(plan))
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,17 @@
 # --------------------------------------------------------------------------------------------
 
 import io
+import os
+import platform
+import tempfile
 import threading
 import time
 import unittest
 
+import mssqlscripter.plancatalog as plancatalog
+import mssqlscripter.scripterworkers as scripterworkers
 import mssqlscripter.sqltoolsclient as sql_tools_client
+import mssqlscripter.tests.faketoolsservice as faketoolsservice
 
 
 class SqlToolsClientTest(unittest.TestCase):
@@ -52,6 +58,65 @@ class SqlToolsClientTest(unittest.TestCase):
         self.assertFalse(tools_client.json_rpc_client.request_thread.is_alive())
         self.assertFalse(tools_client.json_rpc_client.response_thread.is_alive())
 
+    def test_split_scripting_plan(self):
+        """
+        Verify long include lists are planned through several requests and their plans joined without repeats.
+        """
+        tools_client = sql_tools_client.SqlToolsClient(io.BytesIO(), io.BytesIO())
+        requested = []
+
+        def get_request_plan(parameters):
+            requested.append(parameters["IncludeObjects"])
+            # Every plan also holds the schema its objects depend on.
+            return plancatalog.PlanCatalog.from_objects(
+                [{"type": "Schema", "schema": None, "name": "Sales"}]
+                + [
+                    {"type": "Table", "schema": "Sales", "name": name}
+                    for name in parameters["IncludeObjects"]
+                ]
+            )
+
+        tools_client._get_request_plan = get_request_plan
+        try:
+            plan = tools_client.get_scripting_plan(
+                {"IncludeObjects": ["Store", "Order", "Customer"]}, 2
+            )
+        finally:
+            tools_client.shutdown()
+
+        self.assertEqual(requested, [["Store", "Order"], ["Customer"]])
+        self.assertEqual(
+            [scripting_object.name for scripting_object in plan],
+            ["Sales", "Store", "Order", "Customer"],
+        )
+
+    @unittest.skipIf(
+        platform.system() == "Windows",
+        "The fake tools service is a script with a shebang",
+    )
+    def test_scripting_plan_cancel_finished(self):
+        """
+        Verify fetching a plan leaves no response queue behind, of the plan request or of its cancel.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            worker = scripterworkers.ToolsServiceWorker(
+                [faketoolsservice.install(temp_dir)]
+            )
+            try:
+                plan = worker.client.get_scripting_plan(
+                    {
+                        "ConnectionString": "Server=localhost;",
+                        "ScriptDestination": "ToSingleFile",
+                        "FilePath": os.devnull,
+                    }
+                )
+                self.assertEqual(len(plan), len(faketoolsservice.DEFAULT_CATALOG))
+                # The cancel response may arrive after the canceled plan request completed.
+                time.sleep(0.5)
+                self.assertEqual(list(worker.client.json_rpc_client.response_map), [0])
+            finally:
+                worker.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Modules that should only be imported once a scripting run actually starts.
+DEFERRED_MODULES = [
+    "subprocess",
+    "tempfile",
+    "copy",
+    "logging.handlers",
+    "mssqlscripter.jsonrpc",
+    "mssqlscripter.jsonrpc.contracts",
+    "mssqlscripter.sqltoolsclient",
+    "mssqlscripter.scripterlogging",
+    "mssqlscripter.mssqltoolsservice",
+]
+
+# Cumulative import time budget for mssqlscripter.main, override on slow build agents.
+IMPORT_TIME_THRESHOLD_MS = float(
+    os.environ.get("MSSQL_SCRIPTER_IMPORT_TIME_THRESHOLD_MS", "250")
+)
+
+
+class StartupTests(unittest.TestCase):
+    """
+    Command line startup cost tests.
+    """
+
+    def test_version_defers_scripting_imports(self):
+        """
+        Verify --version does not import the modules needed for a scripting run.
+        """
+        import_times = self.get_import_times("--version")
+
+        self.assertIn("mssqlscripter.main", import_times)
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, import_times)
+
+    def test_help_defers_scripting_imports(self):
+        """
+        Verify --help does not import the modules needed for a scripting run.
+        """
+        import_times = self.get_import_times("--help")
+
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, import_times)
+
+    def test_import_time_threshold(self):
+        """
+        Verify the cumulative import time of the entry point stays within budget.
+        """
+        import_times = self.get_import_times("--version")
+
+        main_import_ms = import_times["mssqlscripter.main"] / 1000.0
+        self.assertLess(
+            main_import_ms,
+            IMPORT_TIME_THRESHOLD_MS,
+            f"Importing mssqlscripter.main took {main_import_ms:.1f} ms",
+        )
+
+    def get_import_times(self, *args):
+        """
+        Run the command line under -X importtime and return cumulative import time in microseconds by module.
+        """
+        repo_root = os.path.abspath(
+            os.path.join(os.path.abspath(__file__), "..", "..", "..")
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "mssqlscripter"] + list(args),
+            cwd=repo_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        import_times = {}
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, module = line.split("|")
+            try:
+                import_times[module.strip()] = int(cumulative)
+            except ValueError:
+                # Header line.
+                continue
+
+        return import_times
+
+
+if __name__ == "__main__":
+    unittest.main()